@@ -4,35 +4,184 @@ This file is just the samples launcher. Nothing here os related
 to Cognitive Services. Look into the "samples" folder for actual code
 """
 
-import importlib
-import pkgutil
-
-# import logging
-# logging.basicConfig(level=logging.DEBUG)
+import argparse
+import sys
+import timeit
 
+import samples._infra.benchmark
+import samples._infra.discovery
 import samples.tools
 
 
-def run_all_samples():
-    for _, section_name_name, ispkg in pkgutil.walk_packages(samples.__path__):
-        if not ispkg:
+def iter_sample_modules():
+    """Yield (sample_name, sample_functions, subscription_key) for every runnable sample module.
+
+    Modules are found without being imported, and only imported if their
+    subscription key and the env variables they read at import time are set.
+    """
+    for sample_module in samples._infra.discovery.discover_samples():
+        sample_name = sample_module.module_name.rsplit(".", 1)[-1]
+        try:
+            subscription_key = samples.tools.get_subscription_key(
+                sample_module.key_env_name)
+        except samples.tools.SubscriptionKeyError as err:
+            print("Skipping sample from {}: {}\n".format(sample_name, err))
+            continue
+        missing = samples._infra.discovery.missing_environ(sample_module)
+        if missing:
+            print("Skipping sample from {}: You need to set the {} env variable(s).\n".format(
+                sample_name, ", ".join(missing)))
             continue
-        section_package_name = "samples."+section_name_name
-        section_package = importlib.import_module(section_package_name)
-        for _, sample_name, _ in pkgutil.iter_modules(section_package.__path__):
-            sample_module = importlib.import_module(
-                section_package_name+"."+sample_name)
-            subkey_env_name = getattr(
-                sample_module, "SUBSCRIPTION_KEY_ENV_NAME", None)
-            if not subkey_env_name:
-                continue
-            print("Executing sample from ", sample_name)
-            try:
-                samples.tools.execute_samples(
-                    sample_module.__dict__, subkey_env_name)
-            except samples.tools.SubscriptionKeyError as err:
-                print("{}\n".format(err))
+        yield (sample_name,
+               samples._infra.discovery.load_sample_functions(sample_module),
+               subscription_key)
+
+
+def run_all_samples(max_workers=None, use_processes=False):
+    """Run every sample, one after another or in a pool of max_workers.
+    """
+    samples.tools.apply_endpoint_override()
+    samples.tools.apply_response_cache()
+    if max_workers:
+        return run_all_samples_parallel(max_workers, use_processes)
+
+    for sample_name, sample_functions, subscription_key in iter_sample_modules():
+        print("Executing sample from ", sample_name)
+        for func in sample_functions:
+            samples.tools.start_sample(func, subscription_key)
+
+
+def run_all_samples_parallel(max_workers, use_processes=False):
+    """Run every sample function of every section in a bounded pool.
+
+    Outputs are printed in a fixed order, followed by a timing summary.
+    """
+    tasks = [
+        (func, subscription_key)
+        for _, sample_functions, subscription_key in iter_sample_modules()
+        for func in sample_functions
+    ]
+
+    start = timeit.default_timer()
+    results = samples.tools.execute_samples_parallel(
+        tasks, max_workers, use_processes)
+    samples.tools.print_timing_summary(
+        results, timeit.default_timer() - start)
+    clients = sys.modules.get("samples._infra.clients")  # Only loaded if a sample used it
+    if clients:
+        print("Client registry: {}".format(clients.reuse_stats()))
+        for bucket, stats in sorted(sys.modules["samples._infra.throttling"].throttling_stats().items()):
+            print("Rate limiter {}: {}".format(bucket, stats))
+        if sys.modules["samples._infra.response_cache"].CACHE is not None:
+            print("Response cache: {}".format(sys.modules["samples._infra.response_cache"].cache_stats()))
+
+    failed = [result.name for result in results if result.error]
+    if failed:
+        raise samples.tools.SampleExecutionError(
+            "{} sample(s) failed: {}".format(len(failed), ", ".join(failed)))
+    return results
+
+
+def run_all_samples_async(concurrency, timeout=None):
+    """Run every sample function on an asyncio event loop, concurrency at a time.
+
+    Coroutine samples use async SDK clients, the others run in threads.
+    Outputs are printed in a fixed order, followed by a timing summary.
+    """
+    import samples._infra.async_tools
+
+    samples.tools.apply_endpoint_override()
+    samples.tools.apply_response_cache()
+    tasks = [
+        (func, subscription_key)
+        for _, sample_functions, subscription_key in iter_sample_modules()
+        for func in sample_functions
+    ]
+
+    start = timeit.default_timer()
+    results = samples._infra.async_tools.execute_samples_async(
+        tasks, concurrency, timeout)
+    samples.tools.print_timing_summary(
+        results, timeit.default_timer() - start)
+
+    failed = [result.name for result in results if result.error]
+    if failed:
+        raise samples.tools.SampleExecutionError(
+            "{} sample(s) failed: {}".format(len(failed), ", ".join(failed)))
+    return results
+
+
+def benchmark_all_samples(repeat, report_path=None, baseline_path=None, threshold=0.2):
+    """Benchmark every sample function, repeat times each.
+
+    The report is saved to report_path and compared to the baseline report
+    if any. Raise SampleExecutionError on regressions above threshold.
+    """
+    samples.tools.apply_endpoint_override()
+    samples.tools.apply_response_cache()
+    tasks = [
+        (func, subscription_key)
+        for _, sample_functions, subscription_key in iter_sample_modules()
+        for func in sample_functions
+    ]
+    report = samples._infra.benchmark.benchmark_samples(tasks, repeat)
+    if report_path:
+        samples._infra.benchmark.save_report(report, report_path)
+
+    regressions = []
+    if baseline_path:
+        baseline = samples._infra.benchmark.load_report(baseline_path)
+        regressions = samples._infra.benchmark.compare_reports(
+            report, baseline, threshold)
+    samples._infra.benchmark.print_report(report, regressions)
+    if regressions:
+        raise samples.tools.SampleExecutionError(
+            "{} regression(s) above {:.0%}".format(len(regressions), threshold))
+    return report
+
+
+def export_metrics(path):
+    """Write the per-operation metrics of the SDK clients to path.
+
+    The format is Prometheus text for a .prom or .txt file, JSON otherwise.
+    """
+    metrics = sys.modules.get("samples._infra.metrics")  # Only loaded if a sample used it
+    if not metrics:
+        print("No metrics to export, no sample used an instrumented client.")
+        return
+    metrics.export_metrics(path)
+    print("Metrics written to {}".format(path))
 
 
 if __name__ == "__main__":
-    run_all_samples()
+    parser = argparse.ArgumentParser(description="Run all the samples.")
+    parser.add_argument("--parallel", type=int, metavar="WORKERS",
+                        help="run the samples in a pool of WORKERS workers")
+    parser.add_argument("--processes", action="store_true",
+                        help="use a process pool instead of a thread pool")
+    parser.add_argument("--async", type=int, dest="concurrency", metavar="CONCURRENCY",
+                        help="run the samples on an asyncio event loop, CONCURRENCY at a time")
+    parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                        help="with --async, fail the samples running longer than SECONDS")
+    parser.add_argument("--benchmark", type=int, metavar="REPEAT",
+                        help="benchmark each sample REPEAT times instead of running them")
+    parser.add_argument("--report", default="benchmark_report.json",
+                        help="where to write the benchmark JSON report")
+    parser.add_argument("--baseline",
+                        help="benchmark JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="regression threshold, 0.2 for 20%% (default)")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="write per-operation SDK metrics to PATH (.prom for Prometheus, JSON otherwise)")
+    options, sys.argv[1:] = parser.parse_known_args()
+    try:
+        if options.benchmark:
+            benchmark_all_samples(options.benchmark, options.report,
+                                  options.baseline, options.threshold)
+        elif options.concurrency:
+            run_all_samples_async(options.concurrency, options.timeout)
+        else:
+            run_all_samples(options.parallel, options.processes)
+    finally:
+        if options.metrics:
+            export_metrics(options.metrics)
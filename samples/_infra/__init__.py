@@ -0,0 +1,6 @@
+"""Shared infrastructure of the samples and their launcher.
+
+Connection pooling, rate limiting, caching, polling, batching and the local
+stand-in server live here, apart from the samples themselves. The launcher
+does not look for samples in this package.
+"""
@@ -0,0 +1,118 @@
+"""Asyncio mode of the sample launcher.
+
+Nothing here is related to Cognitive Services. Sample functions written as
+coroutines (async def, using the aio variant of an SDK client) run on the
+event loop; the other ones each run in a thread of their own. At most
+concurrency samples run at once, and each one can be given a timeout.
+"""
+import asyncio
+import inspect
+import threading
+import timeit
+import traceback
+
+from samples.tools import SampleResult, capture_stdout, run_sample
+
+
+# asyncio.get_running_loop is Python 3.7+, get_event_loop returns the running loop too in a coroutine
+_running_loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)
+
+
+def _sample_name(func):
+    return "{}.{}".format(func.__module__, func.__name__)
+
+
+def _set_result(future, result):
+    if not future.done():  # Cancelled on timeout
+        future.set_result(result)
+
+
+def _run_in_thread(func, subscription_key):
+    """Run a sync sample with run_sample in a new daemon thread, return a future of its SampleResult.
+
+    A timed out sample keeps its thread until it returns: a thread of its
+    own cannot hold up the samples after it, nor count against their timeout.
+    """
+    loop = _running_loop()
+    future = loop.create_future()
+
+    def run():
+        result = run_sample(func, subscription_key)
+        try:
+            loop.call_soon_threadsafe(_set_result, future, result)
+        except RuntimeError:  # Loop closed, the sample timed out long ago
+            pass
+
+    threading.Thread(target=run, name=_sample_name(func), daemon=True).start()
+    return future
+
+
+async def _run_coroutine_sample(func, subscription_key):
+    """Await a coroutine sample, capturing its output like run_sample.
+    """
+    error = None
+    with capture_stdout() as output:
+        start = timeit.default_timer()
+        try:
+            print("Sample:", func.__doc__, "\n")
+            await func(subscription_key)
+            print("\n\n")
+        except Exception:  # Reported in the summary, the other samples go on
+            error = traceback.format_exc()
+        elapsed = timeit.default_timer() - start
+    return SampleResult(_sample_name(func), output.getvalue(), elapsed, error)
+
+
+async def run_sample_async(func, subscription_key, semaphore, timeout=None):
+    """Run one sample once the semaphore allows it, return its SampleResult.
+
+    A sample running longer than timeout seconds is reported as failed. A
+    timed out coroutine is cancelled, a timed out sync function cannot be
+    and goes on in its thread, its output dropped.
+    """
+    async with semaphore:
+        start = timeit.default_timer()
+        if inspect.iscoroutinefunction(func):
+            run = _run_coroutine_sample(func, subscription_key)
+        else:
+            run = _run_in_thread(func, subscription_key)
+        try:
+            return await asyncio.wait_for(run, timeout)
+        except asyncio.TimeoutError:
+            return SampleResult(
+                _sample_name(func),
+                "",
+                timeit.default_timer() - start,
+                "Timed out after {}s\n".format(timeout)
+            )
+
+
+async def _execute_samples_async(samples, concurrency, timeout):
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.ensure_future(run_sample_async(
+            func, subscription_key, semaphore, timeout))
+        for func, subscription_key in samples
+    ]
+    results = []
+    for task in tasks:
+        result = await task
+        print("Sample output from", result.name)
+        print(result.output)
+        if result.error:
+            print(result.error)
+        results.append(result)
+    return results
+
+
+def execute_samples_async(samples, concurrency, timeout=None):
+    """Execute a list of (function, subscription_key) on an event loop.
+
+    Outputs are printed in the order of the list, as soon as every sample
+    before them is done. Return the list of SampleResult.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(_execute_samples_async(samples, concurrency, timeout))
+    finally:
+        loop.close()
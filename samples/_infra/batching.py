@@ -0,0 +1,48 @@
+"""Bounded concurrent map over large inputs.
+
+ThreadPoolExecutor.map submits its whole input at once, which does not suit
+a generator over millions of files. bounded_map keeps at most a window of
+calls queued, consuming the input as the work goes:
+
+    for result in bounded_map(process, iter_files(root), max_workers=8, ordered=False):
+        write(result)
+"""
+import collections
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def is_url(image):
+    return image.startswith(("http://", "https://"))
+
+
+def bounded_map(function, items, max_workers=DEFAULT_MAX_WORKERS, ordered=True):
+    """Yield function(item) for each item, running at most max_workers calls at once.
+
+    Results are yielded in input order, or as they complete if ordered is
+    False. A call raising raises from the generator: function should catch
+    the errors to report with its result.
+    """
+    items = iter(items)
+    window = 2 * max_workers  # Keeps the pool busy without queuing the whole input
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = collections.deque()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < window:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append(executor.submit(function, item))
+            if not pending:
+                return
+            if ordered:
+                yield pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield future.result()
@@ -0,0 +1,247 @@
+"""Benchmark mode of the sample launcher.
+
+Nothing here is related to Cognitive Services. Each sample function is run
+several times, recording wall time, CPU time, HTTP requests and bytes, and
+peak Python memory. The JSON report can be compared against a baseline
+report to spot regressions after an SDK or sample update.
+"""
+import contextlib
+import datetime
+import json
+import threading
+import time
+import timeit
+import tracemalloc
+
+import requests.adapters
+
+from samples.tools import capture_stdout, start_sample
+
+METRICS = ["wall_time", "cpu_time", "requests", "bytes_sent",
+           "bytes_received", "peak_memory"]
+PERCENTILES = [50, 90, 99]
+
+
+class _TransferCounter(object):
+    """Count requests and bytes going through every requests HTTPAdapter.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = self.bytes_sent = self.bytes_received = 0
+
+    def add(self, requests_count=0, bytes_sent=0, bytes_received=0):
+        with self.lock:
+            self.requests += requests_count
+            self.bytes_sent += bytes_sent
+            self.bytes_received += bytes_received
+
+    def snapshot(self):
+        with self.lock:
+            return self.requests, self.bytes_sent, self.bytes_received
+
+    def count_body(self, body):
+        """Return the size of a request body, wrapping it if it is a stream.
+        """
+        if body is None:
+            return body, 0
+        if isinstance(body, bytes):
+            return body, len(body)
+        if isinstance(body, str):
+            return body, len(body.encode("utf-8"))
+        if hasattr(body, "read"):
+            return _CountingStream(body, self), 0
+        if hasattr(body, "__iter__"):
+            return self._count_chunks(body), 0
+        return body, 0
+
+    def _count_chunks(self, chunks):
+        for chunk in chunks:
+            self.add(bytes_sent=len(chunk))
+            yield chunk
+
+
+class _CountingStream(object):
+    """File-like wrapper counting what requests reads from a streamed body.
+    """
+
+    def __init__(self, stream, counter):
+        self.stream = stream
+        self.counter = counter
+
+    def read(self, *args):
+        data = self.stream.read(*args)
+        self.counter.add(bytes_sent=len(data))
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+_COUNTER = _TransferCounter()
+
+
+@contextlib.contextmanager
+def count_transfers():
+    """Count HTTP requests and bytes made through requests while active.
+
+    Yield the process-wide counter.
+    """
+    original_send = requests.adapters.HTTPAdapter.send
+
+    def send(adapter, request, **kwargs):
+        request.body, bytes_sent = _COUNTER.count_body(request.body)
+        headers_size = sum(len(key) + len(value) + 4
+                           for key, value in request.headers.items())
+        response = original_send(adapter, request, **kwargs)
+        content_length = response.headers.get("Content-Length")
+        if content_length is not None:
+            bytes_received = int(content_length)
+        elif not kwargs.get("stream"):
+            bytes_received = len(response.content)
+        else:
+            bytes_received = 0
+        _COUNTER.add(1, bytes_sent + headers_size, bytes_received)
+        return response
+
+    requests.adapters.HTTPAdapter.send = send
+    try:
+        yield _COUNTER
+    finally:
+        requests.adapters.HTTPAdapter.send = original_send
+
+
+def measure_sample(func, subscription_key):
+    """Run a sample once, returning (metrics dict, error or None).
+
+    The sample output is captured and dropped.
+    """
+    error = None
+    requests_before = _COUNTER.snapshot()
+    tracemalloc.start()
+    start_cpu = time.process_time()
+    start = timeit.default_timer()
+    with capture_stdout():
+        try:
+            start_sample(func, subscription_key)
+        except Exception as err:  # Reported in the report, the runs go on
+            error = "{}: {}".format(type(err).__name__, err)
+    wall_time = timeit.default_timer() - start
+    cpu_time = time.process_time() - start_cpu
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    requests_after = _COUNTER.snapshot()
+
+    metrics = dict(
+        zip(["requests", "bytes_sent", "bytes_received"],
+            [after - before for before, after in zip(requests_before, requests_after)]),
+        wall_time=wall_time,
+        cpu_time=cpu_time,
+        peak_memory=peak_memory
+    )
+    return metrics, error
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non empty list.
+    """
+    values = sorted(values)
+    rank = max(1, int(round(percent / 100.0 * len(values))))
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(values):
+    """Return min, mean, max and percentiles of a list of values.
+    """
+    summary = {
+        "min": min(values),
+        "mean": sum(values) / float(len(values)),
+        "max": max(values),
+    }
+    for percent in PERCENTILES:
+        summary["p{}".format(percent)] = percentile(values, percent)
+    return summary
+
+
+def benchmark_samples(samples, repeat):
+    """Run each (function, subscription_key) repeat times, one at a time.
+
+    Return the report as a dict. The statistics of a sample are those of its
+    successful runs, a failed run stopping early would skew them; the
+    failures are counted apart, and a sample without successful run has no
+    statistics.
+    """
+    report = {
+        "created": datetime.datetime.utcnow().isoformat() + "Z",
+        "repeat": repeat,
+        "samples": {},
+    }
+    with count_transfers():
+        for func, subscription_key in samples:
+            name = "{}.{}".format(func.__module__, func.__name__)
+            print("Benchmarking", name)
+            runs = [measure_sample(func, subscription_key)
+                    for _ in range(repeat)]
+            successes = [metrics for metrics, error in runs if not error]
+            errors = [error for _, error in runs if error]
+            report["samples"][name] = dict(
+                {metric: summarize([metrics[metric] for metrics in successes])
+                 for metric in METRICS if successes},
+                successes=len(successes),
+                failures=len(errors),
+                errors=errors
+            )
+    return report
+
+
+def save_report(report, path):
+    with open(path, "w") as report_fd:
+        json.dump(report, report_fd, indent=2, sort_keys=True)
+
+
+def load_report(path):
+    with open(path) as report_fd:
+        return json.load(report_fd)
+
+
+def compare_reports(report, baseline, threshold, statistic="p50"):
+    """Return the regressions of report against baseline.
+
+    A regression is a metric statistic growing by more than threshold (0.2
+    for 20%) for a sample present in both reports. Each regression is a tuple
+    (sample, metric, baseline value, new value). Metrics without statistics
+    in either report, all of their runs failed, are not compared.
+    """
+    regressions = []
+    for name, sample in sorted(report["samples"].items()):
+        baseline_sample = baseline["samples"].get(name)
+        if not baseline_sample:
+            continue
+        for metric in METRICS:
+            if metric not in baseline_sample or metric not in sample:
+                continue
+            old_value = baseline_sample[metric][statistic]
+            new_value = sample[metric][statistic]
+            if new_value > old_value * (1 + threshold):
+                regressions.append((name, metric, old_value, new_value))
+    return regressions
+
+
+def print_report(report, regressions=()):
+    """Print the p50/p90 of every metric, and the regressions if any.
+    """
+    for name, sample in sorted(report["samples"].items()):
+        failures = sample.get("failures", len(sample["errors"]))
+        print(name + (" ({} failed run(s))".format(failures) if failures else ""))
+        for metric in METRICS:
+            if metric not in sample:
+                print("    no successful run")
+                break
+            print("    {:<15} p50 {:>14.3f}    p90 {:>14.3f}".format(
+                metric, sample[metric]["p50"], sample[metric]["p90"]))
+    if regressions:
+        print("\nRegressions:")
+    for name, metric, old_value, new_value in regressions:
+        print("    {} {}: {:.3f} -> {:.3f} ({:+.0%})".format(
+            name, metric, old_value, new_value,
+            new_value / old_value - 1 if old_value else float("inf")))
@@ -0,0 +1,165 @@
+"""Process-wide registry of SDK clients sharing one keep-alive connection pool.
+
+Creating a client in every function, as most samples do for readability,
+costs a new TCP+TLS handshake per call: msrest closes its session after each
+request unless keep_alive is set. Clients handed out by get_client are
+created once per (client class, endpoint, subscription key), keep their
+session alive and mount the same requests HTTPAdapter, so every client and
+every thread share one pool of connections:
+
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
+
+The pool size can be set with the COGNITIVE_SERVICES_POOL_SIZE env variable,
+or set_pool_size before the first client is created. Requests sent through
+the pool are rate limited per subscription key and service, see
+samples._infra.throttling, and the clients record per-operation metrics, see
+samples._infra.metrics. Their responses can be cached on disk, see
+samples._infra.response_cache.
+"""
+import os
+import threading
+
+import requests.adapters
+from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra import response_cache
+from samples._infra.metrics import instrument
+from samples._infra.throttling import LIMITER
+
+DEFAULT_POOL_SIZE = int(os.environ.get("COGNITIVE_SERVICES_POOL_SIZE", 10))
+
+
+class PooledHTTPAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter counting the requests it sends, admitted by a rate limiter.
+
+    Requests answered by the response cache, if enabled, are not sent.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.requests_sent = 0
+        self.limiter = kwargs.pop("limiter", LIMITER)
+        self._count_lock = threading.Lock()
+        super(PooledHTTPAdapter, self).__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        def send_admitted(request):
+            return self.limiter.send(
+                lambda request: self._send(request, **kwargs), request)
+
+        if response_cache.CACHE is not None:
+            return response_cache.CACHE.send(send_admitted, request)
+        return send_admitted(request)
+
+    def _send(self, request, **kwargs):
+        with self._count_lock:
+            self.requests_sent += 1
+        return super(PooledHTTPAdapter, self).send(request, **kwargs)
+
+    def close(self):
+        pass  # Shared by every session, sessions closing must not drop the pool
+
+
+class ClientRegistry(object):
+    """Hand out one client per (client class, endpoint, key), all sharing one adapter.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE):
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._adapter = None
+        self.hits = 0
+        self.misses = 0
+
+    def _mount_adapter(self, session, global_config, local_config, **kwargs):
+        """msrest session_configuration_callback, mounting the shared adapter.
+
+        Called before every request, on the session of the calling thread.
+        """
+        with self._lock:
+            if self._adapter is None:
+                self._adapter = PooledHTTPAdapter(
+                    pool_connections=self.pool_size,
+                    pool_maxsize=self.pool_size,
+                    max_retries=session.adapters["https://"].max_retries
+                )
+        for prefix in ("http://", "https://"):
+            if session.adapters.get(prefix) is not self._adapter:
+                session.mount(prefix, self._adapter)
+        return kwargs
+
+    def get_client(self, client_class, endpoint, subscription_key):
+        """Return the client of client_class for this endpoint and key.
+
+        client_class must be a msrest based client taking endpoint and
+        credentials keyword arguments, like FaceClient or WebSearchClient.
+        """
+        key = (client_class, endpoint, subscription_key)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self.hits += 1
+                return client
+            self.misses += 1
+            client = client_class(
+                endpoint=endpoint,
+                credentials=CognitiveServicesCredentials(subscription_key)
+            )
+            client.config.keep_alive = True
+            client.config.session_configuration_callback = self._mount_adapter
+            self._clients[key] = instrument(client)
+            return client
+
+    def stats(self):
+        """Return client and connection reuse statistics as a dict.
+        """
+        connections = requests_sent = 0
+        if self._adapter is not None:
+            requests_sent = self._adapter.requests_sent
+            pools = self._adapter.poolmanager.pools
+            for pool_key in list(pools.keys()):
+                pool = pools.get(pool_key)
+                if pool is not None:
+                    connections += pool.num_connections
+        return {
+            "clients": len(self._clients),
+            "client_hits": self.hits,
+            "client_misses": self.misses,
+            "requests": requests_sent,
+            "connections": connections,
+            "reused_connections": max(0, requests_sent - connections),
+        }
+
+    def set_pool_size(self, pool_size):
+        with self._lock:
+            if self._adapter is not None:
+                raise RuntimeError(
+                    "The pool size must be set before the first request.")
+            self.pool_size = pool_size
+
+    def clear(self):
+        """Forget every client and close the shared pool.
+        """
+        with self._lock:
+            if self._adapter is not None:
+                super(PooledHTTPAdapter, self._adapter).close()
+            self._clients.clear()
+            self._adapter = None
+            self.hits = self.misses = 0
+
+
+REGISTRY = ClientRegistry()
+
+
+def get_client(client_class, endpoint, subscription_key):
+    """Return the shared client of client_class for this endpoint and key.
+    """
+    return REGISTRY.get_client(client_class, endpoint, subscription_key)
+
+
+def set_pool_size(pool_size):
+    REGISTRY.set_pool_size(pool_size)
+
+
+def reuse_stats():
+    return REGISTRY.stats()
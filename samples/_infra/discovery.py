@@ -0,0 +1,183 @@
+"""Import-free discovery of the samples, for the launcher.
+
+Nothing here is related to Cognitive Services. Sample modules are read with
+the "ast" module instead of being imported, so listing them does not load any
+SDK and does not fail on modules reading os.environ at import time. Results
+are kept in an index file, keyed by path and refreshed when mtime or size
+change.
+"""
+import ast
+import collections
+import importlib
+import json
+import os
+import sys
+
+SAMPLES_FOLDER = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+INDEX_PATH = os.environ.get(
+    "SAMPLES_INDEX_PATH", os.path.join(SAMPLES_FOLDER, ".sample_index.json"))
+INDEX_VERSION = 2
+
+SampleModule = collections.namedtuple(
+    "SampleModule", ["module_name", "path", "key_env_name", "functions", "environ"])
+
+
+def _literal(node):
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return None
+
+
+def _environ_name(node):
+    """Return X if node is os.environ[X] with X a literal, None otherwise.
+    """
+    if not isinstance(node, ast.Subscript):
+        return None
+    value = node.value
+    if not (isinstance(value, ast.Attribute) and value.attr == "environ"
+            and isinstance(value.value, ast.Name) and value.value.id == "os"):
+        return None
+    key = node.slice
+    if sys.version_info < (3, 9) and isinstance(key, ast.Index):
+        key = key.value
+    key = _literal(key)
+    return key if isinstance(key, str) else None
+
+
+_FUNCTIONS = (ast.FunctionDef, getattr(ast, "AsyncFunctionDef", ast.FunctionDef))
+_DEFINITIONS = _FUNCTIONS + (ast.ClassDef,)
+
+
+def _module_level_nodes(tree):
+    """Walk the module body, without entering functions and classes.
+    """
+    pending = list(tree.body)
+    while pending:
+        node = pending.pop()
+        yield node
+        if isinstance(node, _DEFINITIONS):
+            continue
+        pending.extend(ast.iter_child_nodes(node))
+
+
+def scan_module(path, module_name):
+    """Read a sample module source and return its SampleModule.
+
+    The key env name comes from SUBSCRIPTION_KEY_ENV_NAME = "NAME" or
+    SUBSCRIPTION_KEY = os.environ["NAME"]. Sample functions are the top level
+    functions (or coroutine functions) taking a subscription_key argument.
+    environ lists every env variable read at import time.
+    """
+    with open(path, "rb") as source_fd:
+        tree = ast.parse(source_fd.read(), path)
+
+    key_env_name = None
+    functions = []
+    environ = set()
+    for node in tree.body:
+        if isinstance(node, _FUNCTIONS):
+            if "subscription_key" in [arg.arg for arg in node.args.args]:
+                functions.append(node.name)
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target = node.targets[0]
+            if not isinstance(target, ast.Name):
+                continue
+            if target.id == "SUBSCRIPTION_KEY_ENV_NAME":
+                key_env_name = _literal(node.value)
+            elif target.id == "SUBSCRIPTION_KEY" and key_env_name is None:
+                key_env_name = _environ_name(node.value)
+    for node in _module_level_nodes(tree):
+        name = _environ_name(node)
+        if name:
+            environ.add(name)
+
+    return SampleModule(module_name, path, key_env_name, functions, sorted(environ))
+
+
+def _load_index(index_path):
+    try:
+        with open(index_path) as index_fd:
+            index = json.load(index_fd)
+    except (IOError, OSError, ValueError):
+        return {}
+    if index.get("version") != INDEX_VERSION:
+        return {}
+    return index.get("modules", {})
+
+
+def _save_index(index_path, modules):
+    tmp_path = index_path + ".tmp"
+    try:
+        with open(tmp_path, "w") as index_fd:
+            json.dump({"version": INDEX_VERSION, "modules": modules},
+                      index_fd, indent=1, sort_keys=True)
+        os.replace(tmp_path, index_path)
+    except (IOError, OSError):
+        pass  # The index is only a cache
+
+
+def _iter_package_modules(folder, package):
+    for file_name in sorted(os.listdir(folder)):
+        module_name, ext = os.path.splitext(file_name)
+        if ext != ".py" or module_name.startswith("_") or not module_name.isidentifier():
+            continue
+        yield "{}.{}".format(package, module_name), os.path.join(folder, file_name)
+
+
+def _iter_sample_modules(samples_folder):
+    """Yield (module_name, path) of the modules of the samples folder, then of its section packages.
+
+    Modules and packages starting with an underscore are skipped.
+    """
+    for sample in _iter_package_modules(samples_folder, "samples"):
+        yield sample
+    for section_name in sorted(os.listdir(samples_folder)):
+        section_folder = os.path.join(samples_folder, section_name)
+        if section_name.startswith("_") or not os.path.isfile(os.path.join(section_folder, "__init__.py")):
+            continue
+        for sample in _iter_package_modules(section_folder, "samples." + section_name):
+            yield sample
+
+
+def discover_samples(samples_folder=SAMPLES_FOLDER, index_path=INDEX_PATH):
+    """Return the list of SampleModule having a key env name and sample functions.
+
+    Only modules changed since the last call are parsed again.
+    """
+    cached_modules = _load_index(index_path) if index_path else {}
+    modules = {}
+    sample_modules = []
+    for module_name, path in _iter_sample_modules(samples_folder):
+        stat = os.stat(path)
+        entry = cached_modules.get(path)
+        if not entry or entry["mtime"] != stat.st_mtime or entry["size"] != stat.st_size:
+            try:
+                sample_module = scan_module(path, module_name)
+            except SyntaxError as err:
+                print("Unable to read sample {}: {}".format(path, err))
+                continue
+            entry = dict(sample_module._asdict(),
+                         mtime=stat.st_mtime, size=stat.st_size)
+        modules[path] = entry
+        sample_module = SampleModule(
+            *[entry[field] for field in SampleModule._fields])
+        if sample_module.key_env_name and sample_module.functions:
+            sample_modules.append(sample_module)
+
+    if index_path and modules != cached_modules:
+        _save_index(index_path, modules)
+    return sample_modules
+
+
+def missing_environ(sample_module):
+    """Return the env variables read at import time which are not set.
+    """
+    return [name for name in sample_module.environ if name not in os.environ]
+
+
+def load_sample_functions(sample_module):
+    """Import a discovered sample module and return its sample functions.
+    """
+    module = importlib.import_module(sample_module.module_name)
+    return [getattr(module, name) for name in sample_module.functions]
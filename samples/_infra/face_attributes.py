@@ -0,0 +1,345 @@
+"""Columnar export of detected face attributes.
+
+A DetectedFace is a tree of msrest models, a few kilobytes per face. A
+FaceTable flattens a batch of detections into a NumPy structured array, one
+fixed-size row per face, enums stored as small codes, and derives the
+dominant emotion and hair color of the whole batch with one argmax:
+
+    table = FaceTable.from_detections([(image, detected_faces), ...])
+    print(table.dominant_emotions())
+
+export_face_attributes streams any number of detections to a CSV, JSON
+lines or Parquet file (pyarrow needed), one table of batch_size faces at a
+time, so that memory does not grow with the number of faces:
+
+    python -m samples._infra.face_attributes images/*.jpg --output faces.parquet
+"""
+import argparse
+import collections
+import csv
+import json
+import os
+
+import numpy as np
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export only
+    pyarrow = None
+
+from azure.cognitiveservices.vision.face import FaceClient
+from azure.cognitiveservices.vision.face.models import (
+    AccessoryType, BlurLevel, ExposureLevel, Gender, GlassesType, HairColorType, NoiseLevel)
+
+from samples._infra.clients import get_client
+from samples._infra.face_batch import DEFAULT_MAX_WORKERS, detect_faces_batch
+
+DEFAULT_BATCH_SIZE = 4096
+ALL_ATTRIBUTES = [
+    "accessories", "age", "blur", "emotion", "exposure", "facialHair", "gender",
+    "glasses", "hair", "headPose", "makeup", "noise", "occlusion", "smile"
+]
+
+EMOTIONS = ["anger", "contempt", "disgust", "fear", "happiness", "neutral", "sadness", "surprise"]
+HAIR_COLORS = [color.value for color in HairColorType]
+MISSING = 255  # Code of an attribute that was not returned
+CATEGORIES = collections.OrderedDict([
+    ("gender", [gender.value for gender in Gender]),
+    ("glasses", [glasses.value for glasses in GlassesType]),
+    ("blur_level", [level.value for level in BlurLevel]),
+    ("exposure_level", [level.value for level in ExposureLevel]),
+    ("noise_level", [level.value for level in NoiseLevel]),
+    ("eye_makeup", [False, True]),
+    ("lip_makeup", [False, True]),
+    ("eye_occluded", [False, True]),
+    ("forehead_occluded", [False, True]),
+    ("mouth_occluded", [False, True]),
+    ("hair_invisible", [False, True]),
+])
+ACCESSORIES = [accessory.value for accessory in AccessoryType]
+
+FACE_DTYPE = np.dtype([
+    ("image", "i4"),  # Index in FaceTable.images
+    ("face_id", "S36"),  # ASCII
+    ("left", "i4"), ("top", "i4"), ("width", "i4"), ("height", "i4"),
+    ("age", "f4"), ("smile", "f4"),
+    ("pitch", "f4"), ("roll", "f4"), ("yaw", "f4"),
+    ("moustache", "f4"), ("beard", "f4"), ("sideburns", "f4"),
+    ("emotion", "f4", (len(EMOTIONS),)),
+    ("hair_color", "f4", (len(HAIR_COLORS),)),
+    ("bald", "f4"),
+    ("blur", "f4"), ("exposure", "f4"), ("noise", "f4"),
+    ("accessories", "u1"),  # Bit i set for ACCESSORIES[i], MISSING if not returned
+] + [(name, "u1") for name in CATEGORIES])
+
+# Exported columns and their type: "string", "int", "float" or "bool"
+COLUMNS = collections.OrderedDict([
+    ("image", "string"), ("face_id", "string"),
+    ("left", "int"), ("top", "int"), ("width", "int"), ("height", "int"),
+    ("age", "float"), ("gender", "string"), ("smile", "float"), ("glasses", "string"),
+    ("pitch", "float"), ("roll", "float"), ("yaw", "float"),
+    ("moustache", "float"), ("beard", "float"), ("sideburns", "float"),
+    ("emotion", "string"),
+] + [("emotion_" + emotion, "float") for emotion in EMOTIONS] + [
+    ("hair", "string"), ("bald", "float"), ("hair_invisible", "bool"),
+    ("eye_makeup", "bool"), ("lip_makeup", "bool"),
+    ("blur", "float"), ("blur_level", "string"),
+    ("exposure", "float"), ("exposure_level", "string"),
+    ("noise", "float"), ("noise_level", "string"),
+    ("eye_occluded", "bool"), ("forehead_occluded", "bool"), ("mouth_occluded", "bool"),
+    ("accessories", "string"),
+])
+
+NAN = float("nan")
+
+
+def _lookup(values):
+    """Return an array mapping each code 0-255 to its value, None for unknown codes.
+    """
+    lookup = np.full(256, None, dtype=object)
+    lookup[:len(values)] = values
+    return lookup
+
+
+_LOOKUPS = {name: _lookup(values) for name, values in CATEGORIES.items()}
+_ACCESSORIES_LOOKUP = _lookup([
+    ",".join(accessory for bit, accessory in enumerate(ACCESSORIES) if mask & (1 << bit))
+    for mask in range(1 << len(ACCESSORIES))
+])
+
+
+def _value(value):
+    return getattr(value, "value", value)
+
+
+def _number(model, name):
+    value = getattr(model, name, None) if model is not None else None
+    return NAN if value is None else value
+
+
+def _code(name, value):
+    if value is None:
+        return MISSING
+    try:
+        return CATEGORIES[name].index(_value(value))
+    except ValueError:
+        return MISSING
+
+
+def _face_row(image_index, face):
+    attributes = face.face_attributes
+    get = lambda name: getattr(attributes, name, None) if attributes is not None else None
+    rectangle = face.face_rectangle
+    head_pose, facial_hair, emotion = get("head_pose"), get("facial_hair"), get("emotion")
+    hair, makeup, occlusion = get("hair"), get("makeup"), get("occlusion")
+    blur, exposure, noise, accessories = get("blur"), get("exposure"), get("noise"), get("accessories")
+
+    hair_colors = [NAN] * len(HAIR_COLORS)
+    if hair is not None:
+        hair_colors = [0.0] * len(HAIR_COLORS)
+        for hair_color in hair.hair_color or []:
+            if _value(hair_color.color) in HAIR_COLORS:
+                hair_colors[HAIR_COLORS.index(_value(hair_color.color))] = hair_color.confidence
+    accessory_mask = MISSING
+    if accessories is not None:
+        accessory_mask = 0
+        for accessory in accessories:
+            if _value(accessory.type) in ACCESSORIES:
+                accessory_mask |= 1 << ACCESSORIES.index(_value(accessory.type))
+
+    return (
+        image_index,
+        face.face_id or "",
+        rectangle.left, rectangle.top, rectangle.width, rectangle.height,
+        _number(attributes, "age"), _number(attributes, "smile"),
+        _number(head_pose, "pitch"), _number(head_pose, "roll"), _number(head_pose, "yaw"),
+        _number(facial_hair, "moustache"), _number(facial_hair, "beard"), _number(facial_hair, "sideburns"),
+        [_number(emotion, name) for name in EMOTIONS],
+        hair_colors,
+        _number(hair, "bald"),
+        _number(blur, "value"), _number(exposure, "value"), _number(noise, "value"),
+        accessory_mask,
+        _code("gender", get("gender")),
+        _code("glasses", get("glasses")),
+        _code("blur_level", getattr(blur, "blur_level", None)),
+        _code("exposure_level", getattr(exposure, "exposure_level", None)),
+        _code("noise_level", getattr(noise, "noise_level", None)),
+        _code("eye_makeup", getattr(makeup, "eye_makeup", None)),
+        _code("lip_makeup", getattr(makeup, "lip_makeup", None)),
+        _code("eye_occluded", getattr(occlusion, "eye_occluded", None)),
+        _code("forehead_occluded", getattr(occlusion, "forehead_occluded", None)),
+        _code("mouth_occluded", getattr(occlusion, "mouth_occluded", None)),
+        _code("hair_invisible", getattr(hair, "invisible", None)),
+    )
+
+
+def _nullable(column):
+    """Return a float column as an object array, NaN being None.
+
+    Values are rounded to 6 decimals, so that float32 0.87 exports as 0.87.
+    """
+    values = np.round(column.astype(np.float64), 6).astype(object)
+    values[np.isnan(column)] = None
+    return values
+
+
+class FaceTable(object):
+    """A batch of detected faces as a NumPy structured array of FACE_DTYPE rows.
+    """
+    __slots__ = ("images", "rows")
+
+    def __init__(self, images, rows):
+        self.images = images
+        self.rows = rows
+
+    @classmethod
+    def from_detections(cls, detections):
+        """Build a table from (image, DetectedFace list) pairs.
+        """
+        images, rows = [], []
+        for image, faces in detections:
+            rows.extend(_face_row(len(images), face) for face in faces)
+            images.append(image)
+        return cls(images, np.array(rows, dtype=FACE_DTYPE))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def dominant_emotions(self):
+        """Return the most likely emotion of each face, None if emotions were not returned.
+        """
+        emotions = self.rows["emotion"]
+        known = ~np.isnan(emotions).any(axis=1)
+        dominant = np.full(len(self.rows), None, dtype=object)
+        dominant[known] = np.array(EMOTIONS, dtype=object)[np.argmax(emotions[known], axis=1)]
+        return dominant
+
+    def dominant_hair_colors(self):
+        """Return the most likely hair color of each face, "bald" or "invisible" without hair color.
+        """
+        hair_colors = self.rows["hair_color"]
+        known = ~np.isnan(hair_colors).any(axis=1)
+        colored = known & (np.nan_to_num(hair_colors).max(axis=1) > 0)
+        dominant = np.full(len(self.rows), None, dtype=object)
+        dominant[colored] = np.array(HAIR_COLORS, dtype=object)[np.argmax(hair_colors[colored], axis=1)]
+        uncolored = known & ~colored
+        dominant[uncolored] = np.where(self.rows["hair_invisible"][uncolored] == 1, "invisible", "bald")
+        return dominant
+
+    def columns(self):
+        """Return an OrderedDict of the COLUMNS, as object arrays of plain values or None.
+        """
+        rows = self.rows
+        columns = collections.OrderedDict()
+        for name, kind in COLUMNS.items():
+            if name == "image":
+                columns[name] = np.array(self.images, dtype=object)[rows["image"]]
+            elif name == "face_id":
+                columns[name] = rows["face_id"].astype("U36").astype(object)
+            elif name == "emotion":
+                columns[name] = self.dominant_emotions()
+            elif name.startswith("emotion_"):
+                columns[name] = _nullable(rows["emotion"][:, EMOTIONS.index(name[len("emotion_"):])])
+            elif name == "hair":
+                columns[name] = self.dominant_hair_colors()
+            elif name == "accessories":
+                columns[name] = _ACCESSORIES_LOOKUP[rows["accessories"]]
+            elif name in CATEGORIES:
+                columns[name] = _LOOKUPS[name][rows[name]]
+            elif kind == "float":
+                columns[name] = _nullable(rows[name])
+            else:
+                columns[name] = rows[name].astype(object)
+        return columns
+
+    def records(self):
+        """Yield one dict per face, column name -> value.
+        """
+        columns = self.columns()
+        for values in zip(*(column.tolist() for column in columns.values())):
+            yield dict(zip(columns, values))
+
+
+def iter_tables(detections, batch_size=DEFAULT_BATCH_SIZE):
+    """Group (image, DetectedFace list) pairs into FaceTables of about batch_size faces.
+    """
+    batch, faces = [], 0
+    for image, detected_faces in detections:
+        batch.append((image, detected_faces))
+        faces += len(detected_faces)
+        if faces >= batch_size:
+            yield FaceTable.from_detections(batch)
+            batch, faces = [], 0
+    if batch:
+        yield FaceTable.from_detections(batch)
+
+
+def _parquet_schema():
+    types = {"string": pyarrow.string(), "int": pyarrow.int32(),
+             "float": pyarrow.float32(), "bool": pyarrow.bool_()}
+    return pyarrow.schema([(name, types[kind]) for name, kind in COLUMNS.items()])
+
+
+def export_face_attributes(detections, path, batch_size=DEFAULT_BATCH_SIZE):
+    """Write the attributes of (image, DetectedFace list) pairs to path, return the number of faces.
+
+    The format follows the extension: .csv, .parquet, or JSON lines
+    otherwise. detections may be a generator, it is consumed batch_size
+    faces at a time.
+    """
+    faces = 0
+    if path.endswith(".parquet"):
+        if pyarrow is None:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        schema = _parquet_schema()
+        with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+            for table in iter_tables(detections, batch_size):
+                writer.write_table(pyarrow.Table.from_pydict(
+                    {name: column.tolist() for name, column in table.columns().items()}, schema=schema))
+                faces += len(table)
+        return faces
+
+    with open(path, "w", newline="" if path.endswith(".csv") else None) as export_fd:
+        if path.endswith(".csv"):
+            writer = csv.writer(export_fd)
+            writer.writerow(list(COLUMNS))
+            for table in iter_tables(detections, batch_size):
+                writer.writerows(zip(*(column.tolist() for column in table.columns().values())))
+                faces += len(table)
+        else:
+            for table in iter_tables(detections, batch_size):
+                for record in table.records():
+                    export_fd.write(json.dumps(record) + "\n")
+                faces += len(table)
+    return faces
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect the faces of images and export their attributes.")
+    parser.add_argument("images", nargs="+", help="URLs or local paths of images")
+    parser.add_argument("--output", required=True, help="output file, .csv, .jsonl or .parquet")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--endpoint", default="https://{}.api.cognitive.microsoft.com".format(
+        os.environ.get("FACE_LOCATION", "westcentralus")))
+    options = parser.parse_args()
+
+    face_client = get_client(FaceClient, options.endpoint, os.environ["FACE_SUBSCRIPTION_KEY"])
+    failures = []
+
+    def detections():
+        for detection in detect_faces_batch(
+                face_client, options.images, options.workers, return_face_attributes=ALL_ATTRIBUTES):
+            if detection.error:
+                failures.append(detection)
+            else:
+                yield detection.image, detection.faces
+
+    faces = export_face_attributes(detections(), options.output, options.batch_size)
+    print("{} face(s) exported to {}, {} image(s) failed".format(faces, options.output, len(failures)))
+    for detection in failures:
+        print("    {}: {}".format(detection.image, detection.error))
+
+
+if __name__ == "__main__":
+    main()
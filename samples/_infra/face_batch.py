@@ -0,0 +1,102 @@
+"""Batch operations over the Face API.
+
+detect_faces_batch runs face detection over any number of images, URLs or
+local paths, in a bounded pool of threads:
+
+    for detection in detect_faces_batch(face_client, image_urls, return_face_attributes=["age"]):
+        if detection.error:
+            print("{} failed: {}".format(detection.image, detection.error))
+        else:
+            print("{} faces in {}".format(len(detection.faces), detection.image))
+
+identify_faces identifies any number of face ids against a person group,
+sending them in concurrent calls of at most 10 face ids, the service limit.
+
+The client should come from samples._infra.clients.get_client, so that the pool
+shares its connections and the rate limit of the subscription key.
+"""
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+from samples._infra.batching import DEFAULT_MAX_WORKERS, bounded_map, is_url
+
+IDENTIFY_MAX_FACE_IDS = 10
+
+BatchDetection = collections.namedtuple(
+    "BatchDetection", ["index", "image", "faces", "error"])
+
+
+def detect_faces(face_client, image, **detect_kwargs):
+    """Detect the faces of one image, an URL or a local path, return the DetectedFace list.
+    """
+    if is_url(image):
+        return face_client.face.detect_with_url(url=image, **detect_kwargs)
+    with open(image, "rb") as image_fd:
+        return face_client.face.detect_with_stream(image_fd, **detect_kwargs)
+
+
+def _detect(detect, face_client, index, image, detect_kwargs):
+    try:
+        return BatchDetection(index, image, detect(face_client, image, **detect_kwargs), None)
+    except Exception as err:  # Reported with the image, the batch goes on
+        return BatchDetection(index, image, [], err)
+
+
+def _deduplicated(detect, dedupe):
+    def detect_representative(face_client, image, **detect_kwargs):
+        return dedupe.call(
+            image, lambda representative: detect(face_client, representative, **detect_kwargs),
+            key=repr(sorted(detect_kwargs.items())))
+    return detect_representative
+
+
+def detect_faces_batch(face_client, images, max_workers=DEFAULT_MAX_WORKERS,
+                       ordered=True, cache=None, dedupe=None, **detect_kwargs):
+    """Detect the faces of every image, yielding a BatchDetection per image.
+
+    images is any iterable of URLs or local paths, consumed as the work goes
+    so that it can be a generator over a large directory. At most
+    max_workers detections run at once. Detections are yielded in input
+    order, or as they complete if ordered is False. A failed detection
+    yields its error instead of raising. detect_kwargs are passed to
+    detect_with_url or detect_with_stream. With a cache (a
+    samples._infra.face_cache.DetectionCache), images already detected are not
+    sent again. With dedupe (a samples._infra.image_dedupe.NearDuplicateFilter),
+    near-duplicate local images get the faces of the first one of them.
+    """
+    detect = cache.detect if cache is not None else detect_faces
+    if dedupe is not None:
+        detect = _deduplicated(detect, dedupe)
+    return bounded_map(
+        lambda indexed_image: _detect(detect, face_client, indexed_image[0], indexed_image[1], detect_kwargs),
+        enumerate(os.fspath(image) for image in images),
+        max_workers, ordered)
+
+
+def chunks(items, size):
+    """Split a list in lists of at most size items.
+    """
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def identify_faces(face_client, face_ids, max_workers=DEFAULT_MAX_WORKERS, **identify_kwargs):
+    """Identify any number of face ids, return an OrderedDict face_id -> candidates.
+
+    identify_kwargs are passed to face.identify, person_group_id or
+    large_person_group_id being required. Face ids are sent by groups of
+    IDENTIFY_MAX_FACE_IDS, at most max_workers groups at once. The mapping
+    follows the order of face_ids; faces matching nobody have an empty
+    candidate list. The first failed call raises its error.
+    """
+    face_ids = list(face_ids)
+    identified = collections.OrderedDict((face_id, []) for face_id in face_ids)
+    if not face_ids:
+        return identified
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for identify_results in executor.map(
+                lambda group: face_client.face.identify(face_ids=group, **identify_kwargs),
+                chunks(face_ids, IDENTIFY_MAX_FACE_IDS)):
+            for identify_result in identify_results:
+                identified[identify_result.face_id] = identify_result.candidates
+    return identified
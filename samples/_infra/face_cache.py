@@ -0,0 +1,205 @@
+"""Memoized face detection.
+
+Every detect call is billed, and the samples detect the same images over and
+over. detect_faces_cached answers a detection already made with the same
+client, image and parameters from memory:
+
+    detected_faces = detect_faces_cached(face_client, image_url, return_face_attributes=["age"])
+
+Images are keyed by URL, local images by the hash of their content. The
+service forgets a face_id 24 hours after its detection, so detections
+returning face ids are dropped from the cache an hour before that. The cache
+can be saved to a JSON file, to be reused by the next runs; set the
+FACE_DETECTION_CACHE_PATH env variable to load it at start and save it at
+exit.
+"""
+import atexit
+import collections
+from concurrent.futures import Future
+import hashlib
+import json
+import os
+import threading
+import time
+
+from azure.cognitiveservices.vision.face.models import DetectedFace
+
+from samples._infra.face_batch import detect_faces, is_url
+
+CACHE_PATH_ENV_NAME = "FACE_DETECTION_CACHE_PATH"
+FACE_ID_TTL = 24 * 3600
+EXPIRY_MARGIN = 3600
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def image_key(image):
+    """Return the URL of an image, or the SHA-256 of a local image content.
+    """
+    if is_url(image):
+        return image
+    digest = hashlib.sha256()
+    with open(image, "rb") as image_fd:
+        for chunk in iter(lambda: image_fd.read(1 << 16), b""):
+            digest.update(chunk)
+    return "sha256:" + digest.hexdigest()
+
+
+def client_key(face_client):
+    """Return an id of the endpoint and key of a client: face ids are only valid for them.
+    """
+    credentials = face_client.config.credentials
+    subscription_key = getattr(credentials, "in_headers", {}).get("Ocp-Apim-Subscription-Key", "")
+    return hashlib.sha256("{}\0{}".format(
+        face_client.config.endpoint, subscription_key).encode("utf-8")).hexdigest()[:16]
+
+
+def _parameter(value):
+    """Make FaceAttributeType.age and "age" the same parameter.
+    """
+    if isinstance(value, (list, tuple)):
+        return sorted(_parameter(item) for item in value)
+    return str(getattr(value, "value", value))
+
+
+def detection_key(face_client, image, detect_kwargs):
+    parameters = json.dumps(
+        {name: _parameter(value) for name, value in detect_kwargs.items()},
+        sort_keys=True
+    )
+    return "{} {} {}".format(client_key(face_client), image_key(image), parameters)
+
+
+class DetectionCache(object):
+    """LRU cache of detections, each one valid until its face ids expire.
+
+    Concurrent detections of the same image share a single call.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=FACE_ID_TTL - EXPIRY_MARGIN):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key -> (expiry, faces), least recently used first
+        # key -> expiry of the entries with face ids, soonest first: all live ttl seconds
+        self._expiries = collections.OrderedDict()
+        self._running = {}  # key -> Future
+        self.hits = self.misses = self.expired = 0
+
+    def detect(self, face_client, image, **detect_kwargs):
+        """Return the DetectedFace list of image, detecting it only if needed.
+        """
+        key = detection_key(face_client, image, detect_kwargs)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                self._remove(key)
+                self.expired += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            future = self._running.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = self._running[key] = Future()
+            else:
+                self.hits += 1
+        if not owner:
+            return future.result()
+
+        try:
+            faces = detect_faces(face_client, image, **detect_kwargs)
+        except Exception as err:
+            with self._lock:
+                del self._running[key]
+            future.set_exception(err)
+            raise
+        self._store(key, faces, detect_kwargs.get("return_face_id", True))
+        future.set_result(faces)
+        return faces
+
+    def _remove(self, key):
+        del self._entries[key]
+        self._expiries.pop(key, None)
+
+    def _evict(self):
+        """Drop the expired entries, then the least recently used ones past max_entries.
+        """
+        now = time.time()
+        while self._expiries and next(iter(self._expiries.values())) <= now:
+            del self._entries[self._expiries.popitem(last=False)[0]]
+            self.expired += 1
+        while len(self._entries) > self.max_entries:
+            self._expiries.pop(self._entries.popitem(last=False)[0], None)
+
+    def _store(self, key, faces, face_ids):
+        expiry = time.time() + self.ttl if face_ids else float("inf")
+        with self._lock:
+            del self._running[key]
+            self._entries[key] = (expiry, faces)
+            self._entries.move_to_end(key)
+            self._expiries.pop(key, None)
+            if face_ids:
+                self._expiries[key] = expiry
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expiries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+            }
+
+    def save(self, path):
+        """Save the detections still valid to a JSON file.
+        """
+        now = time.time()
+        with self._lock:
+            entries = [
+                [key, expiry if expiry != float("inf") else None,
+                 [face.serialize() for face in faces]]
+                for key, (expiry, faces) in self._entries.items() if expiry > now
+            ]
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as cache_fd:
+            json.dump(entries, cache_fd)
+        os.replace(temp_path, path)
+
+    def load(self, path):
+        """Load the detections saved by save, skipping the expired ones.
+        """
+        if not os.path.exists(path):
+            return
+        with open(path) as cache_fd:
+            entries = json.load(cache_fd)
+        now = time.time()
+        with self._lock:
+            for key, expiry, faces in entries:
+                expiry = float("inf") if expiry is None else expiry
+                if expiry > now:
+                    self._entries[key] = (expiry, [DetectedFace.deserialize(face) for face in faces])
+            self._expiries = collections.OrderedDict(sorted(
+                ((key, expiry) for key, (expiry, _) in self._entries.items() if expiry != float("inf")),
+                key=lambda item: item[1]))
+            self._evict()
+
+
+DETECTION_CACHE = DetectionCache()
+if os.environ.get(CACHE_PATH_ENV_NAME):
+    DETECTION_CACHE.load(os.environ[CACHE_PATH_ENV_NAME])
+    atexit.register(DETECTION_CACHE.save, os.environ[CACHE_PATH_ENV_NAME])
+
+
+def detect_faces_cached(face_client, image, **detect_kwargs):
+    """Detect the faces of an URL or local path, reusing a previous detection if still valid.
+    """
+    return DETECTION_CACHE.detect(face_client, image, **detect_kwargs)
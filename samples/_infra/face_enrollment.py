@@ -0,0 +1,235 @@
+"""Bulk enrollment of faces into a large person group, or a person group.
+
+A manifest maps each person name to its images, URLs or local paths, as
+JSON ({"Family1-Dad": ["Family1-Dad1.jpg", ...]}) or as CSV lines
+"person,image". Persons are created, then faces added, from a pool of
+threads; the group is trained once at the end, if anything was added.
+
+Each person created and each face added is appended to a journal (JSON
+lines). Enrolling again with the same journal skips what it records, so a
+run that crashed resumes where it stopped:
+
+    python -m samples._infra.face_enrollment manifest.csv --group my-group --journal my-group.jsonl
+
+The client should come from samples._infra.clients.get_client, so that the pool
+shares its connections and the rate limit of the subscription key.
+"""
+import argparse
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import json
+import os
+import threading
+
+from azure.cognitiveservices.vision.face import FaceClient
+from azure.cognitiveservices.vision.face.models import TrainingStatusType
+
+from samples._infra.clients import get_client
+from samples._infra.face_batch import DEFAULT_MAX_WORKERS, is_url
+from samples._infra.face_training import TRACKER, tracked_operations
+
+EnrollmentSummary = collections.namedtuple(
+    "EnrollmentSummary", ["persons_created", "faces_added", "faces_skipped", "failures", "training_status"])
+
+
+def load_manifest(path):
+    """Return an OrderedDict person name -> list of images from a JSON or CSV manifest.
+    """
+    with open(path) as manifest_fd:
+        if path.endswith(".json"):
+            return collections.OrderedDict(json.load(manifest_fd, object_pairs_hook=collections.OrderedDict))
+        manifest = collections.OrderedDict()
+        for row in csv.reader(manifest_fd):
+            if len(row) >= 2 and not row[0].startswith("#"):
+                manifest.setdefault(row[0].strip(), []).append(row[1].strip())
+        return manifest
+
+
+class EnrollmentJournal(object):
+    """Append-only JSON lines record of the persons created and faces added.
+
+    Without a path, the journal is only kept in memory.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.group_created = False
+        self.trained = False  # Trained since the last person or face added
+        self.person_ids = {}  # name -> person_id
+        self.faces = {}  # (name, image) -> persisted_face_id
+        self.failures = {}  # (name, image), image None for a person not created -> error message
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as journal_fd:
+                for line in journal_fd:
+                    try:
+                        self._apply(json.loads(line))
+                    except ValueError:
+                        pass  # Last line cut by a crash
+        self._journal_fd = open(path, "a") if path else None
+
+    def _apply(self, record):
+        if "trained" in record:
+            self.trained = True
+        elif "group" in record:
+            self.group_created = True
+        elif "person_id" in record and "image" not in record:
+            self.person_ids[record["person"]] = record["person_id"]
+            self.failures.pop((record["person"], None), None)
+            self.trained = False
+        elif "persisted_face_id" in record:
+            self.faces[record["person"], record["image"]] = record["persisted_face_id"]
+            self.failures.pop((record["person"], record["image"]), None)
+            self.trained = False
+        elif "error" in record:
+            self.failures[record["person"], record.get("image")] = record["error"]
+
+    def record(self, **record):
+        with self._lock:
+            self._apply(record)
+            if self._journal_fd:
+                self._journal_fd.write(json.dumps(record) + "\n")
+                self._journal_fd.flush()
+
+    def close(self):
+        if self._journal_fd:
+            self._journal_fd.close()
+
+
+class BulkEnrollment(object):
+    """Enroll the faces of a manifest into one group, concurrently and resumably.
+
+    With large=True (default) the group is a large person group, otherwise
+    a person group. The group is created if the journal does not know it.
+    """
+
+    def __init__(self, face_client, group_id, journal_path=None, large=True,
+                 max_workers=DEFAULT_MAX_WORKERS):
+        self.face_client = face_client
+        self.group_id = group_id
+        self.journal = EnrollmentJournal(journal_path)
+        self.max_workers = max_workers
+        self.kind = "large_person_group" if large else "person_group"
+        self.groups = getattr(face_client, self.kind)
+        self.persons = tracked_operations(face_client, self.kind)  # Mutations mark the group dirty
+        self.group_kwargs = {self.kind + "_id": group_id}
+        if self.journal.trained:
+            TRACKER.mark_trained(face_client, self.kind, group_id)
+
+    def _create_group(self):
+        if self.journal.group_created:
+            return  # Created by the run being resumed
+        self.groups.create(name=self.group_id, **self.group_kwargs)
+        self.journal.record(group=self.group_id)
+
+    def _create_person(self, name):
+        try:
+            person = self.persons.create(name=name, **self.group_kwargs)
+        except Exception as err:  # Journaled, the faces of the person are left for the next run
+            self.journal.record(person=name, error=str(err))
+            return False
+        self.journal.record(person=name, person_id=person.person_id)
+        return True
+
+    def _add_face(self, name, image):
+        person_id = self.journal.person_ids[name]
+        try:
+            if is_url(image):
+                face = self.persons.add_face_from_url(
+                    person_id=person_id, url=image, user_data=image, **self.group_kwargs)
+            else:
+                with open(image, "rb") as image_fd:
+                    face = self.persons.add_face_from_stream(
+                        person_id=person_id, image=image_fd,
+                        user_data=os.path.basename(image), **self.group_kwargs)
+        except Exception as err:  # Journaled, the enrollment goes on
+            self.journal.record(person=name, image=image, error=str(err))
+            return False
+        self.journal.record(person=name, image=image, persisted_face_id=face.persisted_face_id)
+        return True
+
+    def train(self):
+        """Train the group unless nothing changed since its last training, return the training status.
+        """
+        training_status = TRACKER.train(self.face_client, self.kind, self.group_id)
+        if training_status.status == TrainingStatusType.succeeded and not self.journal.trained:
+            self.journal.record(trained=self.group_id)
+        return training_status
+
+    def enroll(self, manifest, retry_failed=False, train=True):
+        """Enroll every face of manifest (person name -> images) not yet journaled.
+
+        Persons and faces that failed in a previous run are skipped unless
+        retry_failed; the faces of a person not created are not tried.
+        Return an EnrollmentSummary.
+        """
+        self._create_group()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            new_persons = [name for name in manifest if name not in self.journal.person_ids
+                           and (retry_failed or (name, None) not in self.journal.failures)]
+            persons_created = sum(executor.map(self._create_person, new_persons))
+
+            remaining = [
+                (name, image)
+                for name, images in manifest.items() for image in images
+                if (name, image) not in self.journal.faces
+                and (retry_failed or (name, image) not in self.journal.failures)
+            ]
+            pending = [(name, image) for name, image in remaining if name in self.journal.person_ids]
+            faces_added = sum(executor.map(lambda face: self._add_face(*face), pending))
+
+        training_status = self.train() if train else None
+        return EnrollmentSummary(
+            persons_created,
+            faces_added,
+            sum(len(images) for images in manifest.values()) - len(remaining),
+            dict(self.journal.failures),
+            training_status
+        )
+
+    def close(self):
+        self.journal.close()
+
+
+def enroll_faces(face_client, group_id, manifest, journal_path=None, large=True,
+                 max_workers=DEFAULT_MAX_WORKERS, retry_failed=False):
+    """Enroll a manifest (person name -> images) into a group and train it once.
+
+    Return an EnrollmentSummary.
+    """
+    enrollment = BulkEnrollment(face_client, group_id, journal_path, large, max_workers)
+    try:
+        return enrollment.enroll(manifest, retry_failed)
+    finally:
+        enrollment.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enroll the faces of a manifest into a large person group.")
+    parser.add_argument("manifest", help="JSON {person: [images]} or CSV person,image manifest")
+    parser.add_argument("--group", required=True, help="id of the group, created if needed")
+    parser.add_argument("--journal", help="journal file, to resume an interrupted enrollment")
+    parser.add_argument("--person-group", action="store_true",
+                        help="enroll into a person group instead of a large person group")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="retry the faces that failed in a previous run")
+    parser.add_argument("--endpoint", default="https://{}.api.cognitive.microsoft.com".format(
+        os.environ.get("FACE_LOCATION", "westcentralus")))
+    options = parser.parse_args()
+
+    face_client = get_client(FaceClient, options.endpoint, os.environ["FACE_SUBSCRIPTION_KEY"])
+    summary = enroll_faces(
+        face_client, options.group, load_manifest(options.manifest), options.journal,
+        not options.person_group, options.workers, options.retry_failed)
+    print("{} person(s) created, {} face(s) added, {} already done, {} failure(s)".format(
+        summary.persons_created, summary.faces_added, summary.faces_skipped, len(summary.failures)))
+    failures = sorted(summary.failures.items(), key=lambda failure: (failure[0][0], failure[0][1] or ""))
+    for (name, image), error in failures:
+        print("    {} {}: {}".format(name, image or "(person not created)", error))
+    print("Training status is {}".format(summary.training_status.status))
+
+
+if __name__ == "__main__":
+    main()
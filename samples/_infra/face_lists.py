@@ -0,0 +1,202 @@
+"""Face lists and large face lists with a local index of their faces.
+
+find_similar answers persisted face ids only; what they stand for is the
+user data given when the face was added. FaceListIndex keeps that mapping,
+persisted face id -> user data and source image, updated as faces are added
+and deleted, so that find-similar results resolve without listing the faces
+again:
+
+    face_list = FaceListIndex(face_client, face_list_id, large=True, index_path="faces.jsonl")
+    face_list.create()
+    face_list.add_faces(image_urls)
+    face_list.train()
+    for similar_result, face in face_list.find_similar(face_id):
+        print(face.user_data, similar_result.confidence)
+
+The index is journaled to index_path (JSON lines), if given, and loaded back
+by the next FaceListIndex of the same path; refresh rebuilds it from the
+service.
+"""
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import threading
+
+from samples._infra.face_batch import DEFAULT_MAX_WORKERS, is_url
+from samples._infra.face_training import TRACKER, tracked_operations
+
+LIST_FACES_PAGE_SIZE = 1000
+
+IndexedFace = collections.namedtuple("IndexedFace", ["persisted_face_id", "user_data", "image"])
+
+
+class FaceListIndex(object):
+    """A face list, or a large face list with large=True, and the index of its faces.
+
+    Adding and deleting faces is thread safe. With a train_delay, every
+    change of a large face list requests its training, the changes made
+    within train_delay seconds of each other sharing one training.
+    """
+
+    def __init__(self, face_client, face_list_id, large=False, index_path=None, train_delay=None):
+        self.face_client = face_client
+        self.face_list_id = face_list_id
+        self.large = large
+        self.index_path = index_path
+        self.train_delay = train_delay
+        self.kind = "large_face_list" if large else "face_list"
+        # Changes of a large face list mark it for training, its deletion forgets it
+        self.face_lists = tracked_operations(face_client, self.kind) if large else getattr(face_client, self.kind)
+        self.list_kwargs = {self.kind + "_id": face_list_id}
+        self._lock = threading.Lock()
+        self._faces = collections.OrderedDict()  # persisted_face_id -> IndexedFace
+        if index_path and os.path.exists(index_path):
+            with open(index_path) as index_fd:
+                for line in index_fd:
+                    try:
+                        self._apply(json.loads(line))
+                    except ValueError:
+                        pass  # Last line cut by a crash
+        self._index_fd = open(index_path, "a") if index_path else None
+
+    def _apply(self, record):
+        if "deleted" in record:
+            self._faces.pop(record["deleted"], None)
+        else:
+            self._faces[record["persisted_face_id"]] = IndexedFace(
+                record["persisted_face_id"], record.get("user_data"), record.get("image"))
+
+    def _record(self, **record):
+        with self._lock:
+            self._apply(record)
+            if self._index_fd:
+                self._index_fd.write(json.dumps(record) + "\n")
+                self._index_fd.flush()
+        if self.large and self.train_delay is not None:
+            TRACKER.request_training(self.face_client, self.kind, self.face_list_id, self.train_delay)
+
+    def __len__(self):
+        return len(self._faces)
+
+    def __contains__(self, persisted_face_id):
+        return persisted_face_id in self._faces
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._faces.values()))
+
+    def get(self, persisted_face_id):
+        """Return the IndexedFace of a persisted face id, or None if the index does not know it.
+        """
+        return self._faces.get(persisted_face_id)
+
+    def create(self, name=None, user_data=None, **create_kwargs):
+        self.face_lists.create(
+            name=name or self.face_list_id, user_data=user_data, **dict(self.list_kwargs, **create_kwargs))
+
+    def delete(self):
+        """Delete the list, and its index file.
+        """
+        self.face_lists.delete(**self.list_kwargs)
+        with self._lock:
+            self._faces.clear()
+            if self._index_fd:
+                self._index_fd.close()
+                self._index_fd = None
+                os.remove(self.index_path)
+
+    def add_face(self, image, user_data=None, **add_kwargs):
+        """Add the face of an URL or local path, return its persisted face id.
+
+        user_data defaults to the image URL or file name.
+        """
+        if is_url(image):
+            user_data = user_data if user_data is not None else image
+            face = self.face_lists.add_face_from_url(
+                url=image, user_data=user_data, **dict(self.list_kwargs, **add_kwargs))
+        else:
+            user_data = user_data if user_data is not None else os.path.basename(image)
+            with open(image, "rb") as image_fd:
+                face = self.face_lists.add_face_from_stream(
+                    image=image_fd, user_data=user_data, **dict(self.list_kwargs, **add_kwargs))
+        self._record(persisted_face_id=face.persisted_face_id, user_data=user_data, image=image)
+        return face.persisted_face_id
+
+    def add_faces(self, images, max_workers=DEFAULT_MAX_WORKERS, **add_kwargs):
+        """Add the faces of many images concurrently, return their persisted face ids in order.
+
+        images are URLs or local paths, or (image, user_data) pairs. The first
+        failed call raises its error, the faces already added staying indexed.
+        """
+        def add_face(image):
+            image, user_data = image if isinstance(image, tuple) else (image, None)
+            return self.add_face(image, user_data, **add_kwargs)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(add_face, images))
+
+    def delete_face(self, persisted_face_id):
+        self.face_lists.delete_face(persisted_face_id=persisted_face_id, **self.list_kwargs)
+        self._record(deleted=persisted_face_id)
+
+    def refresh(self):
+        """Rebuild the index from the faces of the service, return the number of faces.
+
+        The source image of a face the index did not know is None.
+        """
+        if self.large:
+            persisted_faces, start = [], None
+            while True:
+                page = self.face_lists.list_faces(start=start, top=LIST_FACES_PAGE_SIZE, **self.list_kwargs)
+                persisted_faces.extend(page)
+                if len(page) < LIST_FACES_PAGE_SIZE:
+                    break
+                start = page[-1].persisted_face_id
+        else:
+            persisted_faces = self.face_lists.get(**self.list_kwargs).persisted_faces or []
+        with self._lock:
+            images = {face_id: face.image for face_id, face in self._faces.items()}
+            self._faces = collections.OrderedDict(
+                (face.persisted_face_id,
+                 IndexedFace(face.persisted_face_id, face.user_data, images.get(face.persisted_face_id)))
+                for face in persisted_faces
+            )
+            self._compact()
+        return len(self._faces)
+
+    def _compact(self):
+        """Rewrite the index file with one line per face.
+        """
+        if not self._index_fd:
+            return
+        self._index_fd.close()
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w") as index_fd:
+            for face in self._faces.values():
+                index_fd.write(json.dumps(face._asdict()) + "\n")
+        os.replace(temp_path, self.index_path)
+        self._index_fd = open(self.index_path, "a")
+
+    def train(self, force=False):
+        """Train a large face list unless it did not change since its last training, return the training status.
+        """
+        if not self.large:
+            raise ValueError("Only large face lists are trained")
+        return TRACKER.train(self.face_client, self.kind, self.face_list_id, force)
+
+    def find_similar(self, face_id, **find_similar_kwargs):
+        """Find the faces of the list similar to face_id, return a list of (SimilarFace, IndexedFace).
+
+        The IndexedFace is None for a face the index does not know.
+        """
+        find_similar_kwargs[("large_face_list_id" if self.large else "face_list_id")] = self.face_list_id
+        similar_results = self.face_client.face.find_similar(face_id=face_id, **find_similar_kwargs)
+        return [(similar_result, self._faces.get(similar_result.persisted_face_id))
+                for similar_result in similar_results]
+
+    def close(self):
+        with self._lock:
+            if self._index_fd:
+                self._index_fd.close()
+                self._index_fd = None
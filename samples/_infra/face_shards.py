@@ -0,0 +1,198 @@
+"""Identification over a gallery sharded across several large person groups.
+
+A large person group holds a bounded number of persons, and the bigger it
+is, the longer it trains. ShardedPersonGroup spreads the persons of a
+gallery over K large person groups, placing each person by consistent
+hashing of its name. The shards are enrolled and trained in parallel, and a
+face is identified by querying every shard concurrently and merging their
+candidates by confidence:
+
+    gallery = ShardedPersonGroup(face_client, "gallery", shards=4)
+    gallery.enroll({"Family1-Dad": ["Family1-Dad1.jpg", ...], ...})
+    for face_id, candidates in gallery.identify(face_ids).items():
+        print(face_id, [(gallery.person_name(candidate), candidate.confidence) for candidate in candidates])
+
+Persons are never moved between shards, so the shard count of a gallery is
+fixed once it is enrolled: opened with another one, part of its persons
+would map to other shards and be enrolled there a second time. A journaled
+gallery records its layout and refuses to open with a different one; to
+change the shard count, delete the gallery and enroll it again.
+"""
+import bisect
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+
+from samples._infra.face_batch import DEFAULT_MAX_WORKERS, identify_faces
+from samples._infra.face_enrollment import BulkEnrollment
+from samples._infra.face_training import TRACKER
+
+DEFAULT_VIRTUAL_NODES = 64
+
+ShardCandidate = collections.namedtuple(
+    "ShardCandidate", ["person_id", "confidence", "large_person_group_id"])
+
+
+def _hash(value):
+    return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:16], 16)
+
+
+class HashRing(object):
+    """Consistent hashing of keys to shards, each shard owning virtual_nodes points of the ring.
+    """
+
+    def __init__(self, shards, virtual_nodes=DEFAULT_VIRTUAL_NODES):
+        points = sorted(
+            (_hash("{}#{}".format(shard, node)), shard)
+            for shard in shards for node in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard(self, key):
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._shards[index]
+
+
+def _check_layout(path, layout):
+    """Record the layout of a gallery in path, or raise ValueError if it records another one.
+    """
+    if os.path.exists(path):
+        with open(path) as layout_fd:
+            recorded = json.load(layout_fd)
+        if recorded != layout:
+            raise ValueError(
+                "Gallery journaled with {} shards and {} virtual nodes, not {} and {}: persons are not "
+                "moved between shards, delete the gallery to change them".format(
+                    recorded.get("shards"), recorded.get("virtual_nodes"),
+                    layout["shards"], layout["virtual_nodes"]))
+        return
+    with open(path, "w") as layout_fd:
+        json.dump(layout, layout_fd)
+
+
+class ShardedPersonGroup(object):
+    """A gallery of persons spread over shards large person groups "<group_id>-<index>".
+
+    With a journal_prefix, each shard journals its enrollment to
+    "<journal_prefix>-<index>.jsonl", so that an interrupted enrollment
+    resumes, and the names of the persons are known again to the next run.
+    The shard count and virtual nodes are recorded in
+    "<journal_prefix>-layout.json": opening the gallery again with other
+    ones raises ValueError.
+    """
+
+    def __init__(self, face_client, group_id, shards, journal_prefix=None,
+                 max_workers=DEFAULT_MAX_WORKERS, virtual_nodes=DEFAULT_VIRTUAL_NODES):
+        if journal_prefix:
+            _check_layout("{}-layout.json".format(journal_prefix),
+                          {"shards": shards, "virtual_nodes": virtual_nodes})
+        self.face_client = face_client
+        self.group_id = group_id
+        self.max_workers = max_workers
+        self.shard_ids = ["{}-{}".format(group_id, index) for index in range(shards)]
+        self.ring = HashRing(self.shard_ids, virtual_nodes)
+        self.enrollments = collections.OrderedDict(
+            (shard_id, BulkEnrollment(
+                face_client, shard_id,
+                "{}-{}.jsonl".format(journal_prefix, index) if journal_prefix else None,
+                max_workers=max_workers))
+            for index, shard_id in enumerate(self.shard_ids)
+        )
+        self._index_names()
+
+    def _index_names(self):
+        self._names = {
+            person_id: name
+            for enrollment in self.enrollments.values()
+            for name, person_id in enrollment.journal.person_ids.items()
+        }
+
+    def created_shards(self):
+        """Return the ids of the shards created so far, those that received persons.
+        """
+        return [shard_id for shard_id, enrollment in self.enrollments.items()
+                if enrollment.journal.group_created]
+
+    def _map_shards(self, function, shard_ids=None):
+        shard_ids = self.created_shards() if shard_ids is None else list(shard_ids)
+        with ThreadPoolExecutor(max_workers=len(shard_ids) or 1) as executor:
+            return collections.OrderedDict(zip(shard_ids, executor.map(function, shard_ids)))
+
+    def shard(self, name):
+        """Return the id of the large person group of a person.
+        """
+        return self.ring.shard(name)
+
+    def enroll(self, manifest, retry_failed=False):
+        """Enroll a manifest (person name -> images) into the shards in parallel, and train them.
+
+        Only the shards receiving persons are enrolled and trained. Return
+        an OrderedDict shard id -> EnrollmentSummary.
+        """
+        shard_manifests = collections.defaultdict(collections.OrderedDict)
+        for name, images in manifest.items():
+            shard_manifests[self.shard(name)][name] = images
+        summaries = self._map_shards(
+            lambda shard_id: self.enrollments[shard_id].enroll(shard_manifests[shard_id], retry_failed),
+            [shard_id for shard_id in self.shard_ids if shard_id in shard_manifests])
+        self._index_names()
+        return summaries
+
+    def train(self):
+        """Train every created shard in parallel, return an OrderedDict shard id -> training status.
+        """
+        return self._map_shards(lambda shard_id: self.enrollments[shard_id].train())
+
+    def identify(self, face_ids, max_num_of_candidates_returned=1, confidence_threshold=None):
+        """Identify face ids against every created shard, return an OrderedDict face_id -> ShardCandidate list.
+
+        Each shard is asked for its best max_num_of_candidates_returned
+        candidates; the merged list keeps the best of all shards, by
+        decreasing confidence.
+        """
+        face_ids = list(face_ids)
+        identify_kwargs = {"max_num_of_candidates_returned": max_num_of_candidates_returned}
+        if confidence_threshold is not None:
+            identify_kwargs["confidence_threshold"] = confidence_threshold
+        shard_results = self._map_shards(lambda shard_id: identify_faces(
+            self.face_client, face_ids, self.max_workers, large_person_group_id=shard_id, **identify_kwargs))
+
+        identified = collections.OrderedDict((face_id, []) for face_id in face_ids)
+        for shard_id, shard_identified in shard_results.items():
+            for face_id, candidates in shard_identified.items():
+                identified[face_id].extend(
+                    ShardCandidate(candidate.person_id, candidate.confidence, shard_id)
+                    for candidate in candidates)
+        for face_id, candidates in identified.items():
+            candidates.sort(key=lambda candidate: candidate.confidence, reverse=True)
+            del candidates[max_num_of_candidates_returned:]
+        return identified
+
+    def person_name(self, candidate):
+        """Return the name of the person of a ShardCandidate.
+
+        Persons enrolled by this gallery, or recorded in its journals, are
+        resolved locally, the others are fetched from their shard.
+        """
+        name = self._names.get(candidate.person_id)
+        if name is not None:
+            return name
+        return self.face_client.large_person_group_person.get(
+            large_person_group_id=candidate.large_person_group_id, person_id=candidate.person_id).name
+
+    def delete(self):
+        """Delete every created shard.
+        """
+        def delete(shard_id):
+            self.face_client.large_person_group.delete(large_person_group_id=shard_id)
+            TRACKER.forget(self.face_client, "large_person_group", shard_id)
+
+        self._map_shards(delete)
+
+    def close(self):
+        for enrollment in self.enrollments.values():
+            enrollment.close()
+
@@ -0,0 +1,252 @@
+"""Training of person groups, large person groups and large face lists, only when needed.
+
+Training is billed and takes minutes on large groups, yet a group that has
+not changed since its last successful training does not need it. The
+TrainingTracker counts the mutations of each group and trains it only if
+some happened since its last successful training:
+
+    persons = tracked_operations(face_client, "large_person_group")
+    person = persons.create(large_person_group_id=group_id, name="Dad")  # Marks the group dirty
+    persons.add_face_from_url(group_id, person.person_id, image_url)
+    training_status = train_if_dirty(face_client, "large_person_group", group_id)
+
+tracked_operations wraps the person operations of a group kind, or the
+large face list operations, and marks the group they name dirty after each
+mutation; mark_dirty records the mutations made by other means.
+
+A group the tracker never saw is dirty. request_training coalesces a burst
+of mutations into one training, started once no request came for a delay:
+
+    for image in images:
+        face_list.add_face(image)
+        TRACKER.request_training(face_client, "large_face_list", face_list_id)
+
+Groups are tracked per endpoint and subscription key.
+"""
+from concurrent.futures import Future
+import functools
+import threading
+import time
+
+from azure.cognitiveservices.vision.face.models import TrainingStatusType
+
+from samples._infra.face_cache import client_key
+from samples._infra.polling import poll_until_done
+
+TRAINABLE_KINDS = ("person_group", "large_person_group", "large_face_list")
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_MAX_DEBOUNCE_WAIT = 30.0
+# Operations changing what a training learns, on persons or on the faces of a large face list
+MUTATIONS = ("create", "delete", "add_face_from_url", "add_face_from_stream", "delete_face")
+
+
+def training_done(training_status):
+    return training_status.status in [TrainingStatusType.succeeded, TrainingStatusType.failed]
+
+
+class _GroupState(object):
+
+    def __init__(self):
+        self.training_lock = threading.Lock()  # One training of a group at a time
+        self.generation = 1  # Unknown groups are dirty
+        self.trained_generation = 0
+        self.training_status = None  # Of the last successful training
+        self.timer = None
+        self.future = None
+        self.first_request = None
+
+
+class TrainingTracker(object):
+    """Mutations and trainings of groups, to train only the groups that changed.
+
+    A debounced training starts debounce seconds after the last request, or
+    max_debounce_wait seconds after the first one if requests keep coming.
+    """
+
+    def __init__(self, debounce=DEFAULT_DEBOUNCE, max_debounce_wait=DEFAULT_MAX_DEBOUNCE_WAIT):
+        self.debounce = debounce
+        self.max_debounce_wait = max_debounce_wait
+        self._lock = threading.Lock()
+        self._states = {}  # (client key, kind, group id) -> _GroupState
+        self.trainings = self.skipped = self.coalesced = 0
+
+    def _state(self, face_client, kind, group_id):
+        if kind not in TRAINABLE_KINDS:
+            raise ValueError("{} is not trained, expected one of {}".format(kind, ", ".join(TRAINABLE_KINDS)))
+        key = (client_key(face_client), kind, group_id)
+        with self._lock:
+            return self._states.setdefault(key, _GroupState())
+
+    def mark_dirty(self, face_client, kind, group_id):
+        """Record a mutation of a group: its next training is needed.
+        """
+        state = self._state(face_client, kind, group_id)
+        with self._lock:
+            state.generation += 1
+
+    def mark_trained(self, face_client, kind, group_id, training_status=None):
+        """Record that a group is trained up to its last mutation, e.g. from a journal.
+        """
+        state = self._state(face_client, kind, group_id)
+        with self._lock:
+            state.trained_generation = state.generation
+            state.training_status = training_status
+
+    def is_dirty(self, face_client, kind, group_id):
+        state = self._state(face_client, kind, group_id)
+        with self._lock:
+            return state.trained_generation != state.generation
+
+    def forget(self, face_client, kind, group_id):
+        """Stop tracking a deleted group, cancelling its pending training.
+        """
+        key = (client_key(face_client), kind, group_id)
+        with self._lock:
+            state = self._states.pop(key, None)
+            if state is None or state.timer is None:
+                return
+            state.timer.cancel()
+            future, state.timer, state.future = state.future, None, None
+        future.cancel()
+
+    def train(self, face_client, kind, group_id, force=False):
+        """Train a group if dirty, or if force, and wait for the training to end.
+
+        Return the status of the training, or of the last successful one if
+        the group is clean. A pending debounced training is started now.
+        """
+        state = self._state(face_client, kind, group_id)
+        with self._lock:
+            timer, future, state.timer, state.future = state.timer, state.future, None, None
+        if timer is not None:
+            timer.cancel()
+        return self._resolve(future, self._train, face_client, kind, group_id, state, force)
+
+    def request_training(self, face_client, kind, group_id, delay=None):
+        """Train a group once no other request came for delay seconds, return a Future of the status.
+
+        Requests arriving while a training is pending share its Future.
+        """
+        delay = self.debounce if delay is None else delay
+        state = self._state(face_client, kind, group_id)
+        with self._lock:
+            now = time.time()
+            if state.future is None:
+                state.future, state.first_request = Future(), now
+            else:
+                self.coalesced += 1
+                state.timer.cancel()
+            delay = min(delay, max(0.0, state.first_request + self.max_debounce_wait - now))
+            timer = threading.Timer(
+                delay, lambda: self._fire(face_client, kind, group_id, state, timer))
+            timer.daemon = True
+            state.timer = timer
+            future = state.future
+        timer.start()
+        return future
+
+    def _fire(self, face_client, kind, group_id, state, timer):
+        with self._lock:
+            if state.timer is not timer:
+                return  # Superseded by a later request, or started by train
+            future, state.timer, state.future = state.future, None, None
+        self._resolve(future, self._train, face_client, kind, group_id, state, False)
+
+    @staticmethod
+    def _resolve(future, function, *args):
+        try:
+            result = function(*args)
+        except Exception as err:
+            if future is not None and future.set_running_or_notify_cancel():
+                future.set_exception(err)
+            raise
+        if future is not None and future.set_running_or_notify_cancel():
+            future.set_result(result)
+        return result
+
+    def _train(self, face_client, kind, group_id, state, force):
+        operations = getattr(face_client, kind)
+        group_kwargs = {kind + "_id": group_id}
+        with state.training_lock:
+            with self._lock:
+                generation = state.generation
+                clean = not force and state.trained_generation == generation
+                if clean:
+                    self.skipped += 1
+                else:
+                    self.trainings += 1
+            if clean:
+                if state.training_status is None:
+                    state.training_status = operations.get_training_status(**group_kwargs)
+                return state.training_status
+
+            operations.train(**group_kwargs)
+            training_status = poll_until_done(
+                lambda: operations.get_training_status(**group_kwargs), training_done)
+            if training_status.status == TrainingStatusType.succeeded:
+                with self._lock:
+                    # Mutations made while training keep the group dirty
+                    state.trained_generation = generation
+                    state.training_status = training_status
+            return training_status
+
+    def stats(self):
+        with self._lock:
+            return {
+                "groups": len(self._states),
+                "dirty": sum(state.trained_generation != state.generation for state in self._states.values()),
+                "trainings": self.trainings,
+                "skipped": self.skipped,
+                "coalesced": self.coalesced,
+            }
+
+
+TRACKER = TrainingTracker()
+
+
+class TrackedOperations(object):
+    """The person operations of a person group kind, or the large face list operations, tracked.
+
+    Attributes are those of the wrapped operations; the MUTATIONS mark the
+    group named by their first argument dirty, even when they raise, as the
+    service may have applied a call whose response was lost. Deleting a
+    large face list forgets it instead.
+    """
+
+    def __init__(self, face_client, kind, tracker=None):
+        if kind not in TRAINABLE_KINDS:
+            raise ValueError("{} is not trained, expected one of {}".format(kind, ", ".join(TRAINABLE_KINDS)))
+        self.face_client = face_client
+        self.kind = kind
+        self.tracker = tracker
+        self.operations = getattr(face_client, kind if kind == "large_face_list" else kind + "_person")
+
+    def __getattr__(self, name):
+        operation = getattr(self.operations, name)
+        if name not in MUTATIONS:
+            return operation
+
+        @functools.wraps(operation)
+        def mutation(*args, **kwargs):
+            group_id = kwargs[self.kind + "_id"] if self.kind + "_id" in kwargs else args[0]
+            tracker = self.tracker or TRACKER
+            try:
+                return operation(*args, **kwargs)
+            finally:
+                if self.kind == "large_face_list" and name == "delete":
+                    tracker.forget(self.face_client, self.kind, group_id)
+                else:
+                    tracker.mark_dirty(self.face_client, self.kind, group_id)
+        return mutation
+
+
+def tracked_operations(face_client, kind):
+    """Return the person operations of a group kind, or the large face list operations, marking groups dirty.
+    """
+    return TrackedOperations(face_client, kind)
+
+
+def train_if_dirty(face_client, kind, group_id, force=False):
+    """Train a person group, large person group or large face list unless it is clean, return the training status.
+    """
+    return TRACKER.train(face_client, kind, group_id, force)
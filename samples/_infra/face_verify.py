@@ -0,0 +1,137 @@
+"""Pairwise face verification.
+
+Verification is symmetric: verifying (a, b) tells as much as (b, a). The
+VerifyCache keeps each unordered pair once, until its face ids expire or
+it holds too many pairs, and verify_matrix fills the upper triangle of the N x N confidence matrix of a
+list of faces, sending the pairs it does not know concurrently:
+
+    confidences = verify_matrix(face_client, face_ids)
+    labels = cluster_faces(confidences, threshold=0.5)
+
+Faces with the same label are, transitively, the same person.
+"""
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from samples._infra.face_batch import DEFAULT_MAX_WORKERS
+from samples._infra.face_cache import EXPIRY_MARGIN, FACE_ID_TTL
+
+DEFAULT_MAX_PAIRS = 100000  # The matrix of about 450 faces
+
+
+class VerifyCache(object):
+    """Verify results by unordered pair of face ids, valid until the face ids expire.
+
+    Every pair lives ttl seconds, so the pairs are kept in the order they
+    were stored, which is also their expiry order: expired pairs are dropped
+    from the front on every put, then the soonest to expire beyond max_pairs.
+    """
+
+    def __init__(self, ttl=FACE_ID_TTL - EXPIRY_MARGIN, max_pairs=DEFAULT_MAX_PAIRS):
+        self.ttl = ttl
+        self.max_pairs = max_pairs
+        self._lock = threading.Lock()
+        # (face_id, face_id) sorted -> (expiry, VerifyResult), soonest to expire first
+        self._results = collections.OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def pair(face_id1, face_id2):
+        return (face_id1, face_id2) if face_id1 <= face_id2 else (face_id2, face_id1)
+
+    def get(self, face_id1, face_id2):
+        pair = self.pair(face_id1, face_id2)
+        with self._lock:
+            entry = self._results.get(pair)
+            if entry is None or entry[0] <= time.time():
+                self._results.pop(pair, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(self, face_id1, face_id2, verify_result):
+        pair = self.pair(face_id1, face_id2)
+        with self._lock:
+            self._results.pop(pair, None)  # Stored again at the end, with its new expiry
+            self._results[pair] = (time.time() + self.ttl, verify_result)
+            self._purge()
+            while len(self._results) > self.max_pairs:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+    def _purge(self):
+        now = time.time()
+        while self._results and next(iter(self._results.values()))[0] <= now:
+            self._results.popitem(last=False)
+
+    def purge(self):
+        """Drop the results of expired face ids.
+        """
+        with self._lock:
+            self._purge()
+
+    def stats(self):
+        with self._lock:
+            return {"pairs": len(self._results), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions}
+
+
+VERIFY_CACHE = VerifyCache()
+
+
+def verify_faces_cached(face_client, face_id1, face_id2, cache=VERIFY_CACHE):
+    """Return the VerifyResult of two face ids, verifying them only if the pair is unknown.
+    """
+    verify_result = cache.get(face_id1, face_id2)
+    if verify_result is None:
+        verify_result = face_client.face.verify_face_to_face(face_id1=face_id1, face_id2=face_id2)
+        cache.put(face_id1, face_id2, verify_result)
+    return verify_result
+
+
+def verify_matrix(face_client, face_ids, max_workers=DEFAULT_MAX_WORKERS, cache=VERIFY_CACHE):
+    """Return the symmetric N x N NumPy matrix of verification confidences of face_ids.
+
+    Only the N * (N - 1) / 2 pairs of the upper triangle are verified, the
+    ones missing from the cache concurrently. The diagonal is 1.
+    """
+    face_ids = list(face_ids)
+    confidences = np.eye(len(face_ids))
+    pairs = list(itertools.combinations(range(len(face_ids)), 2))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        verify_results = executor.map(
+            lambda pair: verify_faces_cached(face_client, face_ids[pair[0]], face_ids[pair[1]], cache),
+            pairs)
+        for (row, column), verify_result in zip(pairs, verify_results):
+            confidences[row, column] = confidences[column, row] = verify_result.confidence
+    return confidences
+
+
+def cluster_faces(confidences, threshold):
+    """Group faces whose confidence reaches threshold, transitively, with a union-find.
+
+    Return a NumPy array of labels, the label of a face being the index of
+    the first face of its group.
+    """
+    parents = np.arange(len(confidences))
+
+    def find(index):
+        root = index
+        while parents[root] != root:
+            root = parents[root]
+        while parents[index] != root:  # Path compression
+            parents[index], index = root, parents[index]
+        return root
+
+    rows, columns = np.nonzero(np.triu(confidences >= threshold, k=1))
+    for row, column in zip(rows, columns):
+        root1, root2 = find(row), find(column)
+        if root1 != root2:
+            parents[max(root1, root2)] = min(root1, root2)
+    return np.array([find(index) for index in range(len(confidences))])
@@ -0,0 +1,231 @@
+"""Near-duplicate image filter, to send one image of each group of look-alikes.
+
+Photo batches hold burst shots and re-uploads of the same picture, each one
+a billed call returning the same answer. NearDuplicateFilter hashes local
+images with a perceptual hash (dHash by default, or pHash), finds the images
+within max_distance bits of an image already seen with a BK-tree, and calls
+the service once per group, sharing the representative's result with its
+duplicates:
+
+    duplicates = NearDuplicateFilter()
+    for path in paths:
+        analysis = duplicates.call(path, analyze_path)
+
+detect_faces_batch takes a filter as dedupe. Only local paths are hashed;
+URLs are never considered duplicates. The result of a duplicate is the
+result of its representative: rectangles and face ids are those of the
+representative image.
+"""
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+
+import numpy as np
+from PIL import Image
+
+from samples._infra.batching import DEFAULT_MAX_WORKERS, is_url
+
+HASH_SIZE = 16  # 256 bits hashes, 64 bits merge distinct shots of plain backgrounds
+DEFAULT_MAX_DISTANCE = 12
+DEFAULT_MAX_ENTRIES = 10000
+
+DedupedResult = collections.namedtuple(
+    "DedupedResult", ["index", "image", "representative", "result", "error"])
+
+
+def _grayscale(image, size):
+    """Return an image path, stream or PIL image as a float array of size (width, height).
+
+    A PIL image is left open, it belongs to the caller.
+    """
+    if isinstance(image, Image.Image):
+        return np.asarray(image.convert("L").resize(size, Image.LANCZOS), dtype=np.float64)
+    with Image.open(image) as opened:
+        return np.asarray(opened.convert("L").resize(size, Image.LANCZOS), dtype=np.float64)
+
+
+def _to_int(bits):
+    return int(np.packbits(bits.ravel()).tobytes().hex(), 16)
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """Difference hash: whether each pixel is brighter than its right neighbor, on a small grayscale.
+    """
+    pixels = _grayscale(image, (hash_size + 1, hash_size))
+    return _to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def _dct_matrix(size):
+    rows, columns = np.meshgrid(np.arange(size), np.arange(size), indexing="ij")
+    matrix = np.cos(np.pi * (2 * columns + 1) * rows / (2.0 * size)) * np.sqrt(2.0 / size)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+def phash(image, hash_size=HASH_SIZE, highfreq_factor=4):
+    """Perceptual hash: the low frequencies of the DCT of a small grayscale, against their median.
+
+    Slower than dhash, more robust to contrast and gamma changes.
+    """
+    size = hash_size * highfreq_factor
+    pixels = _grayscale(image, (size, size))
+    dct = _dct_matrix(size)
+    low_frequencies = (dct.dot(pixels).dot(dct.T))[:hash_size, :hash_size]
+    return _to_int(low_frequencies > np.median(low_frequencies.ravel()[1:]))  # Without the DC term
+
+
+def hamming(hash1, hash2):
+    return bin(hash1 ^ hash2).count("1")
+
+
+class BKTree(object):
+    """Burkhard-Keller tree of hashes under the Hamming distance.
+
+    A search for the hashes within d of a hash only visits the children at
+    distance [k - d, k + d] of each node, k being the distance to the node.
+    """
+
+    def __init__(self):
+        self._root = None  # [hash, item, {distance: child}]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, hash_value, item):
+        self._size += 1
+        if self._root is None:
+            self._root = [hash_value, item, {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(hash_value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [hash_value, item, {}]
+                return
+            node = child
+
+    def search(self, hash_value, max_distance):
+        """Return the (distance, item) within max_distance of hash_value, nearest first.
+        """
+        found = []
+        nodes = [self._root] if self._root is not None else []
+        while nodes:
+            node = nodes.pop()
+            distance = hamming(hash_value, node[0])
+            if distance <= max_distance:
+                found.append((distance, node[1]))
+            nodes.extend(child for child_distance, child in node[2].items()
+                         if distance - max_distance <= child_distance <= distance + max_distance)
+        found.sort(key=lambda distance_item: distance_item[0])
+        return found
+
+
+class NearDuplicateFilter(object):
+    """Group local images within max_distance bits of each other, call a function once per group.
+
+    The first image of a group is its representative. Thread safe: the
+    duplicates of an image being processed wait for its result.
+
+    The hash of every representative is kept, a few dozen bytes each, so
+    that any later look-alike is found. The representatives of the images
+    seen and the results of the calls are kept for the max_entries most
+    recently used each: an image evicted is hashed again, a result evicted
+    is computed again by the next duplicate asking for it.
+    """
+
+    def __init__(self, max_distance=DEFAULT_MAX_DISTANCE, hash_function=dhash, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_distance = max_distance
+        self.hash_function = hash_function
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._tree = BKTree()
+        self._representatives = collections.OrderedDict()  # image -> representative, least recently used first
+        self._results = collections.OrderedDict()  # (representative, key) -> Future, least recently used first
+        self.images = self.duplicates = 0
+
+    def _remember(self, entries, key, value):
+        """Store key in an LRU dict, with the lock held.
+        """
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def representative(self, image):
+        """Return the representative of an image, the image itself if it looks like no other one.
+        """
+        if is_url(image):
+            return image
+        with self._lock:
+            if image in self._representatives:
+                self._representatives.move_to_end(image)
+                return self._representatives[image]
+        hash_value = self.hash_function(image)
+        with self._lock:
+            representative = self._representatives.get(image)
+            if representative is None:
+                self.images += 1
+                found = self._tree.search(hash_value, self.max_distance)
+                if found:
+                    self.duplicates += 1
+                    representative = found[0][1]
+                else:
+                    self._tree.add(hash_value, image)
+                    representative = image
+            self._remember(self._representatives, image, representative)
+            return representative
+
+    def call(self, image, function, key=None):
+        """Return function(representative of image), calling it once per representative and key.
+
+        key tells apart calls of different functions or parameters on the
+        same filter. A failed call raises its error for the whole group.
+        """
+        representative = self.representative(image)
+        with self._lock:
+            future = self._results.get((representative, key))
+            owner = future is None
+            if owner:
+                future = Future()
+            self._remember(self._results, (representative, key), future)
+        if not owner:
+            return future.result()
+        try:
+            result = function(representative)
+        except Exception as err:
+            future.set_exception(err)
+            raise
+        future.set_result(result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "images": self.images,
+                "duplicates": self.duplicates,
+                "representatives": len(self._tree),
+            }
+
+
+def map_deduplicated(function, images, max_workers=DEFAULT_MAX_WORKERS,
+                     max_distance=DEFAULT_MAX_DISTANCE, hash_function=dhash):
+    """Apply function to the representatives of images concurrently, return a DedupedResult list.
+
+    Results follow the order of images; a failed call is reported as the
+    error of every image of its group.
+    """
+    images = list(images)
+    duplicates = NearDuplicateFilter(max_distance, hash_function)
+
+    def apply(index, image):
+        representative = image
+        try:
+            representative = duplicates.representative(image)
+            return DedupedResult(index, image, representative, duplicates.call(image, function), None)
+        except Exception as err:  # Reported with the image, the batch goes on
+            return DedupedResult(index, image, representative, None, err)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(apply, range(len(images)), images))
@@ -0,0 +1,239 @@
+"""Client-side normalization of images before upload.
+
+A 12 megapixel phone photo is a 4-8 MB upload, while the services work at a
+fraction of that resolution and reject large files. normalize_image turns an
+image into the bytes worth sending to a service:
+
+    - rotated upright from its EXIF orientation, then stripped of EXIF (GPS
+      position included),
+    - downscaled so that its long side fits the useful resolution of the
+      service,
+    - re-encoded, as a PNG if it was one and still fits, else as a JPEG,
+      lowering the quality then the resolution until it fits the size
+      limit of the service.
+
+An image that cannot meet the limits of the service (too small, too large to
+decode, not an image) raises ImageRejected locally, without spending a call.
+Images already fitting, JPEGs and PNGs without EXIF, are sent as they are.
+Normalized images are cached by the hash of their source bytes, in memory,
+and on disk if NORMALIZED_IMAGES_CACHE_DIR is set:
+
+    with open_normalized(image_path, "vision") as image_fd:
+        computervision_client.analyze_image_in_stream(image_fd)
+
+Coordinates returned for a downscaled image are in the downscaled pixels:
+normalize_image_scaled also returns the scale, to divide them by. Face
+images are not downscaled to a target resolution, their rectangles and
+landmarks are in the pixels of the source unless it is past the limits.
+The services returning fractions of the image size are not affected.
+"""
+import collections
+import hashlib
+import io
+import os
+import tempfile
+import threading
+
+from PIL import Image, ImageOps
+
+CACHE_DIR_ENV_NAME = "NORMALIZED_IMAGES_CACHE_DIR"
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+DEFAULT_QUALITY = 85
+MIN_QUALITY = 50
+
+PASSTHROUGH_FORMATS = ("JPEG", "PNG")  # Sent as they are when they fit
+
+ImageLimits = collections.namedtuple(
+    "ImageLimits", ["max_bytes", "min_side", "max_side", "target_side"])
+# scale is the long side of data over the long side of the source image
+NormalizedImage = collections.namedtuple("NormalizedImage", ["data", "scale"])
+
+# target_side is the long side worth sending, None to keep the resolution up to max_side
+LIMITS = {
+    "vision": ImageLimits(4 * 1024 * 1024, 50, 10000, 2048),
+    "ocr": ImageLimits(4 * 1024 * 1024, 50, 4200, None),  # Small print needs every pixel
+    "read": ImageLimits(20 * 1024 * 1024, 50, 10000, None),
+    "face": ImageLimits(6 * 1024 * 1024, 36, 4096, None),  # Rectangles and landmarks in source pixels
+    "bing": ImageLimits(1024 * 1024, 50, 1500, 1500),
+    "customvision": ImageLimits(4 * 1024 * 1024, 64, 10240, 1024),
+}
+
+
+class ImageRejected(ValueError):
+    """The image cannot be sent within the limits of the service."""
+
+
+def _source_bytes(source):
+    if isinstance(source, bytes):
+        return source
+    if hasattr(source, "read"):
+        return source.read()
+    with open(source, "rb") as source_fd:
+        return source_fd.read()
+
+
+def _encode(image, image_format, quality=None):
+    buffer = io.BytesIO()
+    if image_format == "PNG":
+        image.save(buffer, "PNG", optimize=True)
+    else:
+        image.save(buffer, "JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _scale(data, source_data):
+    with Image.open(io.BytesIO(data)) as image, Image.open(io.BytesIO(source_data)) as source:  # Headers only
+        return max(image.size) / float(max(source.size))
+
+
+def normalize_bytes(data, limits, quality=DEFAULT_QUALITY):
+    """Return the NormalizedImage of an encoded image, see the module documentation.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except Image.DecompressionBombError as err:  # Not an OSError, raised past twice Image.MAX_IMAGE_PIXELS
+        raise ImageRejected("Image too large to decode: {}".format(err))
+    except (IOError, OSError, SyntaxError) as err:
+        raise ImageRejected("Not a readable image: {}".format(err))
+    if min(image.size) < limits.min_side:
+        raise ImageRejected("Image of {}x{} pixels, the service needs at least {} pixels a side".format(
+            image.width, image.height, limits.min_side))
+
+    target_side = min(limits.target_side or limits.max_side, limits.max_side)
+    if (image.format in PASSTHROUGH_FORMATS and not image.info.get("exif") and len(data) <= limits.max_bytes
+            and max(image.size) <= target_side):
+        return NormalizedImage(data, 1.0)  # Nothing to gain by re-encoding
+    source_format, source_size = image.format, image.size
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[-1])
+            image = background
+        else:
+            image = image.convert("RGB")
+    if max(image.size) > target_side:
+        image.thumbnail((target_side, target_side), Image.LANCZOS)
+
+    qualities = list(range(quality, MIN_QUALITY, -10)) + [min(quality, MIN_QUALITY)]
+    while True:
+        if source_format == "PNG":
+            encoded = _encode(image, "PNG")  # Lossless first, text and line art suffer from JPEG
+            if len(encoded) <= limits.max_bytes:
+                return NormalizedImage(encoded, max(image.size) / float(max(source_size)))
+        for attempt_quality in qualities:
+            encoded = _encode(image, "JPEG", attempt_quality)
+            if len(encoded) <= limits.max_bytes:
+                return NormalizedImage(encoded, max(image.size) / float(max(source_size)))
+        width, height = image.width * 3 // 4, image.height * 3 // 4
+        if min(width, height) < limits.min_side:
+            raise ImageRejected("Image cannot fit in {} bytes".format(limits.max_bytes))
+        image = image.resize((width, height), Image.LANCZOS)
+
+
+class ImageNormalizer(object):
+    """normalize_bytes with a cache of NormalizedImage keyed by source hash, service and quality.
+
+    The memory cache holds at most max_size bytes, least recently used
+    evicted first; with a directory, normalized images are also kept there
+    across runs.
+    """
+
+    def __init__(self, directory=None, max_size=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key -> NormalizedImage
+        self.size = 0
+        self.hits = self.misses = 0
+        self.bytes_in = self.bytes_out = 0
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".img")
+
+    def _get(self, key, data):
+        with self._lock:
+            normalized = self._entries.get(key)
+            if normalized is not None:
+                self._entries.move_to_end(key)
+                return normalized
+        if self.directory and os.path.exists(self._path(key)):
+            with open(self._path(key), "rb") as cached_fd:
+                cached = cached_fd.read()
+            normalized = NormalizedImage(cached, _scale(cached, data))
+            self._put(key, normalized)
+            return normalized
+        return None
+
+    def _put(self, key, normalized):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = normalized
+            self.size += len(normalized.data)
+            while self.size > self.max_size and self._entries:
+                self.size -= len(self._entries.popitem(last=False)[1].data)
+
+    def normalize(self, source, service="vision", quality=DEFAULT_QUALITY):
+        """Return the NormalizedImage of a path, file object or bytes for a service of LIMITS.
+        """
+        data = _source_bytes(source)
+        key = "{}-{}-{}".format(hashlib.sha256(data).hexdigest(), service, quality)
+        normalized = self._get(key, data)
+        with self._lock:
+            if normalized is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if normalized is None:
+            normalized = normalize_bytes(data, LIMITS[service], quality)
+            self._put(key, normalized)
+            if self.directory:
+                fd, temp_path = tempfile.mkstemp(dir=self.directory)
+                with os.fdopen(fd, "wb") as cached_fd:
+                    cached_fd.write(normalized.data)
+                os.replace(temp_path, self._path(key))
+        with self._lock:
+            self.bytes_in += len(data)
+            self.bytes_out += len(normalized.data)
+        return normalized
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+            }
+
+
+NORMALIZER = ImageNormalizer(os.environ.get(CACHE_DIR_ENV_NAME) or None)
+
+
+def normalize_image(source, service="vision", quality=DEFAULT_QUALITY):
+    """Return the bytes to upload for an image path, file object or bytes, see LIMITS for services.
+    """
+    return NORMALIZER.normalize(source, service, quality).data
+
+
+def normalize_image_scaled(source, service="vision", quality=DEFAULT_QUALITY):
+    """Return the bytes to upload for an image and their scale, as a NormalizedImage.
+
+    Divide the pixel coordinates the service returns by scale to place them
+    on the source image.
+    """
+    return NORMALIZER.normalize(source, service, quality)
+
+
+def open_normalized(source, service="vision", quality=DEFAULT_QUALITY):
+    """Return the normalized image as a file object, for the *_in_stream calls.
+    """
+    return io.BytesIO(normalize_image(source, service, quality))
@@ -0,0 +1,256 @@
+"""Per-operation metrics of the SDK clients.
+
+instrument(client) adds a policy in front of the msrest pipeline of a client.
+For every call it records, by operation name (FaceOperations.detect_with_url,
+ComputerVisionClient.analyze_image, ...):
+
+- the latency up to the response headers, retries and rate limiter waits
+  included, in a log-linear histogram,
+- the response status codes,
+- the retries made by requests and by the rate limiter,
+- the request and response sizes.
+
+Clients handed out by samples._infra.clients.get_client are instrumented already.
+Much lighter than DEBUG logging, it can be left on; the metrics are exported
+as JSON or in the Prometheus text format:
+
+    export_metrics("metrics.prom")
+"""
+import collections
+import json
+import re
+import sys
+import threading
+import timeit
+
+from msrest.pipeline import HTTPPolicy, Pipeline
+
+PROMETHEUS_PREFIX = "cognitive_services"
+QUANTILES = [0.5, 0.9, 0.99]
+
+
+class Histogram(object):
+    """Log-linear histogram of positive integers, in the spirit of HdrHistogram.
+
+    Values below 2**sub_bucket_bits are counted exactly, larger ones in
+    buckets of the same relative width, so that any recorded value is known
+    within 2**(1 - sub_bucket_bits) (1.6% by default) whatever its magnitude.
+    """
+
+    def __init__(self, sub_bucket_bits=7):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts = collections.Counter()
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, value):
+        shift = max(0, value.bit_length() - self.sub_bucket_bits)
+        return shift, value >> shift
+
+    def record(self, value):
+        value = max(0, int(value))
+        self.counts[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def value_at_quantile(self, quantile):
+        """Return the middle of the bucket holding the given quantile, 0 if empty.
+        """
+        if not self.count:
+            return 0
+        rank = max(1, int(round(quantile * self.count)))
+        seen = 0
+        for shift, sub_bucket in sorted(self.counts, key=lambda bucket: bucket[1] << bucket[0]):
+            seen += self.counts[shift, sub_bucket]
+            if seen >= rank:
+                middle = (sub_bucket << shift) + ((1 << shift) >> 1)
+                return min(max(middle, self.min), self.max)
+        return self.max
+
+    def to_dict(self, scale=1.0):
+        summary = {
+            "count": self.count,
+            "sum": self.total * scale,
+            "min": (self.min or 0) * scale,
+            "max": (self.max or 0) * scale,
+        }
+        for quantile in QUANTILES:
+            summary["p{:g}".format(quantile * 100)] = self.value_at_quantile(quantile) * scale
+        return summary
+
+
+class OperationMetrics(object):
+
+    def __init__(self):
+        self.latency = Histogram()  # microseconds
+        self.request_size = Histogram()
+        self.response_size = Histogram()
+        self.status_codes = collections.Counter()
+        self.retries = 0
+
+    def to_dict(self):
+        return {
+            "latency_seconds": self.latency.to_dict(scale=1e-6),
+            "request_bytes": self.request_size.to_dict(),
+            "response_bytes": self.response_size.to_dict(),
+            "status_codes": {str(status): count for status, count in self.status_codes.items()},
+            "retries": self.retries,
+        }
+
+
+class MetricsRegistry(object):
+    """Metrics of every operation of every instrumented client.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = collections.defaultdict(OperationMetrics)
+
+    def record(self, operation, elapsed, status, retries=0, request_size=0, response_size=0):
+        """Record a call of operation, elapsed being in seconds.
+        """
+        with self._lock:
+            metrics = self._operations[operation]
+            metrics.latency.record(elapsed * 1e6)
+            metrics.request_size.record(request_size)
+            metrics.response_size.record(response_size)
+            metrics.status_codes[status] += 1
+            metrics.retries += retries
+
+    def clear(self):
+        with self._lock:
+            self._operations.clear()
+
+    def to_json(self):
+        with self._lock:
+            return {name: metrics.to_dict()
+                    for name, metrics in sorted(self._operations.items())}
+
+    def to_prometheus(self):
+        """Return the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        operations = self.to_json()
+        for name, help_text, key in [
+                ("request_duration_seconds", "Latency up to the response headers.", "latency_seconds"),
+                ("request_bytes", "Size of the request bodies.", "request_bytes"),
+                ("response_bytes", "Size of the response bodies.", "response_bytes")]:
+            metric = "{}_{}".format(PROMETHEUS_PREFIX, name)
+            lines.append("# HELP {} {}".format(metric, help_text))
+            lines.append("# TYPE {} summary".format(metric))
+            for operation, metrics in operations.items():
+                summary = metrics[key]
+                for quantile in QUANTILES:
+                    lines.append('{}{{operation="{}",quantile="{:g}"}} {}'.format(
+                        metric, operation, quantile, summary["p{:g}".format(quantile * 100)]))
+                lines.append('{}_sum{{operation="{}"}} {}'.format(metric, operation, summary["sum"]))
+                lines.append('{}_count{{operation="{}"}} {}'.format(metric, operation, summary["count"]))
+
+        metric = "{}_responses_total".format(PROMETHEUS_PREFIX)
+        lines.append("# HELP {} Responses by status code, error for no response.".format(metric))
+        lines.append("# TYPE {} counter".format(metric))
+        for operation, metrics in operations.items():
+            for status, count in sorted(metrics["status_codes"].items()):
+                lines.append('{}{{operation="{}",status="{}"}} {}'.format(metric, operation, status, count))
+
+        metric = "{}_retries_total".format(PROMETHEUS_PREFIX)
+        lines.append("# HELP {} Requests sent again after a failure or a 429.".format(metric))
+        lines.append("# TYPE {} counter".format(metric))
+        for operation, metrics in operations.items():
+            lines.append('{}{{operation="{}"}} {}'.format(metric, operation, metrics["retries"]))
+        return "\n".join(lines) + "\n"
+
+
+_PAGING_FUNCTIONS = ("internal_paging", "prepare_request", "get_next")
+_ID_SEGMENT = re.compile(r"/(?:[0-9a-fA-F-]{32,36}|\d+)(?=/|$)")
+
+
+def operation_name(http_request):
+    """Name the SDK operation sending a request, from the calling frames.
+
+    This is the SDK method called by the sample, as Class.method. If it
+    cannot be found, fall back on the method and URL path, ids stripped.
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("azure.") and "self" in frame.f_locals:
+            # Paged operations send from a nested function, after they returned
+            method = getattr(frame.f_code, "co_qualname", frame.f_code.co_name)
+            method = method.split(".<locals>", 1)[0].rsplit(".", 1)[-1]
+            if method not in _PAGING_FUNCTIONS:
+                return "{}.{}".format(type(frame.f_locals["self"]).__name__, method)
+        frame = frame.f_back
+    path = http_request.url.split("://", 1)[-1].partition("/")[2].split("?", 1)[0]
+    return "{} /{}".format(http_request.method, _ID_SEGMENT.sub("/{id}", path))
+
+
+def _header_size(headers):
+    try:
+        return int(headers.get("Content-Length") or 0)
+    except ValueError:
+        return 0
+
+
+class MetricsPolicy(HTTPPolicy):
+    """msrest policy recording the metrics of every request into a registry.
+    """
+
+    def __init__(self, registry):
+        super(MetricsPolicy, self).__init__()
+        self.registry = registry
+
+    def send(self, request, **kwargs):
+        operation = operation_name(request.http_request)
+        start = timeit.default_timer()
+        try:
+            response = self.next.send(request, **kwargs)
+        except Exception:
+            self.registry.record(operation, timeit.default_timer() - start, "error")
+            raise
+        elapsed = timeit.default_timer() - start
+
+        internal_response = response.http_response.internal_response
+        retries = getattr(internal_response, "throttled_retries", 0)
+        raw_retries = getattr(getattr(internal_response, "raw", None), "retries", None)
+        if raw_retries is not None:
+            retries += len(raw_retries.history)
+        self.registry.record(
+            operation,
+            elapsed,
+            response.http_response.status_code,
+            retries,
+            _header_size(internal_response.request.headers),
+            _header_size(internal_response.headers)
+        )
+        return response
+
+
+METRICS = MetricsRegistry()
+
+
+def instrument(client, registry=METRICS):
+    """Record the metrics of a msrest based client into registry, return the client.
+
+    Instrumenting a client twice has no effect.
+    """
+    pipeline = client.config.pipeline
+    policies = pipeline._impl_policies
+    if not any(isinstance(policy, MetricsPolicy) for policy in policies):
+        client.config.pipeline = Pipeline(
+            [MetricsPolicy(registry)] + policies, pipeline._sender)
+    return client
+
+
+def export_metrics(path, registry=METRICS):
+    """Write the metrics to path, in the Prometheus format for a .prom or .txt file, JSON otherwise.
+    """
+    with open(path, "w") as metrics_fd:
+        if path.endswith((".prom", ".txt")):
+            metrics_fd.write(registry.to_prometheus())
+        else:
+            json.dump(registry.to_json(), metrics_fd, indent=2, sort_keys=True)
@@ -0,0 +1,199 @@
+"""Batch OCR of a directory tree or manifest, streamed to a JSON lines file.
+
+Images are OCRed concurrently and each result is written as soon as it
+comes, one JSON record per image with the geometry of every region, line
+and word:
+
+    {"image": "scans/0001.png", "language": "en", "orientation": "Up", "text_angle": 0.0,
+     "regions": [{"bounding_box": [x, y, width, height], "lines": [{"bounding_box": [...],
+                  "words": [{"bounding_box": [...], "text": "..."}]}]}]}
+
+A failed image is recorded as {"image": ..., "error": ...}. Running again
+with the same output skips the images already recorded, so that a run that
+stopped resumes where it was; failed images are retried with retry_failed:
+
+    python -m samples._infra.ocr_batch scans/ --output scans.jsonl
+
+The input is a directory, walked in sorted order, or a manifest file listing
+one image path per line. Images too large for one call are OCRed in tiles
+with --tile-size, see ocr_tiles.
+"""
+import argparse
+import collections
+import functools
+import json
+import os
+
+from azure.cognitiveservices.vision.computervision import ComputerVisionClient
+
+from samples._infra.batching import DEFAULT_MAX_WORKERS, bounded_map
+from samples._infra.clients import get_client
+from samples._infra.ocr_tiles import DEFAULT_OVERLAP, recognize_printed_text_tiled
+
+IMAGE_EXTENSIONS = (".bmp", ".gif", ".jpeg", ".jpg", ".png")
+
+OcrSummary = collections.namedtuple("OcrSummary", ["recognized", "skipped", "failures"])
+
+
+def iter_images(source, extensions=IMAGE_EXTENSIONS):
+    """Yield the image paths of a directory tree, in sorted order, or of a manifest file.
+    """
+    if not os.path.isdir(source):
+        with open(source) as manifest_fd:
+            for line in manifest_fd:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+        return
+    for root, directories, files in os.walk(source):
+        directories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(extensions):
+                yield os.path.join(root, name)
+
+
+def parse_bounding_box(bounding_box):
+    """Parse the "x,y,width,height" of an OCR bounding box into a list of ints.
+    """
+    return [int(value) for value in bounding_box.split(",")]
+
+
+def ocr_record(image, ocr_result):
+    """Return the JSON record of the OcrResult of an image.
+    """
+    return collections.OrderedDict([
+        ("image", image),
+        ("language", ocr_result.language),
+        ("orientation", ocr_result.orientation),
+        ("text_angle", ocr_result.text_angle),
+        ("regions", [
+            {"bounding_box": parse_bounding_box(region.bounding_box),
+             "lines": [
+                 {"bounding_box": parse_bounding_box(line.bounding_box),
+                  "words": [{"bounding_box": parse_bounding_box(word.bounding_box), "text": word.text}
+                            for word in line.words]}
+                 for line in region.lines]}
+            for region in ocr_result.regions or []
+        ]),
+    ])
+
+
+def record_text(record):
+    """Return the text of an OCR record, one line per line.
+    """
+    return "\n".join(
+        " ".join(word["text"] for word in line["words"])
+        for region in record.get("regions", []) for line in region["lines"])
+
+
+def recognize_printed_text(client, image, **ocr_kwargs):
+    with open(image, "rb") as image_fd:
+        return client.recognize_printed_text_in_stream(image=image_fd, **ocr_kwargs)
+
+
+def image_key(image):
+    """Return the key of an image path in the output records: the same image has one key however written.
+    """
+    return os.path.normpath(os.path.abspath(image))
+
+
+def _open_output(path):
+    """Read the images recorded in an output file, and open it for appending.
+
+    Return (done, failed, file), sets of image_key. A last line cut by a
+    crash is truncated; complete lines that do not parse are skipped.
+    """
+    done, failed = set(), set()
+    if not os.path.exists(path):
+        return done, failed, open(path, "w")
+    with open(path, "rb+") as output_fd:
+        complete = 0
+        for line in output_fd:
+            if not line.endswith(b"\n"):
+                break  # Only the last line can lack its end
+            complete += len(line)
+            try:
+                record = json.loads(line.decode("utf-8"))
+            except ValueError:
+                continue
+            if not isinstance(record, dict) or "image" not in record:
+                continue
+            key = image_key(record["image"])
+            if "error" in record:
+                failed.add(key)
+            else:
+                done.add(key)
+                failed.discard(key)
+        output_fd.truncate(complete)
+    return done, failed, open(path, "a")
+
+
+def ocr_images(client, images, output_path, max_workers=DEFAULT_MAX_WORKERS,
+               retry_failed=False, recognize=recognize_printed_text, **ocr_kwargs):
+    """OCR images concurrently, appending one record per image to output_path.
+
+    images is any iterable of local paths, consumed as the work goes.
+    Images already recorded in output_path are skipped, the failed ones
+    too unless retry_failed. recognize(client, image, **ocr_kwargs) returns
+    the OcrResult of an image. Return an OcrSummary.
+    """
+    done, failed, output_fd = _open_output(output_path)
+    skipped = [0]
+
+    def pending_images():
+        for image in images:
+            key = image_key(image)
+            if key in done or (key in failed and not retry_failed):
+                skipped[0] += 1
+            else:
+                yield image
+
+    def recognize_image(image):
+        try:
+            return ocr_record(image, recognize(client, image, **ocr_kwargs))
+        except Exception as err:  # Recorded with the image, the batch goes on
+            return collections.OrderedDict([("image", image), ("error", str(err))])
+
+    recognized, failures = 0, {}
+    with output_fd:
+        for record in bounded_map(recognize_image, pending_images(), max_workers, ordered=False):
+            output_fd.write(json.dumps(record) + "\n")
+            output_fd.flush()
+            if "error" in record:
+                failures[record["image"]] = record["error"]
+            else:
+                recognized += 1
+    return OcrSummary(recognized, skipped[0], failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR the images of a directory tree or manifest to JSON lines.")
+    parser.add_argument("source", help="directory of images, or manifest file of image paths")
+    parser.add_argument("--output", required=True, help="JSON lines output, resumed if it exists")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--language", default="unk", help="language code, unk to detect it")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="retry the images that failed in a previous run")
+    parser.add_argument("--tile-size", type=int,
+                        help="OCR each image in overlapping tiles of this many pixels a side")
+    parser.add_argument("--overlap", type=int, default=DEFAULT_OVERLAP, help="pixels shared by neighbor tiles")
+    parser.add_argument("--endpoint", default="https://{}.api.cognitive.microsoft.com/".format(
+        os.environ.get("COMPUTERVISION_LOCATION", "westcentralus")))
+    options = parser.parse_args()
+
+    client = get_client(ComputerVisionClient, options.endpoint, os.environ["COMPUTERVISION_SUBSCRIPTION_KEY"])
+    recognize = recognize_printed_text
+    if options.tile_size:
+        recognize = functools.partial(
+            recognize_printed_text_tiled, tile_size=options.tile_size, overlap=options.overlap)
+    summary = ocr_images(
+        client, iter_images(options.source), options.output, options.workers,
+        options.retry_failed, recognize, language=options.language)
+    print("{} image(s) recognized, {} already done, {} failure(s)".format(
+        summary.recognized, summary.skipped, len(summary.failures)))
+    for image, error in sorted(summary.failures.items()):
+        print("    {}: {}".format(image, error))
+
+
+if __name__ == "__main__":
+    main()
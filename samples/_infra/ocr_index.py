@@ -0,0 +1,265 @@
+"""Geometric queries over the words of an OCR result.
+
+Form extraction asks where words are: the words inside a region, the label
+next to a field, the text of a block in reading order. Scanning the word
+list for each lookup is quadratic over a page. WordIndex keeps the word
+boxes of a page in NumPy arrays, bucketed in a uniform grid, so that a
+region query only tests the words of the cells it covers:
+
+    words = WordIndex.from_ocr_result(ocr_result)
+    total = words.find("Total:")[0]
+    amount = words.nearest(total, direction="right")
+    print(words.texts[amount])
+    print(words.text(words.within((0, 0, 800, 300))))
+
+It is built from an OcrResult, a TextRecognitionResult page of the Read
+API (tiled or not, see ocr_tiles) or an ocr_batch JSON record. Boxes are
+(x0, y0, x1, y1) rectangles in the unit of the result; the quadrilaterals
+of the Read API are indexed by the rectangle around them. Queries return
+word indices, arrays sorted in index order unless said otherwise.
+"""
+import numpy as np
+
+CELL_HEIGHTS = 4  # Grid cell side, in median word heights
+
+
+def _quad_box(quad):
+    return min(quad[0::2]), min(quad[1::2]), max(quad[0::2]), max(quad[1::2])
+
+
+def _xywh_box(x, y, width, height):
+    return x, y, x + width, y + height
+
+
+class WordIndex(object):
+    """The words of an OCR page, their boxes, and a uniform grid over the boxes.
+
+    texts is the word list, boxes an (n, 4) float array, lines and blocks
+    the line and region (-1 unknown) of each word.
+    """
+    __slots__ = ("texts", "boxes", "lines", "blocks", "cell_size", "_lower", "_columns", "_rows",
+                 "_cell_keys", "_cell_words")
+
+    def __init__(self, texts, boxes, lines=None, blocks=None, cell_size=None):
+        self.texts = list(texts)
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        count = len(self.texts)
+        self.lines = np.full(count, -1, dtype=np.int32) if lines is None else np.asarray(lines, dtype=np.int32)
+        self.blocks = np.full(count, -1, dtype=np.int32) if blocks is None else np.asarray(blocks, dtype=np.int32)
+        self._lower = np.array([text.lower() for text in self.texts], dtype=object)
+        if cell_size is None:
+            heights = self.boxes[:, 3] - self.boxes[:, 1]
+            cell_size = CELL_HEIGHTS * float(np.median(heights)) if count else 1.0
+        self.cell_size = max(cell_size, 1.0)
+        self._build_grid()
+
+    def _cells(self, boxes):
+        cells = np.floor(np.clip(boxes, 0, None) / self.cell_size).astype(np.int64)
+        return cells[:, 0], cells[:, 1], cells[:, 2], cells[:, 3]
+
+    def _build_grid(self):
+        """Sort the (cell, word) pairs of every cell covered by every word, by cell key.
+        """
+        column0, row0, column1, row1 = self._cells(self.boxes)
+        self._columns = int(column1.max()) + 1 if len(self.boxes) else 1
+        self._rows = int(row1.max()) + 1 if len(self.boxes) else 1
+        widths = column1 - column0 + 1
+        counts = widths * (row1 - row0 + 1)
+        words = np.repeat(np.arange(len(self.boxes)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        keys = ((np.repeat(row0, counts) + offsets // np.repeat(widths, counts)) * self._columns
+                + np.repeat(column0, counts) + offsets % np.repeat(widths, counts))
+        order = np.argsort(keys, kind="stable")
+        self._cell_keys = keys[order]
+        self._cell_words = words[order]
+
+    @classmethod
+    def from_ocr_result(cls, ocr_result, cell_size=None):
+        """Index the words of an OcrResult of recognize_printed_text.
+        """
+        texts, boxes, lines, blocks = [], [], [], []
+        line_index = 0
+        for block_index, region in enumerate(ocr_result.regions or []):
+            for line in region.lines:
+                for word in line.words:
+                    texts.append(word.text)
+                    boxes.append(_xywh_box(*[int(value) for value in word.bounding_box.split(",")]))
+                    lines.append(line_index)
+                    blocks.append(block_index)
+                line_index += 1
+        return cls(texts, boxes, lines, blocks, cell_size)
+
+    @classmethod
+    def from_text_recognition_result(cls, text_result, cell_size=None):
+        """Index the words of a TextRecognitionResult, a page of the Read or Recognize Text APIs.
+        """
+        texts, boxes, lines = [], [], []
+        for line_index, line in enumerate(text_result.lines):
+            for word in line.words:
+                texts.append(word.text)
+                boxes.append(_quad_box(word.bounding_box))
+                lines.append(line_index)
+        return cls(texts, boxes, lines, None, cell_size)
+
+    @classmethod
+    def from_record(cls, record, cell_size=None):
+        """Index the words of an ocr_batch JSON record.
+        """
+        texts, boxes, lines, blocks = [], [], [], []
+        line_index = 0
+        for block_index, region in enumerate(record.get("regions", [])):
+            for line in region["lines"]:
+                for word in line["words"]:
+                    texts.append(word["text"])
+                    boxes.append(_xywh_box(*word["bounding_box"]))
+                    lines.append(line_index)
+                    blocks.append(block_index)
+                line_index += 1
+        return cls(texts, boxes, lines, blocks, cell_size)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _candidates(self, region):
+        """Return the words sharing a grid cell with a region, a superset of the words it touches.
+        """
+        column0, row0, column1, row1 = [int(max(value, 0) // self.cell_size) for value in region]
+        column1, row1 = min(column1, self._columns - 1), min(row1, self._rows - 1)
+        if column0 > column1 or row0 > row1:
+            return np.empty(0, dtype=np.int64)
+        if row0 == row1:
+            key = row0 * self._columns
+            low, high = np.searchsorted(self._cell_keys, (key + column0, key + column1 + 1))
+            return self._unique(self._cell_words[low:high])
+        starts = np.arange(row0 * self._columns, (row1 + 1) * self._columns, self._columns)
+        lows = np.searchsorted(self._cell_keys, starts + column0)
+        lengths = np.searchsorted(self._cell_keys, starts + column1 + 1) - lows
+        total = int(lengths.sum())
+        if total > len(self._cell_keys) // 8:
+            return np.arange(len(self.texts))  # Testing every word is cheaper than merging that many cells
+        positions = np.repeat(lows - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+        return self._unique(self._cell_words[positions])
+
+    def _unique(self, words):
+        """Return words sorted without the repeats of the words spanning several cells.
+        """
+        if len(words) <= 64:
+            return np.unique(words)
+        found = np.zeros(len(self.texts), dtype=bool)  # Linear, where sorting many words is not
+        found[words] = True
+        return np.flatnonzero(found)
+
+    def within(self, region, partial=False):
+        """Return the words inside a (x0, y0, x1, y1) region, or touching it if partial.
+        """
+        x0, y0, x1, y1 = region
+        candidates = self._candidates(region)
+        if len(candidates) == len(self.texts):
+            boxes = self.boxes  # Every word, no copy
+        else:
+            boxes = self.boxes.take(candidates, axis=0)  # Much faster than fancy indexing rows
+        if partial:
+            inside = (boxes[:, 0] <= x1) & (boxes[:, 2] >= x0) & (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0)
+        else:
+            inside = (boxes[:, 0] >= x0) & (boxes[:, 2] <= x1) & (boxes[:, 1] >= y0) & (boxes[:, 3] <= y1)
+        return candidates[inside]
+
+    def find(self, text):
+        """Return the words equal to text, ignoring case.
+        """
+        return np.flatnonzero(self._lower == text.lower())
+
+    def _directed(self, candidates, box, direction):
+        """Keep the candidates lying in direction of box, overlapping it across that direction.
+        """
+        if direction is None:
+            return candidates
+        boxes = self.boxes.take(candidates, axis=0)
+        if direction in ("left", "right"):
+            centers = (boxes[:, 0] + boxes[:, 2]) / 2
+            keep = (boxes[:, 1] < box[3]) & (boxes[:, 3] > box[1])
+            keep &= centers < box[0] if direction == "left" else centers > box[2]
+        elif direction in ("above", "below"):
+            centers = (boxes[:, 1] + boxes[:, 3]) / 2
+            keep = (boxes[:, 0] < box[2]) & (boxes[:, 2] > box[0])
+            keep &= centers < box[1] if direction == "above" else centers > box[3]
+        else:
+            raise ValueError("Unknown direction {!r}".format(direction))
+        return candidates[keep]
+
+    def _distances(self, candidates, box):
+        boxes = self.boxes.take(candidates, axis=0)
+        dx = np.maximum(0, np.maximum(box[0] - boxes[:, 2], boxes[:, 0] - box[2]))
+        dy = np.maximum(0, np.maximum(box[1] - boxes[:, 3], boxes[:, 1] - box[3]))
+        return np.hypot(dx, dy)
+
+    def nearest(self, field, direction=None, max_distance=None):
+        """Return the word nearest a field, a word index or a box, None if there is none.
+
+        direction is "left", "right", "above" or "below" to only consider
+        the words on that side, on the same row or column. The distance is
+        the gap between boxes; the search widens around the field, ring by
+        ring of the grid, until a word is closer than the ring.
+        """
+        exclude = None
+        if isinstance(field, (int, np.integer)):
+            exclude, box = int(field), self.boxes[field]
+        else:
+            box = np.asarray(field, dtype=np.float64)
+        limit = np.inf if max_distance is None else max_distance
+        extent = max(max(self._columns, self._rows) * self.cell_size, box[2], box[3])  # Reaches every word
+        radius = self.cell_size
+        while True:
+            candidates = self._candidates((box[0] - radius, box[1] - radius, box[2] + radius, box[3] + radius))
+            if exclude is not None:
+                candidates = candidates[candidates != exclude]
+            candidates = self._directed(candidates, box, direction)
+            if len(candidates):
+                distances = self._distances(candidates, box)
+                best = int(np.argmin(distances))
+                if distances[best] <= radius or radius >= extent:
+                    return int(candidates[best]) if distances[best] <= limit else None
+            if radius >= min(extent, limit):
+                return None
+            radius *= 2
+
+    def label_for(self, field, max_distance=None):
+        """Return the label of a field: the nearest word on its left, else the nearest above it.
+        """
+        label = self.nearest(field, "left", max_distance)
+        return label if label is not None else self.nearest(field, "above", max_distance)
+
+    def rows(self, words=None):
+        """Group words, all by default, into rows top to bottom, return a list of index arrays left to right.
+
+        A word joins the current row when its vertical center is above the
+        mean bottom of the row. Pages in columns are read row across columns:
+        query each column with within first.
+        """
+        words = np.arange(len(self.texts)) if words is None else np.asarray(words, dtype=np.int64)
+        if not len(words):
+            return []
+        boxes = self.boxes.take(words, axis=0)
+        centers = (boxes[:, 1] + boxes[:, 3]) / 2
+        order = np.argsort(centers, kind="stable")
+        rows, row, bottoms = [], [order[0]], boxes[order[0], 3]
+        for position in order[1:]:
+            if centers[position] <= bottoms / len(row):
+                row.append(position)
+                bottoms += boxes[position, 3]
+            else:
+                rows.append(row)
+                row, bottoms = [position], boxes[position, 3]
+        rows.append(row)
+        return [words[np.array(row)[np.argsort(boxes[row, 0], kind="stable")]] for row in rows]
+
+    def reading_order(self, words=None):
+        """Return words, all by default, sorted row by row, each row left to right.
+        """
+        rows = self.rows(words)
+        return np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+
+    def text(self, words=None):
+        """Return the text of words, all by default, in reading order, one row per line.
+        """
+        return "\n".join(" ".join(self.texts[word] for word in row) for row in self.rows(words))
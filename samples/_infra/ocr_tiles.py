@@ -0,0 +1,354 @@
+"""Tiled OCR of images too large for a single call.
+
+High-resolution scans and posters go past the size limits of the OCR and
+Read APIs, and lose their small print when downscaled to fit. The tiled
+functions crop an image into overlapping tiles at full resolution, OCR the
+tiles concurrently and stitch the results back into one result of the usual
+type, in the coordinates of the whole image:
+
+    result = recognize_printed_text_tiled(client, "poster.png", language="en")
+
+    with ReadPipeline(client) as pipeline:
+        text_result = read_tiled(pipeline, "scan.png")
+
+A word in an overlap band is seen by two tiles, or cut by the edge of one of
+them: it is kept once, from the tile seeing it whole and nearest its center.
+Lines split by a seam are joined back; regions are not, a block crossing a
+seam gives a region per tile. The overlap should be larger than the largest
+word expected, a word longer than the overlap can be cut by both tiles.
+
+recognize_printed_text_tiled fits the recognize hook of ocr_batch.ocr_images.
+"""
+import collections
+import io
+import threading
+
+from azure.cognitiveservices.vision.computervision.models import (
+    Line, OcrLine, OcrRegion, OcrResult, OcrWord, TextRecognitionResult, Word)
+from PIL import Image, ImageOps
+
+from samples._infra.batching import DEFAULT_MAX_WORKERS, bounded_map
+from samples._infra.image_normalize import LIMITS, ImageRejected
+
+DEFAULT_TILE_SIZE = 2048
+DEFAULT_OVERLAP = 256
+EDGE_MARGIN = 2  # A word this close to an inner tile edge is taken as cut by it
+DUPLICATE_COVER = 0.5  # Share of the smaller box two words must share to be the same word
+TILE_QUALITY = 95
+
+_open_lock = threading.Lock()  # Image.MAX_IMAGE_PIXELS is global
+
+Tile = collections.namedtuple("Tile", ["left", "top", "width", "height"])
+
+# box is (x0, y0, x1, y1) in the whole image, quad the 8 coordinates of a Read box
+_Word = collections.namedtuple("_Word", ["box", "text", "confidence", "quad", "cut", "rank"])
+# group is the region, or line, of the tile result a line comes from
+_Line = collections.namedtuple("_Line", ["tile", "group", "words", "source"])
+
+
+def _starts(length, tile_size, overlap):
+    if length <= tile_size:
+        return [0]
+    count = -(-(length - overlap) // (tile_size - overlap))  # Ceiling division
+    return [round(index * (length - tile_size) / float(count - 1)) for index in range(count)]
+
+
+def tile_boxes(width, height, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP):
+    """Return the Tile list covering an image, row by row, neighbors sharing at least overlap pixels.
+    """
+    if not 0 <= 2 * overlap < tile_size:
+        raise ValueError("overlap must be less than half of tile_size")
+    return [Tile(left, top, min(tile_size, width), min(tile_size, height))
+            for top in _starts(height, tile_size, overlap)
+            for left in _starts(width, tile_size, overlap)]
+
+
+def _encode_tile(image, limits):
+    for quality in range(TILE_QUALITY, 49, -15):
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=quality)
+        if len(buffer.getvalue()) <= limits.max_bytes:
+            return buffer.getvalue()
+    raise ImageRejected("Tile of {}x{} pixels cannot fit in {} bytes, use smaller tiles".format(
+        image.width, image.height, limits.max_bytes))
+
+
+def _open_upright(image):
+    """Decode an image path or stream, turned upright from its EXIF orientation.
+
+    The decompression bomb limit of Pillow does not apply: tiled images are
+    local, and larger than the limit by design.
+    """
+    with _open_lock:
+        max_pixels, Image.MAX_IMAGE_PIXELS = Image.MAX_IMAGE_PIXELS, None
+        try:
+            source = Image.open(image)
+        finally:
+            Image.MAX_IMAGE_PIXELS = max_pixels
+    if source.getexif().get(0x0112, 1) != 1:  # Orientation tag
+        return ImageOps.exif_transpose(source)
+    source.load()
+    return source  # Upright already, not copied
+
+
+def _encode_tiles(source, tiles, limits):
+    for tile in tiles:
+        crop = source.crop((tile.left, tile.top, tile.left + tile.width, tile.top + tile.height))
+        if crop.mode not in ("RGB", "L"):
+            crop = crop.convert("RGB")
+        yield tile, _encode_tile(crop, limits)
+
+
+def crop_tiles(image, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP, limits=LIMITS["ocr"]):
+    """Crop an image path or stream into tiles, return (width, height, iterator of (Tile, JPEG bytes)).
+
+    Tiles are encoded as the iterator is consumed, a page of many tiles
+    is not held encoded at once. Coordinates are those of the image
+    turned upright from its EXIF orientation.
+    """
+    source = _open_upright(image)
+    tiles = tile_boxes(source.width, source.height, min(tile_size, limits.max_side), overlap)
+    return source.width, source.height, _encode_tiles(source, tiles, limits)
+
+
+def _is_cut(box, tile, width, height):
+    return ((tile.left > 0 and box[0] <= tile.left + EDGE_MARGIN)
+            or (tile.top > 0 and box[1] <= tile.top + EDGE_MARGIN)
+            or (tile.left + tile.width < width and box[2] >= tile.left + tile.width - EDGE_MARGIN)
+            or (tile.top + tile.height < height and box[3] >= tile.top + tile.height - EDGE_MARGIN))
+
+
+def _word(box, text, confidence, quad, tile, width, height):
+    center_x, center_y = (box[0] + box[2]) / 2.0, (box[1] + box[3]) / 2.0
+    rank = (abs(center_x - tile.left - tile.width / 2.0) / tile.width
+            + abs(center_y - tile.top - tile.height / 2.0) / tile.height)
+    return _Word(box, text, confidence, quad, _is_cut(box, tile, width, height), rank)
+
+
+def _cover(box, other):
+    """Return the share of the smaller of two boxes covered by their intersection.
+    """
+    width = min(box[2], other[2]) - max(box[0], other[0])
+    height = min(box[3], other[3]) - max(box[1], other[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    smaller = min((box[2] - box[0]) * (box[3] - box[1]), (other[2] - other[0]) * (other[3] - other[1]))
+    return width * height / float(max(smaller, 1))
+
+
+def _union(boxes):
+    boxes = list(boxes)
+    return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+            max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+
+def _deduplicate(lines, cell_size):
+    """Drop from lines the words already seen by another tile, best seen copy first.
+
+    The words of the _Line list are filtered in place. A grid of cell_size
+    buckets the kept words, to only compare neighbors.
+    """
+    candidates = sorted(
+        ((word.cut, word.rank, line_index, word_index)
+         for line_index, line in enumerate(lines) for word_index, word in enumerate(line.words)))
+    grid = collections.defaultdict(list)  # cell -> [(tile index, box)]
+    kept = set()
+    for _, _, line_index, word_index in candidates:
+        tile_index, box = lines[line_index].tile, lines[line_index].words[word_index].box
+        cells = [(column, row)
+                 for column in range(int(box[0] // cell_size), int(box[2] // cell_size) + 1)
+                 for row in range(int(box[1] // cell_size), int(box[3] // cell_size) + 1)]
+        if any(other_tile != tile_index and _cover(box, other_box) > DUPLICATE_COVER
+               for cell in cells for other_tile, other_box in grid[cell]):
+            continue
+        kept.add((line_index, word_index))
+        for cell in cells:
+            grid[cell].append((tile_index, box))
+    for line_index, line in enumerate(lines):
+        line.words[:] = [word for word_index, word in enumerate(line.words) if (line_index, word_index) in kept]
+
+
+def _near_seam(box, tile_index, tiles):
+    """Tell whether a box, grown by its height, reaches into another tile than its own.
+    """
+    margin = box[3] - box[1]
+    return any(index != tile_index and box[0] - margin < tile.left + tile.width and box[2] + margin > tile.left
+               and box[1] - margin < tile.top + tile.height and box[3] + margin > tile.top
+               for index, tile in enumerate(tiles))
+
+
+def _join_lines(lines, tiles):
+    """Join the lines of different tiles continuing each other, return [(group, [_Word], [_Line])].
+
+    Two lines continue each other when their vertical extents mostly
+    overlap and the horizontal gap between them is under the taller one; only
+    the lines reaching near another tile are compared. A joined line
+    keeps the group of its leftmost part. Lines are sorted by group, then
+    top to bottom.
+    """
+    lines = [line for line in lines if line.words]
+    boxes = [_union(word.box for word in line.words) for line in lines]
+    parents = list(range(len(lines)))
+
+    def find(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    seam_lines = sorted((index for index, line in enumerate(lines)
+                         if _near_seam(boxes[index], line.tile, tiles)),
+                        key=lambda index: boxes[index][0])
+    tallest = max([boxes[index][3] - boxes[index][1] for index in seam_lines] or [0])
+    for position, index in enumerate(seam_lines):
+        box = boxes[index]
+        for other in seam_lines[position + 1:]:
+            other_box = boxes[other]
+            if other_box[0] - box[2] > tallest:
+                break  # Sorted by left edge, no later line is close enough
+            heights = box[3] - box[1], other_box[3] - other_box[1]
+            vertical = min(box[3], other_box[3]) - max(box[1], other_box[1])
+            if (lines[index].tile != lines[other].tile and vertical >= 0.5 * min(heights)
+                    and other_box[0] - box[2] <= max(heights)):
+                parents[find(other)] = find(index)
+
+    joined = collections.OrderedDict()  # root -> (group, [_Word], [_Line])
+    for index in sorted(range(len(lines)), key=lambda index: boxes[index][0]):
+        root = find(index)
+        if root not in joined:
+            joined[root] = (lines[index].group, [], [])
+        joined[root][1].extend(lines[index].words)
+        joined[root][2].append(lines[index])
+    for _, words, _ in joined.values():
+        words.sort(key=lambda word: word.box[0])
+    return sorted(joined.values(), key=lambda joined_line: (joined_line[0], _union(
+        word.box for word in joined_line[1])[1]))
+
+
+def _corners(bounding_box):
+    x, y, width, height = [int(value) for value in bounding_box.split(",")]
+    return x, y, x + width, y + height
+
+
+def _box_string(box):
+    return "{},{},{},{}".format(int(box[0]), int(box[1]), int(box[2] - box[0]), int(box[3] - box[1]))
+
+
+def stitch_ocr_results(tiled_results, width, height, overlap=DEFAULT_OVERLAP):
+    """Stitch [(Tile, OcrResult)] of the tiles of an image into one OcrResult of the whole image.
+
+    language, orientation and text angle are those of the first tile
+    reporting them.
+    """
+    lines = []
+    for tile_index, (tile, ocr_result) in enumerate(tiled_results):
+        for region_index, region in enumerate(ocr_result.regions or []):
+            for line in region.lines:
+                words = []
+                for word in line.words:
+                    x0, y0, x1, y1 = _corners(word.bounding_box)
+                    box = (x0 + tile.left, y0 + tile.top, x1 + tile.left, y1 + tile.top)
+                    words.append(_word(box, word.text, None, None, tile, width, height))
+                lines.append(_Line(tile_index, (tile_index, region_index), words, line))
+    _deduplicate(lines, max(overlap, 1))
+    tiles = [tile for tile, _ in tiled_results]
+
+    regions = collections.OrderedDict()  # group -> [OcrLine]
+    for group, words, _ in _join_lines(lines, tiles):
+        regions.setdefault(group, []).append(OcrLine(
+            bounding_box=_box_string(_union(word.box for word in words)),
+            words=[OcrWord(bounding_box=_box_string(word.box), text=word.text) for word in words]))
+
+    def first(attribute):
+        return next((getattr(ocr_result, attribute) for _, ocr_result in tiled_results
+                     if getattr(ocr_result, attribute) is not None), None)
+
+    return OcrResult(
+        language=first("language"), text_angle=first("text_angle"), orientation=first("orientation"),
+        regions=[OcrRegion(bounding_box=_box_string(_union(_corners(line.bounding_box) for line in region_lines)),
+                           lines=region_lines)
+                 for region_lines in regions.values()])
+
+
+def _offset_quad(quad, tile):
+    return [value + (tile.left if index % 2 == 0 else tile.top) for index, value in enumerate(quad)]
+
+
+def _quad_box(quad):
+    return min(quad[0::2]), min(quad[1::2]), max(quad[0::2]), max(quad[1::2])
+
+
+def stitch_text_recognition_results(tiled_results, width, height, overlap=DEFAULT_OVERLAP):
+    """Stitch [(Tile, TextRecognitionResult)] of the tiles of an image into one TextRecognitionResult.
+
+    A line left whole keeps its bounding box; a joined line gets the
+    rectangle around its words. Orientation and unit are those of the first
+    tile.
+    """
+    lines = []
+    for tile_index, (tile, text_result) in enumerate(tiled_results):
+        for line_index, line in enumerate(text_result.lines):
+            words = []
+            for word in line.words:
+                quad = _offset_quad(word.bounding_box, tile)
+                words.append(_word(_quad_box(quad), word.text, word.confidence, quad, tile, width, height))
+            lines.append(_Line(tile_index, (tile_index, line_index), words, line))
+    _deduplicate(lines, max(overlap, 1))
+    tiles = [tile for tile, _ in tiled_results]
+
+    stitched = []
+    for _, words, parts in _join_lines(lines, tiles):
+        if len(parts) == 1 and len(words) == len(parts[0].source.words):
+            quad = _offset_quad(parts[0].source.bounding_box, tiles[parts[0].tile])
+        else:
+            x0, y0, x1, y1 = _union(word.box for word in words)
+            quad = [x0, y0, x1, y0, x1, y1, x0, y1]
+        stitched.append(Line(
+            bounding_box=quad, text=" ".join(word.text for word in words),
+            words=[Word(bounding_box=word.quad, text=word.text, confidence=word.confidence) for word in words]))
+    first = tiled_results[0][1] if tiled_results else None
+    return TextRecognitionResult(
+        page=1, clockwise_orientation=first and first.clockwise_orientation, width=width, height=height,
+        unit=first and first.unit, lines=stitched)
+
+
+def recognize_printed_text_tiled(client, image, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP,
+                                 max_workers=DEFAULT_MAX_WORKERS, **ocr_kwargs):
+    """OCR a local image tile by tile with recognize_printed_text_in_stream, return the stitched OcrResult.
+
+    Orientation detection is off by default: each tile could be turned its
+    own way, and the tiles are placed in the orientation of the image.
+    """
+    ocr_kwargs.setdefault("detect_orientation", False)
+    width, height, tiles = crop_tiles(image, tile_size, overlap)
+
+    def recognize_tile(tile_bytes):
+        tile, data = tile_bytes
+        return tile, client.recognize_printed_text_in_stream(image=io.BytesIO(data), **ocr_kwargs)
+
+    return stitch_ocr_results(list(bounded_map(recognize_tile, tiles, max_workers)), width, height, overlap)
+
+
+def read_tiled(pipeline, image, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP):
+    """Read a local image tile by tile through a ReadPipeline, return the stitched TextRecognitionResult.
+
+    The tiles share the operations in flight of the pipeline with its other
+    images. They are cropped and encoded as slots free up, so at most
+    max_in_flight of them are held encoded. Raises the error of the first
+    tile to fail.
+    """
+    width, height, tiles = crop_tiles(image, tile_size, overlap, LIMITS["read"])
+    boxes = []
+
+    def tile_data():
+        for tile, data in tiles:
+            boxes.append(tile)
+            yield data
+
+    text_results = {}
+    for read_result in pipeline.read(tile_data()):
+        if read_result.error is not None:
+            raise read_result.error
+        text_results[read_result.index] = read_result.result.recognition_results[0]  # Not the tile bytes
+    return stitch_text_recognition_results(
+        [(tile, text_results[index]) for index, tile in enumerate(boxes)], width, height, overlap)
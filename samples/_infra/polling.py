@@ -0,0 +1,162 @@
+"""Long-running operation poller shared by the samples.
+
+Several Cognitive Services operations (Read, recognizeText, QnA Maker
+operations, LUIS, Custom Vision and Face training, ...) are started by one
+call and then polled until done. Instead of a "while ...: time.sleep(n)" loop
+per operation, submit the poll function to the Poller: one scheduler thread
+watches every outstanding operation, polls each one with exponential backoff
+and jitter, honors Retry-After, and completes a future when it is done:
+
+    future = POLLER.submit(
+        lambda: client.get_read_operation_result(operation_id),
+        lambda result: result.status not in ['NotStarted', 'Running']
+    )
+    result = future.result()
+
+poll_until_done does the same and waits for the result.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+import heapq
+import itertools
+import random
+import threading
+import time
+
+
+class PollingTimeout(Exception):
+    pass
+
+
+def retry_after_seconds(value):
+    """Return the Retry-After (or Retry-After-Ms) delay found on a response, result or error.
+
+    value may be a requests/msrest response, an object with a .response or
+    .headers attribute (ClientRawResponse, HttpOperationError, ...), or
+    None. Return None if there is no usable header.
+    """
+    for candidate in (value, getattr(value, "response", None)):
+        headers = getattr(candidate, "headers", None)
+        if not headers:
+            continue
+        try:
+            if headers.get("Retry-After-Ms"):
+                return float(headers["Retry-After-Ms"]) / 1000.0
+            if headers.get("Retry-After"):
+                return float(headers["Retry-After"])
+        except (TypeError, ValueError):
+            return None  # HTTP-date, not worth parsing here
+    return None
+
+
+class _Operation(object):
+
+    def __init__(self, poll, is_done, future, delay, max_delay, deadline):
+        self.poll = poll
+        self.is_done = is_done
+        self.future = future
+        self.delay = delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.attempts = 0
+
+
+class Poller(object):
+    """Watch many long-running operations from one scheduler thread.
+
+    Polls are run by a small pool of max_workers threads, so a slow poll does
+    not delay the others. After each unfinished poll the delay grows from
+    initial_delay by factor, up to max_delay, with random jitter; a
+    Retry-After header takes precedence.
+    """
+
+    def __init__(self, initial_delay=0.5, max_delay=10.0, factor=2.0,
+                 jitter=0.25, max_workers=4):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._queue = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self.polls = 0
+
+    def submit(self, poll, is_done, timeout=None, initial_delay=None,
+               callback=None, poll_now=True, max_delay=None):
+        """Watch an operation and return a Future of its final state.
+
+        poll is called without argument and returns the current state of
+        the operation; is_done(state) tells if it is over. callback, if
+        set, is called with the future once done. With poll_now the first
+        poll is immediate, otherwise it waits initial_delay. initial_delay
+        and max_delay default to those of the Poller.
+        """
+        delay = self.initial_delay if initial_delay is None else initial_delay
+        max_delay = self.max_delay if max_delay is None else max_delay
+        future = Future()
+        if callback:
+            future.add_done_callback(callback)
+        deadline = time.time() + timeout if timeout is not None else None
+        operation = _Operation(poll, is_done, future, delay, max_delay, deadline)
+        self._schedule(operation, 0 if poll_now else delay)
+        return future
+
+    def _schedule(self, operation, delay):
+        with self._condition:
+            heapq.heappush(self._queue, (time.time() + delay, next(self._counter), operation))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="poller", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue or self._queue[0][0] > time.time():
+                    timeout = self._queue[0][0] - time.time() if self._queue else None
+                    self._condition.wait(timeout)
+                _, _, operation = heapq.heappop(self._queue)
+            self._executor.submit(self._poll, operation)
+
+    def _next_delay(self, operation, retry_after):
+        if retry_after is not None:
+            return retry_after
+        delay = operation.delay
+        operation.delay = min(operation.max_delay, operation.delay * self.factor)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _poll(self, operation):
+        if operation.future.cancelled():
+            return
+        operation.attempts += 1
+        self.polls += 1
+        try:
+            state = operation.poll()
+            if operation.is_done(state):
+                operation.future.set_result(state)
+                return
+            retry_after = retry_after_seconds(state)
+        except Exception as err:
+            retry_after = retry_after_seconds(err)
+            status = getattr(getattr(err, "response", None), "status_code", None)
+            if status != 429 and retry_after is None:
+                operation.future.set_exception(err)
+                return
+
+        delay = self._next_delay(operation, retry_after)
+        if operation.deadline is not None and time.time() + delay > operation.deadline:
+            operation.future.set_exception(PollingTimeout(
+                "Operation still running after {} polls.".format(operation.attempts)))
+            return
+        self._schedule(operation, delay)
+
+
+POLLER = Poller()
+
+
+def poll_until_done(poll, is_done, timeout=None, initial_delay=None, max_delay=None):
+    """Poll an operation with the shared Poller and return its final state.
+    """
+    return POLLER.submit(poll, is_done, timeout, initial_delay, max_delay=max_delay).result()
@@ -0,0 +1,160 @@
+"""Many Read (batch_read_file) operations in flight at once.
+
+A Read operation is started by one call, answering an Operation-Location
+header, then polled until done. Reading documents one at a time leaves the
+service idle while polling. ReadPipeline has two stages: a few submitter
+threads start operations, keeping at most max_in_flight of them running,
+and the shared Poller collects all of them from one thread, with backoff:
+
+    with ReadPipeline(client, max_in_flight=16) as pipeline:
+        for read_result in pipeline.read(paths_or_urls):
+            if read_result.error:
+                print("{} failed: {}".format(read_result.image, read_result.error))
+            else:
+                print(read_result.result.recognition_results[0].lines[0].text)
+
+Results are yielded as they complete; each tells its index in the input.
+"""
+import collections
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import io
+import threading
+
+from azure.cognitiveservices.vision.computervision.models import (
+    TextOperationStatusCodes, TextRecognitionMode)
+from requests.utils import urlparse
+
+from samples._infra.batching import is_url
+from samples._infra.polling import POLLER
+
+DEFAULT_MAX_IN_FLIGHT = 16
+DEFAULT_MAX_SUBMITTERS = 4
+
+ReadResult = collections.namedtuple("ReadResult", ["index", "image", "result", "error"])
+
+
+class ReadFailed(Exception):
+    pass
+
+
+def operation_id(operation_location):
+    """Return the operation id ending an Operation-Location URL.
+
+    Query strings and trailing slashes are ignored, whatever the length of
+    the id.
+    """
+    if not operation_location:
+        raise ValueError("The response has no Operation-Location header")
+    operation = urlparse(operation_location).path.rstrip("/").rsplit("/", 1)[-1]
+    if not operation:
+        raise ValueError("No operation id in Operation-Location {!r}".format(operation_location))
+    return operation
+
+
+def read_done(result):
+    return result.status not in [TextOperationStatusCodes.not_started, TextOperationStatusCodes.running]
+
+
+class ReadPipeline(object):
+    """Submit Read operations, at most max_in_flight running at once, and collect their results.
+
+    Images are URLs, local paths or encoded image bytes. timeout bounds the polling of each
+    operation, in seconds.
+    """
+
+    def __init__(self, client, mode=TextRecognitionMode.printed, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 max_submitters=DEFAULT_MAX_SUBMITTERS, timeout=None, poller=POLLER):
+        self.client = client
+        self.mode = mode
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.poller = poller
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._submitters = ThreadPoolExecutor(max_workers=max_submitters)
+
+    def _start(self, image):
+        if isinstance(image, bytes):
+            response = self.client.batch_read_file_in_stream(io.BytesIO(image), self.mode, raw=True)
+        elif is_url(image):
+            response = self.client.batch_read_file(image, self.mode, raw=True)
+        else:
+            with open(image, "rb") as image_fd:
+                response = self.client.batch_read_file_in_stream(image_fd, self.mode, raw=True)
+        return operation_id(response.headers.get("Operation-Location"))
+
+    def submit(self, image):
+        """Start reading an image once a slot is free, return a Future of its ReadOperationResult.
+
+        The Future raises ReadFailed if the operation failed.
+        """
+        future = Future()
+
+        def start():
+            self._slots.acquire()
+            try:
+                operation = self._start(image)
+            except Exception as err:
+                self._slots.release()
+                future.set_exception(err)
+                return
+            self.poller.submit(
+                lambda: self.client.get_read_operation_result(operation),
+                read_done,
+                self.timeout,
+                callback=lambda polled: self._finish(future, polled),
+                poll_now=False
+            )
+
+        self._submitters.submit(start)
+        return future
+
+    def _finish(self, future, polled):
+        self._slots.release()
+        error = polled.exception()
+        if error is None and polled.result().status != TextOperationStatusCodes.succeeded:
+            error = ReadFailed("Read operation ended with status {}".format(polled.result().status))
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(polled.result())
+
+    def read(self, images):
+        """Read every image, yielding a ReadResult per image as they complete.
+
+        images is any iterable, consumed as slots free up. A failed image
+        yields its error instead of raising.
+        """
+        images = enumerate(images)
+        pending = {}  # Future -> (index, image)
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < self.max_in_flight:
+                try:
+                    index, image = next(images)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[self.submit(image)] = (index, image)
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, image = pending.pop(future)
+                error = future.exception()
+                yield ReadResult(index, image, None if error else future.result(), error)
+
+    def close(self):
+        self._submitters.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_images(client, images, mode=TextRecognitionMode.printed, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+    """Read every image, return the ReadResult list in input order.
+    """
+    with ReadPipeline(client, mode, max_in_flight) as pipeline:
+        return sorted(pipeline.read(images), key=lambda read_result: read_result.index)
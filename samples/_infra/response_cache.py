@@ -0,0 +1,287 @@
+"""Opt-in on-disk cache of the responses received by the shared SDK clients.
+
+Evaluation runs send the same requests again and again: the same web search,
+the same image analyzed. With the cache enabled, the pooled adapter of
+samples._infra.clients answers a request already seen from disk, without sending it
+nor spending a transaction. Entries are keyed by method, URL, sorted query,
+a few content negotiation headers and the hash of the body, so that the same
+image uploaded twice hits the same entry.
+
+The cache is enabled by enable_cache, or by enable_cache_from_environ when
+COGNITIVE_SERVICES_CACHE_DIR is set, as the launcher does. Only the services
+with a TTL are cached, Bing and Computer Vision by default, as most of their
+calls read without writing:
+
+    COGNITIVE_SERVICES_CACHE_DIR=.cache COGNITIVE_SERVICES_CACHE_TTL="bing=3600,vision=86400" python example.py
+
+Only 200 answers are stored, never the state of a running operation. The
+store is bounded by COGNITIVE_SERVICES_CACHE_SIZE megabytes (256 by default),
+the least recently used entries being evicted first.
+"""
+import collections
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from samples._infra.throttling import service_name
+
+CACHE_DIR_ENV_NAME = "COGNITIVE_SERVICES_CACHE_DIR"
+CACHE_TTL_ENV_NAME = "COGNITIVE_SERVICES_CACHE_TTL"
+CACHE_SIZE_ENV_NAME = "COGNITIVE_SERVICES_CACHE_SIZE"
+DEFAULT_TTLS = {"bing": 86400, "vision": 86400}
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+KEY_HEADERS = ["Accept", "Accept-Language", "Content-Type"]
+# Polled operation states must always come from the service
+UNCACHEABLE_PATH = re.compile(r"/operations/|/textoperations/", re.IGNORECASE)
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")  # Other files are not entries, e.g. temporary files left by a crash
+
+
+def parse_ttls(spec):
+    """Parse "service=seconds,..." into a dict service -> seconds.
+    """
+    ttls = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        service, _, seconds = item.partition("=")
+        try:
+            ttls[service.strip().lower()] = float(seconds)
+        except ValueError:
+            raise ValueError("Invalid cache TTL {!r}, expected service=seconds".format(item))
+    return ttls
+
+
+def _body_bytes(request):
+    """Return the request body as bytes, reading it into the request if it is a stream.
+    """
+    body = request.body
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    if isinstance(body, bytes):
+        return body
+    chunks = iter(body.read, b"") if hasattr(body, "read") else body
+    body = b"".join(chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                    for chunk in chunks)
+    request.body = body
+    request.headers.pop("Transfer-Encoding", None)
+    request.headers["Content-Length"] = str(len(body))
+    return body
+
+
+def request_key(request):
+    """Return the cache key of a requests PreparedRequest.
+    """
+    url = requests.utils.urlparse(request.url)
+    query = "&".join(sorted(param for param in url.query.split("&") if param))
+    digest = hashlib.sha256()
+    for part in [request.method, url.scheme, url.netloc.lower(), url.path, query]:
+        digest.update(part.encode("utf-8") + b"\0")
+    for header in KEY_HEADERS:
+        digest.update((request.headers.get(header) or "").encode("utf-8") + b"\0")
+    digest.update(hashlib.sha256(_body_bytes(request)).digest())
+    return digest.hexdigest()
+
+
+class ResponseCache(object):
+    """Size-bounded on-disk store of responses, evicting the least recently used.
+
+    Each entry is one zlib compressed file: a JSON header line followed by
+    the body. The LRU order is the file modification time, touched on every
+    hit, so it survives restarts. The lock only guards the index of the
+    entries: files are read, written and compressed outside of it.
+    """
+
+    def __init__(self, directory, ttls=None, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.ttls = DEFAULT_TTLS.copy() if ttls is None else ttls
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key -> size, oldest first
+        self.size = 0
+        self.hits = self.misses = self.stores = self.expired = self.evictions = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._load()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _load(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not KEY_PATTERN.match(name):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                entries.append((stat.st_mtime, name, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self.size += size
+
+    def ttl(self, request):
+        if request.method not in ("GET", "POST") or UNCACHEABLE_PATH.search(request.url):
+            return None
+        return self.ttls.get(service_name(request.url))
+
+    def get(self, request, key):
+        """Return the cached response of request, or None.
+        """
+        path = self._path(key)
+        with self._lock:
+            size = self._entries.get(key)
+            if size is None:
+                self.misses += 1
+                return None
+        try:
+            with open(path, "rb") as entry_fd:
+                data = zlib.decompress(entry_fd.read())
+            header, _, body = data.partition(b"\n")
+            header = json.loads(header.decode("utf-8"))
+        except (IOError, OSError, zlib.error, ValueError):  # Evicted meanwhile, or corrupted
+            header = None
+        stale = header is None or time.time() - header["created"] > self.ttl(request)
+        with self._lock:
+            if stale:
+                self.misses += 1
+                self.expired += header is not None
+                # Unless another thread stored the entry again meanwhile
+                stale_path = self._remove(key) if self._entries.get(key) == size else None
+            else:
+                self.hits += 1
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+        if stale:
+            _delete(stale_path)
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return _build_response(request, header, body)
+
+    def put(self, request, key, response):
+        """Store a 200 response, reading its body.
+        """
+        if response.status_code != 200:
+            return
+        header = json.dumps({
+            "created": time.time(),
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": dict(response.headers),
+        }).encode("utf-8")
+        data = zlib.compress(header + b"\n" + response.content)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as entry_fd:
+            entry_fd.write(data)
+        os.replace(temp_path, path)
+        evicted = []
+        with self._lock:
+            self.size += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self.stores += 1
+            while self.size > self.max_size and self._entries:
+                evicted.append(self._remove(next(iter(self._entries))))
+                self.evictions += 1
+        for evicted_path in evicted:
+            _delete(evicted_path)
+
+    def _remove(self, key):
+        """Drop an entry from the index, with the lock held, return the path of its file to delete.
+        """
+        self.size -= self._entries.pop(key, 0)
+        return self._path(key)
+
+    def send(self, send, request):
+        """Answer request from the cache, or with send(request) and store the answer.
+        """
+        if self.ttl(request) is None:
+            return send(request)
+        key = request_key(request)
+        response = self.get(request, key)
+        if response is None:
+            response = send(request)
+            self.put(request, key, response)
+        return response
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / float(lookups) if lookups else 0.0,
+                "stores": self.stores,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+
+def _delete(path):
+    if path is None:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _build_response(request, header, body):
+    response = requests.Response()
+    response.status_code = header["status"]
+    response.reason = header["reason"]
+    response.headers = CaseInsensitiveDict(header["headers"])
+    response.headers["Content-Length"] = str(len(body))
+    response.headers.pop("Content-Encoding", None)  # Stored decoded
+    response.headers.pop("Transfer-Encoding", None)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = body
+    response._content_consumed = True
+    response.url = request.url
+    response.request = request
+    response.from_cache = True
+    return response
+
+
+CACHE = None
+
+
+def enable_cache(directory, ttls=None, max_size=DEFAULT_MAX_SIZE):
+    """Cache the responses of the shared clients in directory, return the cache.
+    """
+    global CACHE
+    CACHE = ResponseCache(directory, ttls, max_size)
+    return CACHE
+
+
+def enable_cache_from_environ():
+    """Enable the cache configured by the COGNITIVE_SERVICES_CACHE_* env variables, return it.
+
+    Return None, leaving the cache as it is, if COGNITIVE_SERVICES_CACHE_DIR is not set.
+    """
+    if not os.environ.get(CACHE_DIR_ENV_NAME):
+        return None
+    return enable_cache(
+        os.environ[CACHE_DIR_ENV_NAME],
+        parse_ttls(os.environ[CACHE_TTL_ENV_NAME]) if os.environ.get(CACHE_TTL_ENV_NAME) else None,
+        int(float(os.environ.get(CACHE_SIZE_ENV_NAME, DEFAULT_MAX_SIZE / 1024 / 1024)) * 1024 * 1024)
+    )
+
+
+def cache_stats():
+    return CACHE.stats() if CACHE is not None else None
@@ -0,0 +1,732 @@
+"""Local stand-in for the Cognitive Services endpoints used by the samples.
+
+Nothing here is needed to run the samples against Azure. This is an asyncio
+HTTP server answering canned, schema-valid responses for the operations the
+samples use, with configurable latency and throttling, so the samples can be
+run under load without spending quota:
+
+    python -m samples._infra.standin --port 8080 --latency default=lognormal:-3,0.5 --throttle-rate 0.05
+
+Then point the launcher at it:
+
+    COGNITIVE_SERVICES_ENDPOINT_OVERRIDE=http://127.0.0.1:8080 python example.py
+
+Requests are routed on their path only, so the host hard-coded in a sample
+does not matter once overridden.
+"""
+import argparse
+import asyncio
+import collections
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request",
+                404: "Not Found", 429: "Too Many Requests"}
+
+# Number of polls answering "Running" before an operation succeeds
+OPERATION_POLLS = 2
+
+Response = collections.namedtuple("Response", ["status", "body", "headers"])
+
+
+def parse_latency(spec):
+    """Return a function drawing a latency in seconds from a spec string.
+
+    Supported specs: "fixed:S", "uniform:LOW,HIGH", "normal:MEAN,STDDEV",
+    "lognormal:MU,SIGMA" and "exponential:MEAN", in seconds.
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    draws = {
+        "fixed": lambda: values[0],
+        "uniform": lambda: random.uniform(values[0], values[1]),
+        "normal": lambda: random.gauss(values[0], values[1]),
+        "lognormal": lambda: random.lognormvariate(values[0], values[1]),
+        "exponential": lambda: random.expovariate(1 / values[0]),
+    }
+    if kind not in draws:
+        raise ValueError("Unknown latency distribution {}".format(spec))
+    draw = draws[kind]
+    draw()  # Fail now on missing parameters
+    return lambda: max(0.0, draw())
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body.decode("utf-8"))
+    except ValueError:
+        return {}
+
+
+def _rectangle(index=0):
+    return {"left": 100 + 150 * index, "top": 80, "width": 120, "height": 120}
+
+
+def _word_box(x, y, width=60, height=20):
+    return [x, y, x + width, y, x + width, y + height, x, y + height]
+
+
+class StandIn(object):
+    """Canned Cognitive Services, with the state needed for the samples to be consistent.
+
+    latencies maps a service name ("face", "vision", "contentmoderator",
+    "bing", "customvision", "anomalydetector", or "default") to a latency
+    spec. throttle_rate is the probability to answer 429 to any request, and
+    tps, if set, the number of requests per second and subscription key
+    accepted before answering 429.
+    """
+
+    def __init__(self, latencies=None, throttle_rate=0.0, retry_after=1, tps=None):
+        self.latencies = {service: parse_latency(spec)
+                          for service, spec in (latencies or {}).items()}
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.tps = tps
+        self.windows = {}
+        self.operations = {}
+        self.persons = collections.defaultdict(list)
+        self.persisted_faces = collections.defaultdict(list)
+        self.stats = collections.Counter()
+        self.routes = [
+            ("POST", r"/face/v[\d.]+/detect$", "face", self.face_detect),
+            ("POST", r"/face/v[\d.]+/findsimilars$", "face", self.face_find_similar),
+            ("POST", r"/face/v[\d.]+/identify$", "face", self.face_identify),
+            ("POST", r"/face/v[\d.]+/verify$", "face", self.face_verify),
+            ("POST", r"/face/v[\d.]+/group$", "face", self.face_group),
+            ("POST", r"/face/v[\d.]+/(?P<kind>(large)?persongroups)/(?P<group>[^/]+)/persons$",
+             "face", self.face_person_create),
+            ("GET", r"/face/v[\d.]+/(large)?persongroups/[^/]+/persons/(?P<person>[^/]+)$",
+             "face", self.face_person_get),
+            ("POST", r"/face/v[\d.]+/(?P<kind>\w+)/(?P<group>[^/]+)(/persons/[^/]+)?/persistedfaces$",
+             "face", self.face_add_face),
+            ("GET", r"/face/v[\d.]+/\w+/[^/]+/training$", "face", self.face_training_status),
+            ("POST", r"/face/v[\d.]+/\w+/[^/]+/train$", "face", self.accepted),
+            ("GET", r"/face/v[\d.]+/(?P<kind>(large)?facelists)/(?P<group>[^/]+)/persistedfaces$",
+             "face", self.face_list_faces),
+            ("GET", r"/face/v[\d.]+/(?P<kind>facelists)/(?P<group>[^/]+)$", "face", self.face_list_get),
+            ("PUT", r"/face/", "face", self.empty),
+            ("PATCH", r"/face/", "face", self.empty),
+            ("DELETE", r"/face/", "face", self.empty),
+            ("POST", r"/vision/v[\d.]+/analyze$", "vision", self.vision_analyze),
+            ("POST", r"/vision/v[\d.]+/ocr$", "vision", self.vision_ocr),
+            ("POST", r"/vision/v[\d.]+/recognizeText$", "vision", self.vision_recognize_text),
+            ("GET", r"/vision/v[\d.]+/textOperations/(?P<operation>[^/]+)$",
+             "vision", self.vision_text_operation),
+            ("POST", r"/vision/v[\d.]+/read/core/asyncBatchAnalyze$", "vision", self.vision_read),
+            ("POST", r"/vision/v[\d.]+/read/analyze$", "vision", self.vision_read),
+            ("GET", r"/vision/v[\d.]+/read/(analyzeResults|operations)/(?P<operation>[^/]+)$",
+             "vision", self.vision_read_operation),
+            ("POST", r"/contentmoderator/moderate/v[\d.]+/ProcessText/Screen/?$",
+             "contentmoderator", self.moderator_screen_text),
+            ("POST", r"/contentmoderator/moderate/v[\d.]+/ProcessImage/Match$",
+             "contentmoderator", self.moderator_match),
+            ("GET", r"/bing/v[\d.]+/search$", "bing", self.bing_web),
+            ("GET", r"/bing/v[\d.]+/news(/search)?$", "bing", self.bing_news),
+            ("GET", r"/bing/v[\d.]+/images(/search)?$", "bing", self.bing_images),
+            ("GET", r"/bing/v[\d.]+/videos(/search)?$", "bing", self.bing_videos),
+            ("GET", r"/bing/v[\d.]+/entities/?$", "bing", self.bing_entities),
+            ("GET", r"/customvision/v[\d.]+/[Tt]raining/projects$", "customvision", self.cv_projects),
+            ("POST", r"/customvision/v[\d.]+/[Tt]raining/projects$", "customvision", self.cv_project),
+            ("POST", r"/customvision/v[\d.]+/[Tt]raining/projects/[^/]+/tags$", "customvision", self.cv_tag),
+            ("POST", r"/customvision/v[\d.]+/[Tt]raining/projects/[^/]+/images", "customvision", self.cv_images),
+            ("POST", r"/customvision/v[\d.]+/[Tt]raining/projects/[^/]+/train$", "customvision", self.cv_iteration),
+            ("GET", r"/customvision/v[\d.]+/[Tt]raining/projects/[^/]+/iterations/[^/]+$",
+             "customvision", self.cv_iteration),
+            ("POST", r"/customvision/v[\d.]+/[Tt]raining/projects/[^/]+/iterations/[^/]+/publish$",
+             "customvision", self.cv_publish),
+            ("POST", r"/customvision/v[\d.]+/[Pp]rediction/[^/]+/classify/", "customvision", self.cv_predict),
+            ("POST", r"/customvision/v[\d.]+/[Pp]rediction/[^/]+/detect/", "customvision", self.cv_predict),
+            ("POST", r"/anomalydetector/v[\d.]+/timeseries/entire/detect$",
+             "anomalydetector", self.anomaly_entire),
+            ("POST", r"/anomalydetector/v[\d.]+/timeseries/last/detect$",
+             "anomalydetector", self.anomaly_last),
+        ]
+        self.routes = [(method, re.compile(pattern), service, handler)
+                       for method, pattern, service, handler in self.routes]
+
+    # Plumbing
+
+    def latency(self, service):
+        draw = self.latencies.get(service) or self.latencies.get("default")
+        return draw() if draw else 0.0
+
+    def throttled(self, request):
+        """Return True if this request should be answered 429.
+        """
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            return True
+        if not self.tps:
+            return False
+        key = request.headers.get("ocp-apim-subscription-key", "")
+        second = int(time.time())
+        window_second, count = self.windows.get(key, (second, 0))
+        if window_second != second:
+            window_second, count = second, 0
+        self.windows[key] = (window_second, count + 1)
+        return count >= self.tps
+
+    async def handle(self, request):
+        """Return the Response to a request.
+        """
+        for method, pattern, service, handler in self.routes:
+            match = pattern.search(request.path)
+            if method != request.method or not match:
+                continue
+            await asyncio.sleep(self.latency(service))
+            if self.throttled(request):
+                self.stats["throttled"] += 1
+                return Response(429, {"error": {
+                    "code": "429",
+                    "message": "Rate limit is exceeded. Try again in {} seconds.".format(self.retry_after)
+                }}, {"Retry-After": str(self.retry_after)})
+            self.stats[service] += 1
+            return handler(request, **match.groupdict())
+        self.stats["not_found"] += 1
+        return Response(404, {"error": {
+            "code": "NotFound",
+            "message": "{} {} is not served by the stand-in.".format(request.method, request.path)
+        }}, {})
+
+    def empty(self, request, **_):
+        return Response(200, None, {})
+
+    def accepted(self, request, **_):
+        return Response(202, None, {})
+
+    def start_operation(self, request, location):
+        operation_id = str(uuid.uuid4())
+        self.operations[operation_id] = 0
+        return Response(202, None, {
+            "Operation-Location": "{}://{}{}/{}".format(
+                request.scheme, request.headers.get("host", "localhost"), location, operation_id)
+        })
+
+    def poll_operation(self, operation_id):
+        """Return the status of an operation, "Running" for the first polls.
+        """
+        if operation_id not in self.operations:
+            return None
+        self.operations[operation_id] += 1
+        if self.operations[operation_id] <= OPERATION_POLLS:
+            return "Running"
+        return "Succeeded"
+
+    # Face
+
+    def face_detect(self, request, **_):
+        attributes = request.query.get("returnFaceAttributes", [""])[0]
+        faces = []
+        for index in range(2):
+            face = {"faceId": str(uuid.uuid4()), "faceRectangle": _rectangle(index)}
+            if attributes:
+                face["faceAttributes"] = {
+                    "age": 30.0 + index,
+                    "gender": "male" if index else "female",
+                    "smile": 0.5,
+                    "facialHair": {"moustache": 0.1, "beard": 0.1, "sideburns": 0.0},
+                    "glasses": "NoGlasses",
+                    "headPose": {"pitch": 0.0, "roll": 1.5, "yaw": -3.2},
+                    "emotion": {"anger": 0.0, "contempt": 0.0, "disgust": 0.0, "fear": 0.0,
+                                "happiness": 0.9, "neutral": 0.1, "sadness": 0.0, "surprise": 0.0},
+                    "hair": {"bald": 0.1, "invisible": False,
+                             "hairColor": [{"color": "brown", "confidence": 0.9},
+                                           {"color": "black", "confidence": 0.6}]},
+                    "makeup": {"eyeMakeup": False, "lipMakeup": True},
+                    "occlusion": {"foreheadOccluded": False, "eyeOccluded": False, "mouthOccluded": False},
+                    "accessories": [],
+                    "blur": {"blurLevel": "low", "value": 0.05},
+                    "exposure": {"exposureLevel": "goodExposure", "value": 0.6},
+                    "noise": {"noiseLevel": "low", "value": 0.1},
+                }
+            faces.append(face)
+        return Response(200, faces, {})
+
+    def face_find_similar(self, request, **_):
+        body = _json_body(request)
+        if body.get("faceIds"):
+            candidates = [{"faceId": face_id} for face_id in body["faceIds"][:2]]
+        else:
+            face_list = body.get("faceListId") or body.get("largeFaceListId")
+            candidates = [{"persistedFaceId": face["persistedFaceId"]}
+                          for face in self.persisted_faces[face_list][:2]]
+        for rank, candidate in enumerate(candidates):
+            candidate["confidence"] = round(0.9 - 0.2 * rank, 2)
+        return Response(200, candidates, {})
+
+    def face_identify(self, request, **_):
+        body = _json_body(request)
+        group = body.get("personGroupId") or body.get("largePersonGroupId")
+        persons = self.persons[group]
+        return Response(200, [
+            {"faceId": face_id,
+             "candidates": [{"personId": persons[index % len(persons)]["personId"], "confidence": 0.87}]
+             if persons else []}
+            for index, face_id in enumerate(body.get("faceIds", []))
+        ], {})
+
+    def face_verify(self, request, **_):
+        body = _json_body(request)
+        ids = sorted(value for value in body.values() if isinstance(value, str))
+        digest = hashlib.sha1("".join(ids).encode("utf-8")).hexdigest()  # Not hash(), salted per process
+        confidence = 0.3 + (int(digest, 16) % 60) / 100.0
+        return Response(200, {"isIdentical": confidence >= 0.5, "confidence": confidence}, {})
+
+    def face_group(self, request, **_):
+        face_ids = _json_body(request).get("faceIds", [])
+        groups = [face_ids[index:index + 2] for index in range(0, len(face_ids) - 1, 2)]
+        messy_group = face_ids[-1:] if len(face_ids) % 2 else []
+        return Response(200, {"groups": groups, "messyGroup": messy_group}, {})
+
+    def face_person_create(self, request, kind, group):
+        person = {"personId": str(uuid.uuid4()), "persistedFaceIds": []}
+        person.update(_json_body(request))
+        self.persons[group].append(person)
+        return Response(200, {"personId": person["personId"]}, {})
+
+    def face_person_get(self, request, person, **_):
+        for persons in self.persons.values():
+            for candidate in persons:
+                if candidate["personId"] == person:
+                    return Response(200, candidate, {})
+        return Response(404, {"error": {"code": "PersonNotFound", "message": "Person is not found."}}, {})
+
+    def face_add_face(self, request, kind, group):
+        face = {"persistedFaceId": str(uuid.uuid4()),
+                "userData": request.query.get("userData", [None])[0]}
+        self.persisted_faces[group].append(face)
+        return Response(200, {"persistedFaceId": face["persistedFaceId"]}, {})
+
+    def face_training_status(self, request, **_):
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        return Response(200, {"status": "succeeded", "createdDateTime": now,
+                              "lastActionDateTime": now, "message": None}, {})
+
+    def face_list_faces(self, request, kind, group):
+        return Response(200, self.persisted_faces[group], {})
+
+    def face_list_get(self, request, kind, group):
+        return Response(200, {"faceListId": group, "name": group,
+                              "persistedFaces": self.persisted_faces[group]}, {})
+
+    # Computer Vision
+
+    def vision_analyze(self, request, **_):
+        return Response(200, {
+            "categories": [{"name": "building_", "score": 0.9}],
+            "tags": [{"name": "house", "confidence": 0.99}, {"name": "grass", "confidence": 0.95}],
+            "description": {"tags": ["house", "grass"],
+                            "captions": [{"text": "a house with a lawn", "confidence": 0.9}]},
+            "color": {"dominantColorForeground": "White", "dominantColorBackground": "Green",
+                      "dominantColors": ["White", "Green"], "accentColor": "4A7A2F", "isBwImg": False},
+            "imageType": {"clipArtType": 0, "lineDrawingType": 0},
+            "faces": [],
+            "requestId": str(uuid.uuid4()),
+            "metadata": {"width": 1024, "height": 768, "format": "Jpeg"},
+        }, {})
+
+    def vision_ocr(self, request, **_):
+        lines = []
+        for row, text in enumerate(["make things happen", "with the stand-in"]):
+            words = [{"boundingBox": "{},{},60,20".format(10 + 70 * column, 10 + 30 * row), "text": word}
+                     for column, word in enumerate(text.split())]
+            lines.append({"boundingBox": "10,{},{},20".format(10 + 30 * row, 70 * len(words)),
+                          "words": words})
+        return Response(200, {
+            "language": "en", "textAngle": 0.0, "orientation": "Up",
+            "regions": [{"boundingBox": "10,10,210,50", "lines": lines}],
+        }, {})
+
+    def _recognized_lines(self):
+        lines = []
+        for row, word in enumerate(["make", "things", "happen"]):
+            box = _word_box(10, 10 + 30 * row)
+            lines.append({"boundingBox": box, "text": word,
+                          "words": [{"boundingBox": box, "text": word}]})
+        return lines
+
+    def vision_recognize_text(self, request, **_):
+        return self.start_operation(request, re.sub(r"recognizeText$", "textOperations", request.path))
+
+    def vision_text_operation(self, request, operation):
+        status = self.poll_operation(operation)
+        if status is None:
+            return Response(404, {"error": {"code": "NotFound", "message": "Operation not found."}}, {})
+        body = {"status": status}
+        if status == "Succeeded":
+            body["recognitionResult"] = {"lines": self._recognized_lines()}
+        return Response(200, body, {})
+
+    def vision_read(self, request, **_):
+        location = re.sub(r"read/(core/asyncBatchAnalyze|analyze)$", "read/operations", request.path)
+        return self.start_operation(request, location)
+
+    def vision_read_operation(self, request, operation, **_):
+        status = self.poll_operation(operation)
+        if status is None:
+            return Response(404, {"error": {"code": "NotFound", "message": "Operation not found."}}, {})
+        body = {"status": status}
+        if status == "Succeeded":
+            body["recognitionResults"] = [{
+                "page": 1, "clockwiseOrientation": 0.0, "width": 1024, "height": 768,
+                "unit": "pixel", "lines": self._recognized_lines()
+            }]
+        return Response(200, body, {})
+
+    # Content Moderator
+
+    def _moderator_status(self):
+        return {"Code": 3000, "Description": "OK", "Exception": None}
+
+    def moderator_screen_text(self, request, **_):
+        text = request.body.decode("utf-8", "replace")
+        return Response(200, {
+            "OriginalText": text,
+            "NormalizedText": text,
+            "AutoCorrectedText": text,
+            "Misrepresentation": None,
+            "Language": request.query.get("language", ["eng"])[0],
+            "Terms": None,
+            "Status": self._moderator_status(),
+            "TrackingId": str(uuid.uuid4()),
+        }, {})
+
+    def moderator_match(self, request, **_):
+        return Response(200, {
+            "TrackingId": str(uuid.uuid4()),
+            "CacheID": str(uuid.uuid4()),
+            "IsMatch": False,
+            "Matches": [],
+            "Status": self._moderator_status(),
+        }, {})
+
+    # Bing search
+
+    def _bing_response(self, request, answer_type, **answer):
+        query = request.query.get("q", [""])[0]
+        body = {"_type": answer_type, "queryContext": {"originalQuery": query}}
+        body.update(answer)
+        return Response(200, body, {"BingAPIs-Market": "en-US"})
+
+    def _bing_values(self, request, value_type, count=3, **extra):
+        query = request.query.get("q", [""])[0]
+        values = []
+        for index in range(count):
+            value = {"_type": value_type, "name": "{} result {}".format(query, index + 1),
+                     "url": "https://www.example.com/{}/{}".format(value_type.lower(), index + 1)}
+            value.update(extra)
+            values.append(value)
+        return values
+
+    def bing_web(self, request, **_):
+        return self._bing_response(
+            request, "SearchResponse",
+            webPages={"webSearchUrl": "https://www.bing.com/search", "totalEstimatedMatches": 1000,
+                      "value": self._bing_values(request, "WebPage", displayUrl="www.example.com")},
+            images={"id": "images", "value": self._bing_values(
+                request, "ImageObject", contentUrl="https://www.example.com/image.jpg")},
+            news={"id": "news", "value": self._bing_values(request, "NewsArticle", description="news")},
+            videos={"id": "videos", "value": self._bing_values(
+                request, "VideoObject", contentUrl="https://www.example.com/video.mp4")},
+        )
+
+    def bing_news(self, request, **_):
+        return self._bing_response(
+            request, "News", totalEstimatedMatches=1000,
+            value=self._bing_values(request, "NewsArticle", description="news",
+                                    datePublished="2018-01-01T00:00:00",
+                                    provider=[{"_type": "Organization", "name": "Contoso"}]))
+
+    def bing_images(self, request, **_):
+        return self._bing_response(
+            request, "Images", totalEstimatedMatches=1000, nextOffset=3,
+            value=self._bing_values(request, "ImageObject", contentUrl="https://www.example.com/image.jpg",
+                                    thumbnailUrl="https://www.example.com/thumbnail.jpg",
+                                    imageInsightsToken="token"))
+
+    def bing_videos(self, request, **_):
+        return self._bing_response(
+            request, "Videos", totalEstimatedMatches=1000,
+            value=self._bing_values(request, "VideoObject", contentUrl="https://www.example.com/video.mp4",
+                                    videoId="0", motionThumbnailUrl="https://www.example.com/motion.mp4"))
+
+    def bing_entities(self, request, **_):
+        query = request.query.get("q", [""])[0]
+        return self._bing_response(
+            request, "SearchResponse",
+            entities={"value": [{
+                "_type": "Person" if " " in query else "Thing",
+                "name": query,
+                "description": "{} as seen by the stand-in.".format(query),
+                "bingId": str(uuid.uuid4()),
+                "entityPresentationInfo": {"entityScenario": "DominantEntity",
+                                           "entityTypeHints": ["Person"]},
+                "contractualRules": [],
+            }]},
+            places={"value": [{"_type": "Restaurant", "name": query,
+                               "telephone": "(000) 000-0000",
+                               "entityPresentationInfo": {"entityScenario": "ListItem",
+                                                          "entityTypeHints": ["Restaurant"]}}]},
+        )
+
+    # Custom Vision
+
+    def cv_projects(self, request, **_):
+        return Response(200, [], {})
+
+    def cv_project(self, request, **_):
+        return Response(200, {"id": str(uuid.uuid4()),
+                              "name": request.query.get("name", ["project"])[0],
+                              "settings": {}}, {})
+
+    def cv_tag(self, request, **_):
+        return Response(200, {"id": str(uuid.uuid4()),
+                              "name": request.query.get("name", ["tag"])[0],
+                              "imageCount": 0}, {})
+
+    def cv_images(self, request, **_):
+        return Response(200, {"isBatchSuccessful": True, "images": []}, {})
+
+    def cv_iteration(self, request, **_):
+        return Response(200, {"id": str(uuid.uuid4()), "name": "Iteration 1",
+                              "status": "Completed", "exportable": False}, {})
+
+    def cv_publish(self, request, **_):
+        return Response(200, True, {})
+
+    def cv_predict(self, request, **_):
+        predictions = [
+            {"probability": 0.95, "tagId": str(uuid.uuid4()), "tagName": "Japanese Cherry",
+             "boundingBox": {"left": 0.1, "top": 0.1, "width": 0.3, "height": 0.3}},
+            {"probability": 0.05, "tagId": str(uuid.uuid4()), "tagName": "Hemlock",
+             "boundingBox": {"left": 0.5, "top": 0.5, "width": 0.2, "height": 0.2}},
+        ]
+        return Response(200, {"id": str(uuid.uuid4()), "project": str(uuid.uuid4()),
+                              "iteration": str(uuid.uuid4()),
+                              "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                              "predictions": predictions}, {})
+
+    # Anomaly Detector
+
+    def anomaly_entire(self, request, **_):
+        series = _json_body(request).get("series", [])
+        values = [point.get("value", 0.0) for point in series]
+        mean = sum(values) / len(values) if values else 0.0
+        margin = max(abs(value - mean) for value in values) / 2 if values else 0.0
+        anomalies = [abs(value - mean) > margin for value in values]
+        return Response(200, {
+            "period": 7,
+            "expectedValues": [mean] * len(values),
+            "upperMargins": [margin] * len(values),
+            "lowerMargins": [margin] * len(values),
+            "isAnomaly": anomalies,
+            "isNegativeAnomaly": [anomaly and value < mean for anomaly, value in zip(anomalies, values)],
+            "isPositiveAnomaly": [anomaly and value > mean for anomaly, value in zip(anomalies, values)],
+        }, {})
+
+    def anomaly_last(self, request, **_):
+        entire = self.anomaly_entire(request).body
+        if not entire["isAnomaly"]:
+            return Response(400, {"code": "InvalidSeries", "message": "The series is empty."}, {})
+        return Response(200, {
+            "period": entire["period"],
+            "suggestedWindow": 29,
+            "expectedValue": entire["expectedValues"][-1],
+            "upperMargin": entire["upperMargins"][-1],
+            "lowerMargin": entire["lowerMargins"][-1],
+            "isAnomaly": entire["isAnomaly"][-1],
+            "isNegativeAnomaly": entire["isNegativeAnomaly"][-1],
+            "isPositiveAnomaly": entire["isPositiveAnomaly"][-1],
+        }, {})
+
+
+class _Request(object):
+
+    def __init__(self, method, target, headers, body, scheme="http"):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path
+        self.query = parse_qs(url.query)
+        self.headers = headers
+        self.body = body
+        self.scheme = scheme
+
+
+async def _read_request(reader):
+    """Read one HTTP/1.1 request, or return None at end of connection.
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if not size:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b"".join(chunks)
+    else:
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return _Request(method, target, headers, body)
+
+
+def _write_response(writer, response):
+    body = b"" if response.body is None else json.dumps(response.body).encode("utf-8")
+    headers = {
+        "Content-Type": "application/json; charset=utf-8",
+        "Content-Length": str(len(body)),
+        "apim-request-id": str(uuid.uuid4()),
+    }
+    headers.update(response.headers)
+    head = "HTTP/1.1 {} {}\r\n".format(response.status, HTTP_REASONS.get(response.status, ""))
+    head += "".join("{}: {}\r\n".format(name, value) for name, value in headers.items())
+    writer.write(head.encode("latin-1") + b"\r\n" + body)
+
+
+class StandInServer(object):
+    """asyncio HTTP server in front of a StandIn.
+    """
+
+    def __init__(self, standin=None, host="127.0.0.1", port=0):
+        self.standin = standin or StandIn()
+        self.host = host
+        self.port = port
+        self.server = None
+
+    @property
+    def url(self):
+        return "http://{}:{}".format(self.host, self.port)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                response = await self.standin.handle(request)
+                _write_response(writer, response)
+                await writer.drain()
+                if request.headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        await self.start()
+        print("Cognitive Services stand-in listening on {}".format(self.url))
+        async with self.server:
+            await self.server.serve_forever()
+
+    def start_in_thread(self):
+        """Serve from a daemon thread, return once listening. Handy in tests and benchmarks.
+        """
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name="standin", daemon=True).start()
+        started.wait()
+        return self
+
+
+def _redirect_aiohttp(base_url):
+    """Send every aiohttp request to base_url, for the async (aio) azure-core clients.
+    """
+    try:
+        import aiohttp
+    except ImportError:  # No async client can be used either
+        return
+
+    base = urlsplit(base_url)
+    original_request = aiohttp.ClientSession._request
+    if getattr(original_request, "redirects_to", None) == base_url:
+        return
+
+    def _request(session, method, str_or_url, **kwargs):
+        url = urlsplit(str(str_or_url))
+        return original_request(
+            session, method, urlunsplit((base.scheme, base.netloc, url.path, url.query, url.fragment)), **kwargs)
+
+    _request.redirects_to = base_url
+    aiohttp.ClientSession._request = _request
+
+
+def redirect_requests(base_url):
+    """Send every request made through requests or aiohttp to base_url, keeping path and query.
+
+    This covers the msrest based clients as well as the azure-core ones,
+    sync and async.
+    """
+    import requests.adapters
+
+    _redirect_aiohttp(base_url)
+    base = urlsplit(base_url)
+    original_send = requests.adapters.HTTPAdapter.send
+    if getattr(original_send, "redirects_to", None) == base_url:
+        return
+
+    def send(adapter, request, **kwargs):
+        url = urlsplit(request.url)
+        request.url = urlunsplit((base.scheme, base.netloc, url.path, url.query, url.fragment))
+        request.headers["Host"] = base.netloc
+        return original_send(adapter, request, **kwargs)
+
+    send.redirects_to = base_url
+    requests.adapters.HTTPAdapter.send = send
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Cognitive Services stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", action="append", default=[], metavar="SERVICE=SPEC",
+                        help="latency of a service (face, vision, contentmoderator, bing, customvision, "
+                             "anomalydetector or default), e.g. default=uniform:0.05,0.2")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="probability to answer 429 to any request")
+    parser.add_argument("--tps", type=int,
+                        help="requests per second and subscription key before answering 429")
+    parser.add_argument("--retry-after", type=int, default=1,
+                        help="Retry-After of the 429 responses, in seconds")
+    options = parser.parse_args()
+
+    latencies = dict(latency.split("=", 1) for latency in options.latency)
+    standin = StandIn(latencies, options.throttle_rate, options.retry_after, options.tps)
+    server = StandInServer(standin, options.host, options.port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print(dict(standin.stats))
+
+
+if __name__ == "__main__":
+    main()
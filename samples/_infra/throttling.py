@@ -0,0 +1,246 @@
+"""Admission control of the requests sent by the shared SDK clients.
+
+Cognitive Services tiers allow a fixed number of transactions per second per
+subscription key, and answer 429 beyond it. Every request going through the
+pooled adapter of samples._infra.clients first takes a token from the bucket of its
+(subscription key, service), the service being the first segment of the URL
+path (face, vision, bing, contentmoderator, ...). Requests over the rate wait
+in line instead of failing, and a 429 answer pauses the bucket for the
+Retry-After delay, lowers its rate, then sends the request again.
+
+Rates are set per service, in transactions per second with an optional burst,
+with the COGNITIVE_SERVICES_RATE_LIMITS env variable:
+
+    COGNITIVE_SERVICES_RATE_LIMITS="face=10,bing=3/6"
+
+or with set_rate_limit. A service without a rate is not limited until its
+first 429, its rate is then learnt from the traffic that was throttled.
+"""
+import collections
+import os
+import threading
+import time
+
+from samples._infra.polling import retry_after_seconds
+
+RATE_LIMITS_ENV_NAME = "COGNITIVE_SERVICES_RATE_LIMITS"
+DEFAULT_RETRY_AFTER = 1.0
+MAX_THROTTLED_RETRIES = 5
+
+
+def parse_rate_limits(spec):
+    """Parse "service=tps[/burst],..." into a dict service -> (tps, burst).
+    """
+    rate_limits = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        service, _, value = item.partition("=")
+        tps, _, burst = value.partition("/")
+        try:
+            rate_limits[service.strip().lower()] = (
+                float(tps), float(burst) if burst else None)
+        except ValueError:
+            raise ValueError("Invalid rate limit {!r}, expected service=tps[/burst]".format(item))
+    return rate_limits
+
+
+class TokenBucket(object):
+    """Token bucket handing out slots in arrival order.
+
+    tps is the configured ceiling (None for no limit) and rate the current
+    one: it is cut by decrease on every 429 and grows back by increase of the
+    ceiling on every accepted request. Tokens may go below zero, a negative
+    count being the line of reserved slots.
+    """
+
+    def __init__(self, tps=None, burst=None, decrease=0.8, increase=0.01, min_rate=0.1):
+        self.tps = tps
+        self.burst = burst or max(1.0, tps or 1.0)
+        self.rate = tps
+        self.decrease = decrease
+        self.increase = increase
+        self.min_rate = min_rate
+        self.tokens = self.burst
+        self.blocked_until = 0.0
+        self._updated = time.time()
+        self._admitted = collections.deque()
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.throttled = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self, now):
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until the request may be sent, return the time waited.
+        """
+        start = time.time()
+        with self._lock:
+            self._refill(start)
+            wait = self.blocked_until - start
+            if self.rate:
+                self.tokens -= 1
+                wait = max(wait, -self.tokens / self.rate)
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            while wait > 0:
+                time.sleep(wait)
+                with self._lock:
+                    wait = self.blocked_until - time.time()  # 429 received meanwhile
+        finally:
+            now = time.time()
+            with self._lock:
+                self.waiting -= 1
+                self.requests += 1
+                self.total_wait += now - start
+                self.max_wait = max(self.max_wait, now - start)
+                self._admitted.append(now)
+                while self._admitted[0] < now - 1.0:
+                    self._admitted.popleft()
+        return now - start
+
+    def accepted(self):
+        """Let the rate grow back toward its ceiling after a success.
+        """
+        with self._lock:
+            if self.rate:
+                ceiling = self.tps or float("inf")
+                self.rate = min(ceiling, self.rate + self.increase * (self.tps or self.rate))
+
+    def throttled_for(self, retry_after=None):
+        """Pause the bucket after a 429 and lower its rate.
+
+        Without a rate yet, start from the rate requests were admitted at
+        during the last second.
+        """
+        now = time.time()
+        with self._lock:
+            self.throttled += 1
+            self._refill(now)
+            pause = DEFAULT_RETRY_AFTER if retry_after is None else retry_after
+            self.blocked_until = max(self.blocked_until, now + pause)
+            if self.rate:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+            else:
+                self.rate = max(self.min_rate, len(self._admitted) * self.decrease)
+                self.tokens = 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tps": self.tps,
+                "rate": self.rate,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "queue_depth": self.waiting,
+                "max_queue_depth": self.max_waiting,
+                "total_wait": self.total_wait,
+                "mean_wait": self.total_wait / self.requests if self.requests else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+
+def service_name(url):
+    """Return the service of a Cognitive Services URL: the first path segment.
+    """
+    path = url.split("://", 1)[-1].partition("/")[2]
+    return path.split("/", 1)[0].split("?", 1)[0].lower() or "default"
+
+
+class RateLimiter(object):
+    """One token bucket per (subscription key, service), created on first use.
+    """
+
+    def __init__(self, rate_limits=None):
+        if rate_limits is None:
+            rate_limits = parse_rate_limits(os.environ.get(RATE_LIMITS_ENV_NAME, ""))
+        self.rate_limits = rate_limits
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def set_rate_limit(self, service, tps, burst=None):
+        """Set the rate of a service, for its existing and future buckets.
+        """
+        service = service.lower()
+        with self._lock:
+            self.rate_limits[service] = (tps, burst)
+            for (_, bucket_service), bucket in self._buckets.items():
+                if bucket_service == service:
+                    with bucket._lock:
+                        bucket.tps = bucket.rate = tps
+                        bucket.burst = burst or max(1.0, tps or 1.0)
+                        bucket.tokens = min(bucket.tokens, bucket.burst)
+
+    def bucket(self, subscription_key, service):
+        key = (subscription_key, service)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tps, burst = self.rate_limits.get(service, (None, None))
+                bucket = self._buckets[key] = TokenBucket(tps, burst)
+            return bucket
+
+    def send(self, send, request):
+        """Send request with send(request) once admitted, retrying on 429.
+
+        After MAX_THROTTLED_RETRIES, or if the body cannot be sent again,
+        the 429 response is returned for the SDK to raise it.
+        """
+        bucket = self.bucket(
+            request.headers.get("Ocp-Apim-Subscription-Key"),
+            service_name(request.url)
+        )
+        for attempt in range(MAX_THROTTLED_RETRIES + 1):
+            bucket.acquire()
+            response = send(request)
+            response.throttled_retries = attempt
+            if response.status_code != 429:
+                bucket.accepted()
+                return response
+            bucket.throttled_for(retry_after_seconds(response))
+            if attempt == MAX_THROTTLED_RETRIES or not _rewind(request.body):
+                return response
+            response.close()
+        return response
+
+    def stats(self):
+        """Return the statistics of every bucket, by "service/...key end".
+        """
+        with self._lock:
+            buckets = list(self._buckets.items())
+        return {
+            "{}/...{}".format(service, (subscription_key or "")[-4:]): bucket.stats()
+            for (subscription_key, service), bucket in buckets
+        }
+
+
+def _rewind(body):
+    """Make a request body readable again, return False if it cannot be.
+    """
+    if body is None or isinstance(body, (bytes, str)):
+        return True
+    try:
+        body.seek(0)
+        return True
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+LIMITER = RateLimiter()
+
+
+def set_rate_limit(service, tps, burst=None):
+    LIMITER.set_rate_limit(service, tps, burst)
+
+
+def throttling_stats():
+    return LIMITER.stats()
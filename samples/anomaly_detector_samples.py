@@ -1,4 +1,5 @@
 from azure.ai.anomalydetector import AnomalyDetectorClient
+from azure.ai.anomalydetector.aio import AnomalyDetectorClient as AsyncAnomalyDetectorClient
 from azure.ai.anomalydetector.models import DetectRequest, TimeSeriesPoint, TimeGranularity, \
     AnomalyDetectorError
 from azure.core.credentials import AzureKeyCredential
@@ -51,6 +52,32 @@ def entire_detect(subscription_key):
         print('No anomalies were detected in the time series.')
 
 
+async def entire_detect_async(subscription_key):
+    print("Sample of detecting anomalies in the entire series, with the async client.")
+    # Add your Azure Anomaly Detector subscription key to your environment variables.
+    endpoint = os.environ["ANOMALY_DETECTOR_ENDPOINT"]
+
+    async with AsyncAnomalyDetectorClient(AzureKeyCredential(subscription_key), endpoint) as client:
+        request = get_request()
+
+        try:
+            response = await client.detect_entire_series(request)
+        except AnomalyDetectorError as e:
+            print('Error code: {}'.format(e.error.code), 'Error message: {}'.format(e.error.message))
+            return
+        except Exception as e:
+            print(e)
+            return
+
+    if any(response.is_anomaly):
+        print('Anomaly was detected from the series at index:')
+        for i, value in enumerate(response.is_anomaly):
+            if value:
+                print(i)
+    else:
+        print('No anomalies were detected in the time series.')
+
+
 def last_detect(subscription_key):
     print("Sample of detecting whether the latest point in series is anomaly.")
     # Add your Azure Anomaly Detector subscription key to your environment variables.
@@ -1,9 +1,10 @@
 import os
-import time
 
 from azure.cognitiveservices.knowledge.qnamaker import QnAMakerClient
 from azure.cognitiveservices.knowledge.qnamaker.models import QnADTO, MetadataDTO, CreateKbDTO, OperationStateType, UpdateKbOperationDTO, UpdateKbOperationDTOAdd
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
+from samples._infra.polling import poll_until_done, PollingTimeout
 
 # Add your QnaMaker subscription key and endpoint to your environment variables.
 SUBSCRIPTION_KEY = os.environ['QNA_MAKER_SUBSCRIPTION_KEY']
@@ -43,21 +44,25 @@ def knowledge_based_crud_sample(subscription_key):
         This helper function takes in a QnAMakerClient and an operation, and loops until the operation has either succeeded
         or failed and returns the operation.
         """
-        for i in range(20):
-            if operation.operation_state in [OperationStateType.not_started, OperationStateType.running]:
-                print("Waiting for operation: {} to complete.".format(
-                    operation.operation_id))
-                time.sleep(5)
-                operation = client.operations.get_details(
-                    operation_id=operation.operation_id)
-            else:
-                break
+        if operation.operation_state in [OperationStateType.not_started, OperationStateType.running]:
+            print("Waiting for operation: {} to complete.".format(
+                operation.operation_id))
+            try:
+                operation = poll_until_done(
+                    lambda: client.operations.get_details(
+                        operation_id=operation.operation_id),
+                    lambda operation: operation.operation_state not in [
+                        OperationStateType.not_started, OperationStateType.running],
+                    timeout=100
+                )
+            except PollingTimeout:
+                pass
         if operation.operation_state != OperationStateType.succeeded:
             raise Exception("Operation {} failed to complete.".format(
                 operation.operation_id))
         return operation
 
-    client = QnAMakerClient(endpoint=QNA_ENDPOINT, credentials=CognitiveServicesCredentials(subscription_key))
+    client = get_client(QnAMakerClient, QNA_ENDPOINT, subscription_key)
 
     # Create a KB
     print("Creating KB...")
@@ -1,24 +1,23 @@
 import json
-import time
 import datetime
 from pprint import pprint
 
 from azure.cognitiveservices.language.luis.authoring import LUISAuthoringClient
 
-from msrest.authentication import CognitiveServicesCredentials
+from samples._infra.clients import get_client
+from samples._infra.polling import poll_until_done
 
 SUBSCRIPTION_KEY_ENV_NAME = "LUIS_SUBSCRIPTION_KEY"
 
+LUIS_ENDPOINT = "https://westus.api.cognitive.microsoft.com"
 
-def booking_app(subscription_kuy):
+
+def booking_app(subscription_key):
     """Authoring.
 
     This will create a LUIS Booking application, train and publish it.
     """
-    client = LUISAuthoringClient(
-        'https://westus.api.cognitive.microsoft.com',
-        CognitiveServicesCredentials(subscription_key),
-    )
+    client = get_client(LUISAuthoringClient, LUIS_ENDPOINT, subscription_key)
 
     try:
         # Create a LUIS app
@@ -146,11 +145,12 @@ def booking_app(subscription_kuy):
         is_trained = async_training.status == "UpToDate"
 
         trained_status = ["UpToDate", "Success"]
-        while not is_trained:
-            time.sleep(1)
-            status = client.train.get_status(app_id, version_id)
-            is_trained = all(
-                m.details.status in trained_status for m in status)
+        if not is_trained:
+            poll_until_done(
+                lambda: client.train.get_status(app_id, version_id),
+                lambda status: all(
+                    m.details.status in trained_status for m in status)
+            )
 
         print("Your app is trained. You can now go to the LUIS portal and test it!")
 
@@ -178,10 +178,7 @@ def management(subscription_key):
 
     This will show how to manage your LUIS applications.
     """
-    client = LUISAuthoringClient(
-        'https://westus.api.cognitive.microsoft.com',
-        CognitiveServicesCredentials(subscription_key),
-    )
+    client = get_client(LUISAuthoringClient, LUIS_ENDPOINT, subscription_key)
 
     try:
         # Create a LUIS app
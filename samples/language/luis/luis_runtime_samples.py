@@ -4,10 +4,12 @@ from pprint import pprint
 
 from azure.cognitiveservices.language.luis.runtime import LUISRuntimeClient
 
-from msrest.authentication import CognitiveServicesCredentials
+from samples._infra.clients import get_client
 
 SUBSCRIPTION_KEY_ENV_NAME = "LUIS_SUBSCRIPTION_KEY"
 
+LUIS_ENDPOINT = "https://westus.api.cognitive.microsoft.com"
+
 CWD = os.path.dirname(__file__)
 
 
@@ -16,10 +18,7 @@ def runtime(subscription_key):
 
     This will execute LUIS prediction
     """
-    client = LUISRuntimeClient(
-        'https://westus.api.cognitive.microsoft.com',
-        CognitiveServicesCredentials(subscription_key),
-    )
+    client = get_client(LUISRuntimeClient, LUIS_ENDPOINT, subscription_key)
 
     try:
         query = "Look for hotels near LAX airport"
@@ -9,6 +9,8 @@ from azure.cognitiveservices.search.autosuggest.models import (
 )
 from msrest.authentication import CognitiveServicesCredentials
 
+from samples._infra.clients import get_client
+
 # Add your Bing Autosuggest subscription key to your environment variables.
 SUBSCRIPTION_KEY = os.environ['BING_AUTOSUGGEST_SUBSCRIPTION_KEY']
 ENDPOINT = os.environ['BING_AUTOSUGGEST_ENDPOINT']
@@ -18,10 +20,7 @@ def autosuggest_lookup(subscription_key):
 
     This will look up a single query (Xbox) and print out name and url for first web result.
     """
-    client = AutoSuggestClient(
-        endpoint=ENDPOINT,
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(AutoSuggestClient, ENDPOINT, subscription_key)
 
     try:
         suggestions = client.auto_suggest(
@@ -1,7 +1,8 @@
 import os
 
 from azure.cognitiveservices.search.customimagesearch import CustomImageSearchClient
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
 
 # Add your Bing Custom Search subscription key to your environment variables.
 SUBSCRIPTION_KEY = os.environ['BING_CUSTOM_SEARCH_SUBSCRIPTION_KEY']
@@ -13,9 +14,7 @@ def custom_image_search_result_lookup(subscription_key):
     This will look up a single query (Xbox) and print out number of results, insights token, thumbnail url, content url for the first image result
     """
 
-    client = CustomImageSearchClient(
-        endpoint=ENDPOINT,
-        credentials=CognitiveServicesCredentials(subscription_key))
+    client = get_client(CustomImageSearchClient, ENDPOINT, subscription_key)
     try:
         image_results = client.custom_instance.image_search(
             query="Xbox", custom_config=1)
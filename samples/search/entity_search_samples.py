@@ -2,7 +2,8 @@ import os
 
 from azure.cognitiveservices.search.entitysearch import EntitySearchClient
 from azure.cognitiveservices.search.entitysearch.models import Place, ErrorResponseException
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
 
 # Add your Bing Entity Search subscription key to your environment variables.
 SUBSCRIPTION_KEY = os.environ['BING_ENTITY_SEARCH_SUBSCRIPTION_KEY']
@@ -13,10 +14,7 @@ def dominant_entity_lookup(subscription_key):
 
     This will look up a single entity (Satya Nadella) and print out a short description about them.
     """
-    client = EntitySearchClient(
-        endpoint=ENDPOINT,
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(EntitySearchClient, ENDPOINT, subscription_key)
 
     try:
         entity_data = client.entities.search(query="satya nadella")
@@ -46,10 +44,7 @@ def handling_disambiguation(subscription_key):
 
     "This will handle disambiguation results for an ambiguous query (William Gates)".
     """
-    client = EntitySearchClient(
-        endpoint="https://api.cognitive.microsoft.com",
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(EntitySearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     try:
         entity_data = client.entities.search(query="william gates")
@@ -97,10 +92,7 @@ def restaurant_lookup(subscription_key):
 
     This will look up a single restaurant (john howie bellevue) and print out its phone number.
     """
-    client = EntitySearchClient(
-        endpoint="https://api.cognitive.microsoft.com",
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(EntitySearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     try:
         entity_data = client.entities.search(query="john howie bellevue")
@@ -144,10 +136,7 @@ def multiple_restaurant_lookup(subscription_key):
     This will look up a list of restaurants (seattle restaurants) and present their names and phone numbers.
     """
 
-    client = EntitySearchClient(
-        endpoint="https://api.cognitive.microsoft.com",
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(EntitySearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     try:
         restaurants = client.entities.search(query="seattle restaurants")
@@ -190,10 +179,7 @@ def error(subscription_key):
     This triggers a bad request and shows how to read the error response.
     """
 
-    client = EntitySearchClient(
-        endpoint="https://api.cognitive.microsoft.com",
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(EntitySearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     try:
         entity_data = client.entities.search(
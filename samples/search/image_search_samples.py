@@ -2,7 +2,8 @@ import os
 
 from azure.cognitiveservices.search.imagesearch import ImageSearchClient
 from azure.cognitiveservices.search.imagesearch.models import ImageType, ImageAspect, ImageInsightModule
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
 
 SUBSCRIPTION_KEY = os.environ["BING_IMAGE_SEARCH_SUBSCRIPTION_KEY"]
 ENDPOINT = os.environ['BING_IMAGE_SEARCH_ENDPOINT']
@@ -12,10 +13,7 @@ def image_search(subscription_key):
 
     This will search images for (canadian rockies) then verify number of results and print out first image result, pivot suggestion, and query expansion.
     """
-    client = ImageSearchClient(
-        endpoint=ENDPOINT,
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(ImageSearchClient, ENDPOINT, subscription_key)
 
     try:
         image_results = client.images.search(query="canadian rockies")
@@ -78,10 +76,7 @@ def image_search_with_filters(subscription_key):
 
     This will search images for (studio ghibli), filtered for animated gifs and wide aspect, then verify number of results and print out insightsToken, thumbnail url and web url of first result.
     """
-    client = ImageSearchClient(
-        endpoint="https://api.cognitive.microsoft.com",
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(ImageSearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     try:
         image_results = client.images.search(
@@ -112,10 +107,7 @@ def image_trending(subscription_key):
 
     This will search for trending images then verify categories and tiles.
     """
-    client = ImageSearchClient(
-        endpoint="https://api.cognitive.microsoft.com",
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(ImageSearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     try:
         trending_result = client.images.trending()
@@ -147,10 +139,7 @@ def image_detail(subscription_key):
 
     This will search images for (degas) and then search for image details of the first image.
     """
-    client = ImageSearchClient(
-        endpoint="https://api.cognitive.microsoft.com",
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(ImageSearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     try:
         image_results = client.images.search(query="degas")
@@ -1,7 +1,8 @@
 import os
 
 from azure.cognitiveservices.search.newssearch import NewsSearchClient
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
 
 # Add your Bing Search V7 subscription key to your environment variables.
 SUBSCRIPTION_KEY = os.environ['BING_SEARCH_V7_SUBSCRIPTION_KEY']
@@ -13,10 +14,7 @@ def news_search(subscription_key):
 
     This will search news for (Quantum  Computing) with market and count parameters then verify number of results and print out totalEstimatedMatches, name, url, description, published time and name of provider of the first news result
     """
-    client = NewsSearchClient(
-        endpoint=ENDPOINT,
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(NewsSearchClient, ENDPOINT, subscription_key)
 
     try:
         news_result = client.news.search(
@@ -48,10 +46,7 @@ def news_search_with_filtering(subscription_key):
 
     This will search most recent news for (Artificial Intelligence) with freshness and sortBy parameters then verify number of results and print out totalEstimatedMatches, name, url, description, published time and name of provider of the first news result.
     """
-    client = NewsSearchClient(
-        endpoint="https://api.cognitive.microsoft.com",
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(NewsSearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     try:
         news_result = client.news.search(
@@ -85,10 +80,7 @@ def news_category(subscription_key):
 
     This will search category news for movie and TV entertainment with safe search then verify number of results and print out category, name, url, description, published time and name of provider of the first news result.
     """
-    client = NewsSearchClient(
-        endpoint="https://api.cognitive.microsoft.com",
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(NewsSearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     try:
         news_result = client.news.category(
@@ -122,10 +114,7 @@ def news_trending(subscription_key):
 
     This will search news trending topics in Bing then verify number of results and print out name, text of query, webSearchUrl, newsSearchUrl and image Url of the first news result.
     """
-    client = NewsSearchClient(
-        endpoint="https://api.cognitive.microsoft.com",
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(NewsSearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     try:
         trending_topics = client.news.trending(market="en-us")
@@ -2,7 +2,8 @@ import os
 
 from azure.cognitiveservices.search.videosearch import VideoSearchClient
 from azure.cognitiveservices.search.videosearch.models import VideoPricing, VideoLength, VideoResolution, VideoInsightModule
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
 
 # Add your Bing Search V7 subscription key to your environment variables.
 SUBSCRIPTION_KEY = os.environ['BING_SEARCH_V7_SUBSCRIPTION_KEY']
@@ -13,7 +14,7 @@ def video_search(subscription_key):
 
     This will search videos for (SwiftKey) then verify number of results and print out id, name and url of first video result.
     """
-    client = VideoSearchClient(ENDPOINT, CognitiveServicesCredentials(subscription_key))
+    client = get_client(VideoSearchClient, ENDPOINT, subscription_key)
 
     try:
         video_result = client.videos.search(query="SwiftKey")
@@ -37,7 +38,7 @@ def video_search_with_filtering(subscription_key):
 
     This will search videos for (Bellevue Trailer) that is free, short and 1080p resolution then verify number of results and print out id, name and url of first video result
     """
-    client = VideoSearchAPI(CognitiveServicesCredentials(subscription_key))
+    client = get_client(VideoSearchClient, ENDPOINT, subscription_key)
 
     try:
         video_result = client.videos.search(
@@ -66,7 +67,7 @@ def video_trending(subscription_key):
 
     This will trending videos then verify banner tiles and categories.
     """
-    client = VideoSearchAPI(CognitiveServicesCredentials(subscription_key))
+    client = get_client(VideoSearchClient, ENDPOINT, subscription_key)
 
     try:
         trending_result = client.videos.trending()
@@ -118,7 +119,7 @@ def video_detail(subscription_key):
 
     This will search videos for (Bellevue Trailer) and then search for detail information of the first video
     """
-    client = VideoSearchAPI(CognitiveServicesCredentials(subscription_key))
+    client = get_client(VideoSearchClient, ENDPOINT, subscription_key)
 
     try:
         video_result = client.videos.search(query="Bellevue Trailer")
@@ -9,7 +9,9 @@ from azure.cognitiveservices.search.visualsearch.models import (
     Filters,
     KnowledgeRequest,
 )
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
+from samples._infra.image_normalize import open_normalized
 
 # Add your Bing Search V7 subscription key to your environment variables.
 SUBSCRIPTION_KEY = os.environ['BING_SEARCH_V7_SUBSCRIPTION_KEY']
@@ -24,11 +26,10 @@ def search_image_binary(subscription_key):
     This will send an image binary in the body of the post request and print out the imageInsightsToken, the number of tags, the number of actions, and the first actionType.
     """
 
-    client = VisualSearchClient(endpoint="https://api.cognitive.microsoft.com",
-                                credentials=CognitiveServicesCredentials(subscription_key))
+    client = get_client(VisualSearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     image_path = os.path.join(TEST_IMAGES, "image.jpg")
-    with open(image_path, "rb") as image_fd:
+    with open_normalized(image_path, "bing") as image_fd:
 
         # You need to pass the serialized form of the model
         knowledge_request = json.dumps(VisualSearchRequest().serialize())
@@ -72,11 +73,10 @@ def search_image_binary_with_crop_area(subscription_key):
     This will send an image binary in the body of the post request, along with a cropArea object, and print out the imageInsightsToken, the number of tags, the number of actions, and the first actionType.
     """
 
-    client = VisualSearchClient(endpoint="https://api.cognitive.microsoft.com",
-                                credentials=CognitiveServicesCredentials(subscription_key))
+    client = get_client(VisualSearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     image_path = os.path.join(TEST_IMAGES, "image.jpg")
-    with open(image_path, "rb") as image_fd:
+    with open_normalized(image_path, "bing") as image_fd:
         crop_area = CropArea(top=0.1, bottom=0.5, left=0.1, right=0.9)
         knowledge_request = VisualSearchRequest(
             image_info=ImageInfo(crop_area=crop_area))
@@ -123,8 +123,7 @@ def search_url_with_filters(subscription_key):
     This will send an image url in the knowledgeRequest parameter, along with a \"site:www.bing.com\" filter, and print out the imageInsightsToken, the number of tags, the number of actions, and the first actionType.
     """
 
-    client = VisualSearchClient(endpoint="https://api.cognitive.microsoft.com",
-                                credentials=CognitiveServicesCredentials(subscription_key))
+    client = get_client(VisualSearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     image_url = "https://images.unsplash.com/photo-1512546148165-e50d714a565a?w=600&q=80"
     filters = Filters(site="www.bing.com")
@@ -174,8 +173,7 @@ def search_insights_token_with_crop_area(subscription_key):
     This will send an image insights token in the knowledgeRequest parameter, along with a cropArea object, and print out the imageInsightsToken, the number of tags, the number of actions, and the first actionType.
     """
 
-    client = VisualSearchClient(endpoint="https://api.cognitive.microsoft.com",
-                                credentials=CognitiveServicesCredentials(subscription_key))
+    client = get_client(VisualSearchClient, "https://api.cognitive.microsoft.com", subscription_key)
 
     image_insights_token = "bcid_113F29C079F18F385732D8046EC80145*ccid_oV/QcH95*mid_687689FAFA449B35BC11A1AE6CEAB6F9A9B53708*thid_R.113F29C079F18F385732D8046EC80145"
     crop_area = CropArea(top=0.1, bottom=0.5, left=0.1, right=0.9)
@@ -227,8 +225,7 @@ def search_url_with_json(subscription_key):
     This will send a visual search request in JSON form, and print out the imageInsightsToken, the number of tags, and the first actionCount and actionType.
     """
 
-    client = VisualSearchClient(endpoint="https://api.cognitive.microsoft.com",
-                                credentials=CognitiveServicesCredentials(subscription_key))
+    client = get_client(VisualSearchClient, "https://api.cognitive.microsoft.com", subscription_key)
     try:
         """
          The visual search request can be passed in as a JSON string
@@ -1,8 +1,10 @@
+import logging
 import os
 
 from azure.cognitiveservices.search.websearch import WebSearchClient
 from azure.cognitiveservices.search.websearch.models import SafeSearch
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
 
 # Add your Bing Search V7 subscription key to your environment variables.
 SUBSCRIPTION_KEY = os.environ['BING_SEARCH_V7_SUBSCRIPTION_KEY']
@@ -18,7 +20,7 @@ def result_types_lookup(subscription_key):
 
     This will look up a single query (Xbox) and print out name and url for first web, image, news and videos results.
     """
-    client = WebSearchClient(ENDPOINT, CognitiveServicesCredentials(subscription_key))
+    client = get_client(WebSearchClient, ENDPOINT, subscription_key)
 
     try:
 
@@ -83,7 +85,7 @@ def web_results_with_count_and_offset(subscription_key):
     This will search (Best restaurants in Seattle), verify number of results and print out name and url of first result.
     """
 
-    client = WebSearchAPI(CognitiveServicesCredentials(subscription_key))
+    client = get_client(WebSearchClient, ENDPOINT, subscription_key)
 
     try:
         web_data = client.web.search(
@@ -111,7 +113,7 @@ def web_search_with_response_filter(subscription_key):
     This will search (Microsoft) with response filters to news and print details of news.
     """
 
-    client = WebSearchAPI(CognitiveServicesCredentials(subscription_key))
+    client = get_client(WebSearchClient, ENDPOINT, subscription_key)
 
     try:
         web_data = client.web.search(
@@ -140,7 +142,7 @@ def web_search_with_answer_count_promote_and_safe_search(subscription_key):
     This will search (Lady Gaga) with answerCount and promote parameters and print details of answers.
     """
 
-    client = WebSearchAPI(CognitiveServicesCredentials(subscription_key))
+    client = get_client(WebSearchClient, ENDPOINT, subscription_key)
 
     try:
         web_data = client.web.search(
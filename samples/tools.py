@@ -6,36 +6,231 @@ try:
     from inspect import getfullargspec as get_arg_spec
 except ImportError:
     from inspect import getargspec as get_arg_spec
+try:
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = ThreadPoolExecutor = None
+try:
+    import contextvars
+except ImportError:  # Before Python 3.7, outputs are only captured per thread
+    contextvars = None
+import collections
+import contextlib
+import inspect
+import io
 import os
 import sys
+import threading
+import timeit
+import traceback
 import types
 
 
+ENDPOINT_OVERRIDE_ENV_NAME = "COGNITIVE_SERVICES_ENDPOINT_OVERRIDE"
+RESPONSE_CACHE_ENV_NAME = "COGNITIVE_SERVICES_CACHE_DIR"
+
+
 class SubscriptionKeyError(Exception):
     pass
 
 
-def start_sample(func, subscription_key):
-    """Start the function and show its doc on output.
+class SampleExecutionError(Exception):
+    pass
+
+
+SampleResult = collections.namedtuple(
+    "SampleResult", ["name", "output", "elapsed", "error"])
+
+
+class _ThreadLocalStdout(object):
+    """Stdout replacement sending each thread's prints to its own buffer.
+
+    With contextvars, each asyncio task also gets its own buffer. Threads
+    and tasks without a buffer write to the original stream.
     """
-    print("Sample:", func.__doc__, "\n")
-    func(subscription_key)
-    print("\n\n")
 
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+        self.context = contextvars.ContextVar("stdout_buffer", default=None) if contextvars else None
 
-def execute_samples(module_globals, key_env_variable):
-    """Execute samples based on a dict <name, function>
+    @property
+    def buffer(self):
+        if self.context is not None:
+            return self.context.get()
+        return getattr(self.local, "buffer", None)
+
+    @contextlib.contextmanager
+    def redirect(self, buffer):
+        if self.context is not None:
+            token = self.context.set(buffer)
+            try:
+                yield
+            finally:
+                self.context.reset(token)
+        else:
+            self.local.buffer = buffer
+            try:
+                yield
+            finally:
+                self.local.buffer = None
+
+    def write(self, data):
+        buffer = self.buffer
+        if buffer is None:
+            return self.stream.write(data)
+        return buffer.write(data)
+
+    def flush(self):
+        if self.buffer is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+_STDOUT_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def capture_stdout():
+    """Capture everything the current thread, or asyncio task, prints in a StringIO.
+    """
+    with _STDOUT_LOCK:
+        if not isinstance(sys.stdout, _ThreadLocalStdout):
+            sys.stdout = _ThreadLocalStdout(sys.stdout)
+        proxy = sys.stdout
+    buffer = io.StringIO()
+    with proxy.redirect(buffer):
+        yield buffer
+
+
+def apply_endpoint_override():
+    """Send every request to COGNITIVE_SERVICES_ENDPOINT_OVERRIDE, if set.
+
+    Used to run the samples against the local stand-in (samples/_infra/standin.py).
+    """
+    base_url = os.environ.get(ENDPOINT_OVERRIDE_ENV_NAME)
+    if base_url:
+        from samples._infra.standin import redirect_requests
+        redirect_requests(base_url)
+
+
+def apply_response_cache():
+    """Cache the responses of the shared clients in COGNITIVE_SERVICES_CACHE_DIR, if set.
+
+    See samples/_infra/response_cache.py for the other settings.
+    """
+    if os.environ.get(RESPONSE_CACHE_ENV_NAME):
+        from samples._infra.response_cache import enable_cache_from_environ
+        enable_cache_from_environ()
+
+
+def get_subscription_key(key_env_variable):
+    """Return the key from the command line, or from the env variable.
     """
     try:
-        subscription_key = sys.argv[1] if len(
+        return sys.argv[1] if len(
             sys.argv) >= 2 else os.environ[key_env_variable]
     except KeyError:
         raise SubscriptionKeyError(
             "You need to either set the {} env variable.".format(key_env_variable))
 
+
+def collect_samples(module_globals):
+    """Return the sample functions (taking a subscription_key) of a dict <name, function>
+    """
+    sample_functions = []
     for func in list(module_globals.values()):
         if not isinstance(func, types.FunctionType):
             continue
+        if func.__module__ != module_globals.get("__name__", func.__module__):
+            continue  # Imported helper, like samples._infra.clients.get_client
         args = get_arg_spec(func).args
         if 'subscription_key' in args:
+            sample_functions.append(func)
+    return sample_functions
+
+
+def start_sample(func, subscription_key):
+    """Start the function and show its doc on output.
+
+    A coroutine function is run in its own event loop.
+    """
+    print("Sample:", func.__doc__, "\n")
+    result = func(subscription_key)
+    if getattr(inspect, "isawaitable", None) and inspect.isawaitable(result):  # Python 3.5+
+        import asyncio
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(result)
+        finally:
+            loop.close()
+    print("\n\n")
+
+
+def run_sample(func, subscription_key):
+    """Start the function, capturing its output, duration and failure if any.
+
+    Must stay a module level function to be usable from a process pool.
+    """
+    error = None
+    with capture_stdout() as output:
+        start = timeit.default_timer()
+        try:
             start_sample(func, subscription_key)
+        except Exception:  # Reported in the summary, the other samples go on
+            error = traceback.format_exc()
+        elapsed = timeit.default_timer() - start
+    return SampleResult(
+        "{}.{}".format(func.__module__, func.__name__),
+        output.getvalue(),
+        elapsed,
+        error
+    )
+
+
+def execute_samples(module_globals, key_env_variable):
+    """Execute samples based on a dict <name, function>
+    """
+    subscription_key = get_subscription_key(key_env_variable)
+    apply_endpoint_override()
+    apply_response_cache()
+    for func in collect_samples(module_globals):
+        start_sample(func, subscription_key)
+
+
+def execute_samples_parallel(samples, max_workers, use_processes=False):
+    """Execute a list of (function, subscription_key) in a bounded pool.
+
+    Outputs are printed in the order of the list, as soon as every sample
+    before them is done. Return the list of SampleResult.
+    """
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    if executor_class is None:
+        raise RuntimeError(
+            "Parallel execution needs concurrent.futures (\"pip install futures\" on Python 2.7)")
+
+    results = []
+    with executor_class(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_sample, func, subscription_key)
+                   for func, subscription_key in samples]
+        for future in futures:
+            result = future.result()
+            print("Sample output from", result.name)
+            print(result.output)
+            if result.error:
+                print(result.error)
+            results.append(result)
+    return results
+
+
+def print_timing_summary(results, wall_time):
+    """Print the time taken by each sample, slowest first.
+    """
+    print("Timing summary")
+    print("Wall clock: {:.2f}s, sum of samples: {:.2f}s".format(
+        wall_time, sum(result.elapsed for result in results)))
+    for result in sorted(results, key=lambda result: result.elapsed, reverse=True):
+        print("{:>10.2f}s  {}  {}".format(
+            result.elapsed, "FAILED" if result.error else "ok    ", result.name))
@@ -1,8 +1,9 @@
 from azure.cognitiveservices.vision.computervision import ComputerVisionClient
 from msrest.authentication import CognitiveServicesCredentials
 from azure.cognitiveservices.vision.computervision.models import TextRecognitionMode
-from azure.cognitiveservices.vision.computervision.models import TextOperationStatusCodes
-import time
+
+from samples._infra.ocr_index import WordIndex
+from samples._infra.read_pipeline import ReadPipeline
 
 '''
 References:
@@ -29,28 +30,22 @@ client = ComputerVisionClient(endpoint, credentials)
 
 url = "https://azurecomcdn.azureedge.net/cvt-1979217d3d0d31c5c87cbd991bccfee2d184b55eeb4081200012bdaf6a65601a/images/shared/cognitive-services-demos/read-text/read-1-thumbnail.png"
 mode = TextRecognitionMode.handwritten
-raw = True
-custom_headers = None
-numberOfCharsInOperationId = 36
-
-# Async SDK call
-rawHttpResponse = client.batch_read_file(url, mode, custom_headers,  raw)
-
-# Get ID from returned headers
-operationLocation = rawHttpResponse.headers["Operation-Location"]
-idLocation = len(operationLocation) - numberOfCharsInOperationId
-operationId = operationLocation[idLocation:]
-
-# SDK call
-while True:
-    result = client.get_read_operation_result(operationId)
-    if result.status not in ['NotStarted', 'Running']:
-        break
-    time.sleep(1)
-
-# Get data: displays text captured and its bounding box (position in the image)
-if result.status == TextOperationStatusCodes.succeeded:
-    for textResult in result.recognition_results:
-        for line in textResult.lines:
-            print(line.text)
-            print(line.bounding_box)
\ No newline at end of file
+
+# Async SDK calls: the pipeline starts the Read operation, parses its id from
+# the Operation-Location header, and polls it with backoff until it is over.
+# Pass more URLs or local paths to read them concurrently.
+with ReadPipeline(client, mode) as pipeline:
+    for read_result in pipeline.read([url]):
+        if read_result.error:
+            print("Read of {} failed: {}".format(read_result.image, read_result.error))
+            continue
+
+        # Get data: displays text captured and its bounding box (position in the image)
+        for textResult in read_result.result.recognition_results:
+            for line in textResult.lines:
+                print(line.text)
+                print(line.bounding_box)
+
+            # Query the geometry: the words of the top half of the page, in reading order
+            words = WordIndex.from_text_recognition_result(textResult)
+            print(words.text(words.within((0, 0, textResult.width, textResult.height / 2))))
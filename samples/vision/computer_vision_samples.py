@@ -2,11 +2,17 @@ import os.path
 
 from azure.cognitiveservices.vision.computervision import ComputerVisionClient
 from azure.cognitiveservices.vision.computervision.models import VisualFeatureTypes
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
+from samples._infra.image_dedupe import map_deduplicated
+from samples._infra.image_normalize import open_normalized
+from samples._infra.polling import poll_until_done
+from samples._infra.read_pipeline import operation_id as parse_operation_id
 
 SUBSCRIPTION_KEY_ENV_NAME = "COMPUTERVISION_SUBSCRIPTION_KEY"
 COMPUTERVISION_LOCATION = os.environ.get(
     "COMPUTERVISION_LOCATION", "westcentralus")
+COMPUTERVISION_ENDPOINT = "https://" + COMPUTERVISION_LOCATION + ".api.cognitive.microsoft.com/"
 
 IMAGES_FOLDER = os.path.join(os.path.dirname(
     os.path.realpath(__file__)), "images")
@@ -17,12 +23,9 @@ def image_analysis_in_stream(subscription_key):
 
     This will analyze an image from a stream and return all available features.
     """
-    client = ComputerVisionClient(
-        endpoint="https://" + COMPUTERVISION_LOCATION + ".api.cognitive.microsoft.com/",
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(ComputerVisionClient, COMPUTERVISION_ENDPOINT, subscription_key)
 
-    with open(os.path.join(IMAGES_FOLDER, "house.jpg"), "rb") as image_stream:
+    with open_normalized(os.path.join(IMAGES_FOLDER, "house.jpg"), "vision") as image_stream:
         image_analysis = client.analyze_image_in_stream(
             image=image_stream,
             visual_features=[
@@ -46,16 +49,42 @@ def image_analysis_in_stream(subscription_key):
         image_analysis.color.dominant_colors))
 
 
+def describe_images_in_stream(subscription_key):
+    """DescribeImagesInStream.
+
+    This will describe a folder of images, analyzing only one image of each group of near-duplicates.
+    """
+    client = get_client(ComputerVisionClient, COMPUTERVISION_ENDPOINT, subscription_key)
+    folder = os.path.join(IMAGES_FOLDER, "fork")
+    image_paths = [os.path.join(folder, name) for name in sorted(os.listdir(folder))]
+
+    def describe(image_path):
+        with open(image_path, "rb") as image_stream:
+            return client.analyze_image_in_stream(
+                image=image_stream, visual_features=[VisualFeatureTypes.description])
+
+    # Burst shots of the same scene share the analysis of the first of them
+    results = map_deduplicated(describe, image_paths)
+    for result in results:
+        if result.error:
+            print("{} failed: {}".format(os.path.basename(result.image), result.error))
+            continue
+        captions = result.result.description.captions
+        print("{} can be described as: {}{}".format(
+            os.path.basename(result.image),
+            captions[0].text if captions else "nothing",
+            "" if result.representative == result.image else
+            " (same as {})".format(os.path.basename(result.representative))))
+    print("{} images analyzed for {} images.\n".format(
+        len(set(result.representative for result in results)), len(results)))
+
+
 def recognize_text(subscription_key):
     """RecognizeTextUsingRecognizeAPI.
 
     This will recognize text of the given image using the recognizeText API.
     """
-    import time
-    client = ComputerVisionClient(
-        endpoint="https://" + COMPUTERVISION_LOCATION + ".api.cognitive.microsoft.com/",
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(ComputerVisionClient, COMPUTERVISION_ENDPOINT, subscription_key)
 
     with open(os.path.join(IMAGES_FOLDER, "make_things_happen.jpg"), "rb") as image_stream:
         job = client.recognize_text_in_stream(
@@ -63,13 +92,12 @@ def recognize_text(subscription_key):
             mode="Printed",
             raw=True
         )
-    operation_id = job.headers['Operation-Location'].split('/')[-1]
+    operation_id = parse_operation_id(job.headers.get('Operation-Location'))
 
-    image_analysis = client.get_text_operation_result(operation_id)
-    while image_analysis.status in ['NotStarted', 'Running']:
-        time.sleep(1)
-        image_analysis = client.get_text_operation_result(
-            operation_id=operation_id)
+    image_analysis = poll_until_done(
+        lambda: client.get_text_operation_result(operation_id=operation_id),
+        lambda result: result.status not in ['NotStarted', 'Running']
+    )
 
     print("Job completion is: {}\n".format(image_analysis.status))
 
@@ -85,10 +113,7 @@ def recognize_printed_text_in_stream(subscription_key):
 
     This will do an OCR analysis of the given image.
     """
-    client = ComputerVisionClient(
-        endpoint="https://" + COMPUTERVISION_LOCATION + ".api.cognitive.microsoft.com/",
-        credentials=CognitiveServicesCredentials(subscription_key)
-    )
+    client = get_client(ComputerVisionClient, COMPUTERVISION_ENDPOINT, subscription_key)
 
     with open(os.path.join(IMAGES_FOLDER, "computer_vision_ocr.png"), "rb") as image_stream:
         image_analysis = client.recognize_printed_text_in_stream(
@@ -96,11 +121,11 @@ def recognize_printed_text_in_stream(subscription_key):
             language="en"
         )
 
-    lines = image_analysis.regions[0].lines
     print("Recognized:\n")
-    for line in lines:
-        line_text = " ".join([word.text for word in line.words])
-        print(line_text)
+    for region in image_analysis.regions:
+        for line in region.lines:
+            line_text = " ".join([word.text for word in line.words])
+            print(line_text)
 
 
 if __name__ == "__main__":
@@ -2,7 +2,8 @@ import os.path
 from pprint import pprint
 
 from azure.cognitiveservices.vision.contentmoderator import ContentModeratorClient
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
 
 # Add your Azure Content Moderator subscription key to your environment variables.
 SUBSCRIPTION_KEY =  os.environ["CONTENT_MODERATOR_SUBSCRIPTION_KEY"]
@@ -32,9 +33,10 @@ def image_review_jobs(subscription_key):
     # Where you want to receive the approval/refuse event. This is the only way to get this information.
     call_back_endpoint = "https://requestb.in/1l64pe71"
 
-    client = ContentModeratorClient(
-        endpoint=os.environ['CONTENT_MODERATOR_ENDPOINT'], # Add your Content Moderator endpoint to your environment variables.
-        credentials=CognitiveServicesCredentials(subscription_key)
+    client = get_client(
+        ContentModeratorClient,
+        os.environ['CONTENT_MODERATOR_ENDPOINT'], # Add your Content Moderator endpoint to your environment variables.
+        subscription_key
     )
 
     print("Create moderation job for an image.\n")
@@ -11,7 +11,8 @@ from azure.cognitiveservices.vision.contentmoderator.models import (
     RefreshIndex,
     MatchResponse
 )
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
 
 # Add your Azure Content Moderator subscription key to your environment variables.
 SUBSCRIPTION_KEY = os.environ['CONTENT_MODERATOR_SUBSCRIPTION_KEY']
@@ -48,10 +49,10 @@ def image_lists(subscription_key):
     This will review an image using workflow and job.
     """
 
-    client = ContentModeratorClient(
-        endpoint=os.environ['CONTENT_MODERATOR_ENDPOINT'], # Add your Content Moderator endpoint to your environment variables.
-
-        credentials=CognitiveServicesCredentials(subscription_key)
+    client = get_client(
+        ContentModeratorClient,
+        os.environ['CONTENT_MODERATOR_ENDPOINT'], # Add your Content Moderator endpoint to your environment variables.
+        subscription_key
     )
 
     print("Creating list MyList\n")
@@ -7,7 +7,8 @@ from azure.cognitiveservices.vision.contentmoderator.models import (
     OCR,
     FoundFaces
 )
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
 
 # Add your Azure Content Moderator subscription key to your environment variables.
 SUBSCRIPTION_KEY = os.environ['CONTENT_MODERATOR_SUBSCRIPTION_KEY']
@@ -24,9 +25,10 @@ def image_moderation(subscription_key):
     This will review an image using workflow and job.
     """
 
-    client = ContentModeratorClient(
-        endpoint=os.environ['CONTENT_MODERATOR_ENDPOINT'], # Add your Content Moderator endpoint to your environment variables.
-        credentials=CognitiveServicesCredentials(subscription_key)
+    client = get_client(
+        ContentModeratorClient,
+        os.environ['CONTENT_MODERATOR_ENDPOINT'], # Add your Content Moderator endpoint to your environment variables.
+        subscription_key
     )
 
     for image_url in IMAGE_LIST:
@@ -3,7 +3,8 @@ from pprint import pprint
 import uuid
 
 from azure.cognitiveservices.vision.contentmoderator import ContentModeratorClient
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
 
 # Add your Azure Content Moderator subscription key to your environment variables.
 SUBSCRIPTION_KEY = os.environ['CONTENT_MODERATOR_SUBSCRIPTION_KEY']
@@ -26,9 +27,10 @@ def image_review(subscription_key):
     # Where you want to receive the approval/refuse event. This is the only way to get this information.
     call_back_endpoint = "https://requestb.in/qmsakwqm"
 
-    client = ContentModeratorClient(
-        endpoint=os.environ['CONTENT_MODERATOR_ENDPOINT'], # Add your Content Moderator endpoint to your environment variables.
-        credentials=CognitiveServicesCredentials(subscription_key)
+    client = get_client(
+        ContentModeratorClient,
+        os.environ['CONTENT_MODERATOR_ENDPOINT'], # Add your Content Moderator endpoint to your environment variables.
+        subscription_key
     )
 
     print("Create review for {}.\n".format(image_url))
@@ -10,7 +10,8 @@ from azure.cognitiveservices.vision.contentmoderator.models import (
     RefreshIndex,
     Screen
 )
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
 
 # Add your Azure Content Moderator subscription key to your environment variables.
 SUBSCRIPTION_KEY = os.environ['CONTENT_MODERATOR_SUBSCRIPTION_KEY']
@@ -29,9 +30,10 @@ def terms_lists(subscription_key):
     This will screen text using a term list.
     """
 
-    client = ContentModeratorClient(
-        endpoint=os.environ['CONTENT_MODERATOR_ENDPOINT'], # Add your Content Moderator endpoint to your environment variables.
-        credentials=CognitiveServicesCredentials(subscription_key)
+    client = get_client(
+        ContentModeratorClient,
+        os.environ['CONTENT_MODERATOR_ENDPOINT'], # Add your Content Moderator endpoint to your environment variables.
+        subscription_key
     )
 
     #
@@ -5,7 +5,8 @@ from azure.cognitiveservices.vision.contentmoderator import ContentModeratorClie
 from azure.cognitiveservices.vision.contentmoderator.models import (
     Screen
 )
-from msrest.authentication import CognitiveServicesCredentials
+
+from samples._infra.clients import get_client
 
 # Add your Azure Content Moderator subscription key to your environment variables.
 SUBSCRIPTION_KEY = os.environ['CONTENT_MODERATOR_SUBSCRIPTION_KEY']
@@ -24,9 +25,10 @@ def text_moderation(subscription_key):
     This will moderate a given long text.
     """
 
-    client = ContentModeratorClient(
-        endpoint=os.environ['CONTENT_MODERATOR_ENDPOINT'], # Add your Content Moderator endpoint to your environment variables.
-        credentials=CognitiveServicesCredentials(subscription_key)
+    client = get_client(
+        ContentModeratorClient,
+        os.environ['CONTENT_MODERATOR_ENDPOINT'], # Add your Content Moderator endpoint to your environment variables.
+        subscription_key
     )
 
     # Screen the input text: check for profanity,
@@ -1,9 +1,10 @@
 from os import getcwd, makedirs, path
-# from urllib import parse # Python 3.x
-from urlparse import urlparse # Python 2.x
+try:
+    from urllib.parse import urlparse
+except ImportError:  # Python 2.7
+    from urlparse import urlparse
 import uuid
 import datetime
-import time
 
 import adal
 from msrestazure.azure_active_directory import AdalAuthentication
@@ -12,6 +13,8 @@ from azure.mgmt.media import AzureMediaServices
 from azure.mgmt.media.models import *
 from azure.storage.blob import BlockBlobService
 
+from samples._infra.polling import POLLER
+
 
 def video_analyze():
     """VideoAnalyze.
@@ -142,7 +145,7 @@ def create_input_asset(client, resource_group_name, account_name, asset_name, fi
     # Use Storage API to get a reference to the Asset container
     # that was created by calling Asset's CreateOrUpdate method. 
     #parsed_url = parse.urlparse(sasUri) # Python 3.x
-    parsed_url = urlparse(sasUri) # Python 2.x
+    parsed_url = urlparse(sasUri)
     storage_account_name = parsed_url.netloc.split('.')[0]
 
     # Remove the leading /
@@ -216,9 +219,7 @@ def wait_for_job_to_finish(client, resource_group_name, account_name, transform_
     :return: Job
     :rtype: ~azure.mgmt.media.models.Job
     """
-    SleepIntervalMs = 5
-
-    while True:
+    def get_job():
         job = client.jobs.get(resource_group_name, account_name, transform_name, job_name)
         print('Job is {}'.format(job.state))
 
@@ -227,13 +228,15 @@ def wait_for_job_to_finish(client, resource_group_name, account_name, transform_
             print(' JobOutput[{}] is {}'.format(i, output.state))
             if output.state == JobState.processing:
                 print('  Progress: {}'.format(output.progress))
-        
-        if job.state == JobState.finished or job.state == JobState.error or job.state == JobState.canceled:
-            break
+        return job
 
-        time.sleep(SleepIntervalMs)
-
-    return job
+    # Backs off from 5 seconds up to a minute between two polls
+    return POLLER.submit(
+        get_job,
+        lambda job: job.state in [JobState.finished, JobState.error, JobState.canceled],
+        initial_delay=5,
+        max_delay=60
+    ).result()
 
 def download_output_asset(client, resource_group_name, account_name, asset_name, output_folder_name):
     """Downloads the results from the specified output asset, so you can see what you got.
@@ -261,7 +264,7 @@ def download_output_asset(client, resource_group_name, account_name, asset_name,
     print('Downloading output results to {}'.format(directory))
 
     #parsed_url = parse.urlparse(container_sas_url) # Python 3.x
-    parsed_url = urlparse(container_sas_url) # Python 2.x
+    parsed_url = urlparse(container_sas_url)
     storage_account_name = parsed_url.netloc.split('.')[0]
     container_name = parsed_url.path[1:]
     token = parsed_url.query
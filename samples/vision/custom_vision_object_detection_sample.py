@@ -1,6 +1,5 @@
 import os
 import sys
-import time
 
 from azure.cognitiveservices.vision.customvision.training import training_api
 from azure.cognitiveservices.vision.customvision.training.models import ImageFileCreateEntry, Region
@@ -8,6 +7,10 @@ from azure.cognitiveservices.vision.customvision.prediction import CustomVisionP
 
 sys.path.append(os.path.abspath(os.path.join(__file__, "..", "..", "..")))
 
+from samples._infra.image_normalize import open_normalized
+from samples._infra.metrics import instrument
+from samples._infra.polling import poll_until_done
+
 # Replace with a valid key
 SUBSCRIPTION_KEY_ENV_NAME = "CUSTOMVISION_TRAINING_KEY"
 PREDICTION_RESOURCE_ID_KEY_ENV_NAME = "CUSTOMVISION_PREDICTION_ID"
@@ -41,7 +44,7 @@ def train_project(training_key):
     except KeyError:
         raise PredictionResourceMissingError("Didn't find a prediction resource to publish to. Please set the {} environment variable".format(PREDICTION_RESOURCE_ID_KEY_ENV_NAME))
 
-    trainer = CustomVisionTrainingClient(training_key, endpoint=ENDPOINT)
+    trainer = instrument(CustomVisionTrainingClient(training_key, endpoint=ENDPOINT))
 
     # Find the object detection domain
 
@@ -129,10 +132,11 @@ def train_project(training_key):
     print ("Training...")
 
     iteration = trainer.train_project(project.id)
-    while (iteration.status != "Completed"):
-        iteration = trainer.get_iteration(project.id, iteration.id)
-        print("Training status: " + iteration.status)
-        time.sleep(1)
+    iteration = poll_until_done(
+        lambda: trainer.get_iteration(project.id, iteration.id),
+        lambda iteration: iteration.status == "Completed"
+    )
+    print("Training status: " + iteration.status)
 
 
     # The iteration is now trained. Name and publish this iteration to a prediciton endpoint
@@ -147,10 +151,11 @@ def train_project(training_key):
 
 
 def predict_project(prediction_key, project, iteration):
-    predictor = CustomVisionPredictionClient(prediction_key, endpoint=ENDPOINT)
+    predictor = instrument(CustomVisionPredictionClient(prediction_key, endpoint=ENDPOINT))
 
     # Open the sample image and get back the prediction results.
-    with open(os.path.join(IMAGES_FOLDER, "Test", "test_od_image.jpg"), mode="rb") as test_data:
+    # Bounding boxes are fractions of the image size, downscaling does not change them.
+    with open_normalized(os.path.join(IMAGES_FOLDER, "Test", "test_od_image.jpg"), "customvision") as test_data:
         results = predictor.detect_image(project.id, PUBLISH_ITERATION_NAME, test_data)
 
     # Display the results.
@@ -4,6 +4,9 @@ import sys
 from azure.cognitiveservices.vision.customvision.training import CustomVisionTrainingClient
 from azure.cognitiveservices.vision.customvision.prediction import CustomVisionPredictionClient
 
+from samples._infra.image_normalize import normalize_image
+from samples._infra.metrics import instrument
+
 TRAINING_KEY_ENV_NAME = "CUSTOMVISION_TRAINING_KEY"
 SUBSCRIPTION_KEY_ENV_NAME = "CUSTOMVISION_PREDICTION_KEY"
 
@@ -26,7 +29,7 @@ def find_or_train_project():
 
     # Use the training API to find the SDK sample project created from the training example.
     from custom_vision_training_samples import train_project, SAMPLE_PROJECT_NAME
-    trainer = CustomVisionTrainingClient(training_key, endpoint=ENDPOINT)
+    trainer = instrument(CustomVisionTrainingClient(training_key, endpoint=ENDPOINT))
 
     for proj in trainer.get_projects():
         if (proj.name == SAMPLE_PROJECT_NAME):
@@ -37,14 +40,14 @@ def find_or_train_project():
 
 
 def predict_project(subscription_key):
-    predictor = CustomVisionPredictionClient(
-        subscription_key, endpoint=ENDPOINT)
+    predictor = instrument(CustomVisionPredictionClient(
+        subscription_key, endpoint=ENDPOINT))
 
     # Find or train a new project to use for prediction.
     project = find_or_train_project()
 
-    with open(os.path.join(IMAGES_FOLDER, "Test", "test_image.jpg"), mode="rb") as test_data:
-         results = predictor.classify_image(project.id, PUBLISH_ITERATION_NAME, test_data.read())
+    test_data = normalize_image(os.path.join(IMAGES_FOLDER, "Test", "test_image.jpg"), "customvision")
+    results = predictor.classify_image(project.id, PUBLISH_ITERATION_NAME, test_data)
 
     # Display the results.
     for prediction in results.predictions:
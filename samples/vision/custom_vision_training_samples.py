@@ -1,8 +1,10 @@
 import os
-import time
 
 from azure.cognitiveservices.vision.customvision.training import CustomVisionTrainingClient
 
+from samples._infra.metrics import instrument
+from samples._infra.polling import poll_until_done
+
 SUBSCRIPTION_KEY_ENV_NAME = "CUSTOMVISION_TRAINING_KEY"
 PREDICTION_RESOURCE_ID_KEY_ENV_NAME = "CUSTOMVISION_PREDICTION_ID"
 
@@ -25,7 +27,7 @@ def train_project(subscription_key):
     except KeyError:
         raise PredictionResourceMissingError("Didn't find a prediction resource to publish to. Please set the {} environment variable".format(PREDICTION_RESOURCE_ID_KEY_ENV_NAME))
 
-    trainer = CustomVisionTrainingClient(subscription_key, endpoint=ENDPOINT)
+    trainer = instrument(CustomVisionTrainingClient(subscription_key, endpoint=ENDPOINT))
 
     # Create a new project
     print("Creating project...")
@@ -50,10 +52,11 @@ def train_project(subscription_key):
 
     print("Training...")
     iteration = trainer.train_project(project.id)
-    while (iteration.status == "Training"):
-        iteration = trainer.get_iteration(project.id, iteration.id)
-        print("Training status: " + iteration.status)
-        time.sleep(1)
+    iteration = poll_until_done(
+        lambda: trainer.get_iteration(project.id, iteration.id),
+        lambda iteration: iteration.status != "Training"
+    )
+    print("Training status: " + iteration.status)
 
     # The iteration is now trained. Name and publish this iteration to a prediciton endpoint
     trainer.publish_iteration(project.id, iteration.id, PUBLISH_ITERATION_NAME, prediction_resource_id)
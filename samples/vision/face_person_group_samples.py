@@ -1,8 +1,10 @@
-import os, io, uuid, glob, time
+import os, io, uuid, glob
 from msrest.authentication import CognitiveServicesCredentials
 from azure.cognitiveservices.vision.face import FaceClient
 from azure.cognitiveservices.vision.face.models import TrainingStatusType, Person
 
+from samples._infra.face_training import tracked_operations, train_if_dirty
+
 '''
 PersonGroup - Face API sample
 References: 
@@ -26,6 +28,8 @@ KEY = '<ADD SUBSCRIPTION KEY HERE>'
 # Replace westus if it's not your region
 BASE_URL = 'https://westus.api.cognitive.microsoft.com'
 face_client = FaceClient(BASE_URL, CognitiveServicesCredentials(KEY))
+# Person operations marking the person group for training when it changes
+person_group_person = tracked_operations(face_client, "person_group")
 
 ''' 
 Create the PersonGroup
@@ -37,11 +41,11 @@ print(person_group_id)
 face_client.person_group.create(person_group_id=person_group_id, name=person_group_id)
 
 # Define woman friend 
-woman = face_client.person_group_person.create(person_group_id, "Woman")
+woman = person_group_person.create(person_group_id, "Woman")
 # Define man friend
-man = face_client.person_group_person.create(person_group_id, "Man")
+man = person_group_person.create(person_group_id, "Man")
 # Define child friend
-child = face_client.person_group_person.create(person_group_id, "Child")
+child = person_group_person.create(person_group_id, "Child")
 
 '''
 Detect faces and register to correct person
@@ -54,32 +58,27 @@ child_images = [file for file in glob.glob('*.jpg') if file.startswith("child")]
 # Add to a woman person
 for image in woman_images:
     w = open(image, 'r+b')
-    face_client.person_group_person.add_face_from_stream(person_group_id, woman.person_id, w)
+    person_group_person.add_face_from_stream(person_group_id, woman.person_id, w)
 
 # Add to a man person
 for image in man_images:
     m = open(image, 'r+b')
-    face_client.person_group_person.add_face_from_stream(person_group_id, man.person_id, m)
+    person_group_person.add_face_from_stream(person_group_id, man.person_id, m)
 
 # Add to a child person
 for image in child_images:
     ch = open(image, 'r+b')
-    face_client.person_group_person.add_face_from_stream(person_group_id, child.person_id, ch)
+    person_group_person.add_face_from_stream(person_group_id, child.person_id, ch)
 
 ''' 
 Train PersonGroup
 '''
 # Train the person group
-face_client.person_group.train(person_group_id)
-training_status = face_client.person_group.get_training_status(person_group_id)
-while (training_status.status == TrainingStatusType.running):
-    print(training_status.status)
-    if (training_status.status == TrainingStatusType.failed):
-        raise Exception('Training failed with message {}.'.format(training_status.message))
-    if (training_status.status == TrainingStatusType.succeeded):
-        print(training_status.status)
-        break
-    time.sleep(1)
+# Trained only if it changed since its last training
+training_status = train_if_dirty(face_client, "person_group", person_group_id)
+print(training_status.status)
+if (training_status.status == TrainingStatusType.failed):
+    raise Exception('Training failed with message {}.'.format(training_status.message))
 
 '''
 Identify a face against a defined PersonGroup
@@ -3,11 +3,22 @@ import uuid
 import time
 
 from azure.cognitiveservices.vision.face import FaceClient
-from msrest.authentication import CognitiveServicesCredentials
-from azure.cognitiveservices.vision.face.models import FaceAttributeType, HairColorType, TrainingStatusType, Person
+from azure.cognitiveservices.vision.face.models import FaceAttributeType, TrainingStatusType, Person
+
+from samples._infra.clients import get_client
+from samples._infra.face_attributes import FaceTable
+from samples._infra.face_batch import detect_faces_batch, identify_faces
+from samples._infra.face_cache import detect_faces_cached
+from samples._infra.face_enrollment import enroll_faces
+from samples._infra.face_lists import FaceListIndex
+from samples._infra.face_shards import ShardedPersonGroup
+from samples._infra.face_training import tracked_operations, train_if_dirty
+from samples._infra.face_verify import cluster_faces, verify_faces_cached, verify_matrix
+from samples._infra.image_normalize import open_normalized
 
 SUBSCRIPTION_KEY_ENV_NAME = "FACE_SUBSCRIPTION_KEY"
 FACE_LOCATION = os.environ.get("FACE_LOCATION", "westcentralus")
+FACE_ENDPOINT = "https://{}.api.cognitive.microsoft.com".format(FACE_LOCATION)
 
 IMAGES_FOLDER = os.path.join(os.path.dirname(
     os.path.realpath(__file__)), "images", "Face")
@@ -19,17 +30,14 @@ def image_analysis_in_stream(subscription_key):
     This will analyze an image from a stream and return all available features.
     """
 
-    face_base_url = "https://{}.api.cognitive.microsoft.com".format(
-        FACE_LOCATION)
-    face_client = FaceClient(
-        face_base_url, CognitiveServicesCredentials(subscription_key))
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
 
     faces = [jpgfile for jpgfile in os.listdir(
         IMAGES_FOLDER) if jpgfile.startswith("Family1")]
     faces_ids = []
 
     for face in faces:
-        with open(os.path.join(IMAGES_FOLDER, face), "rb") as face_fd:
+        with open_normalized(os.path.join(IMAGES_FOLDER, face), "face") as face_fd:
             # result type: azure.cognitiveservices.vision.face.models.DetectedFace
             result = face_client.face.detect_with_stream(
                 face_fd,
@@ -66,8 +74,17 @@ def image_analysis_in_stream(subscription_key):
             detected_face.face_attributes.emotion.happiness))
     print("\n")
 
-    # Verification example for faces of the same person.
-    verify_result = face_client.face.verify_face_to_face(
+    # Verify every pair of faces at once, and group the faces of the same person.
+    confidences = verify_matrix(face_client, faces_ids)
+    labels = cluster_faces(confidences, threshold=0.5)
+    for label in sorted(set(labels)):
+        print("Same person in {}.".format(
+            ", ".join(face for face, face_label in zip(faces, labels) if face_label == label)))
+    print("\n")
+
+    # Verification example for faces of the same person, answered by the verification cache.
+    verify_result = verify_faces_cached(
+        face_client,
         faces_ids[0],
         faces_ids[1],
     )
@@ -79,7 +96,8 @@ def image_analysis_in_stream(subscription_key):
             faces[0], faces[1], verify_result.confidence))
 
     # Verification example for faces of different persons.
-    verify_result = face_client.face.verify_face_to_face(
+    verify_result = verify_faces_cached(
+        face_client,
         faces_ids[1],
         faces_ids[2],
     )
@@ -98,10 +116,7 @@ def detect_faces(subscription_key):
     """
 
     image_url = "https://csdx.blob.core.windows.net/resources/Face/Images/Family1-Dad1.jpg"
-    face_base_url = "https://{}.api.cognitive.microsoft.com".format(
-        FACE_LOCATION)
-    face_client = FaceClient(
-        endpoint=face_base_url, credentials=CognitiveServicesCredentials(subscription_key))
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
     detected_faces = face_client.face.detect_with_url(url=image_url)
     if not detected_faces:
         raise Exception('No face detected from image {}'.format(image_url))
@@ -118,54 +133,7 @@ def face_detection(subscription_key):
     This will print out all of the facial attributes for a list of images.
     """
 
-    def get_accessories(accessories):
-        """Helper function for face_detection sample.
-
-        This will return a string representation of a person's accessories.
-        """
-
-        accessory_str = ",".join([str(accessory) for accessory in accessories])
-        return accessory_str if accessory_str else "No accessories"
-
-    def get_emotion(emotion):
-        """Helper function for face_detection sample.
-
-        This will determine and return the emotion a person is showing.
-        """
-
-        max_emotion_value = 0.0
-        emotion_type = None
-
-        for emotion_name, emotion_value in vars(emotion).items():
-            if emotion_name == "additional_properties":
-                continue
-            if emotion_value > max_emotion_value:
-                max_emotion_value = emotion_value
-                emotion_type = emotion_name
-        return emotion_type
-
-    def get_hair(hair):
-        """Helper function for face_detection sample.
-
-         This determines and returns the hair color detected for a face in an image.
-        """
-
-        if not hair.hair_color:
-            return "invisible" if hair.invisible else "bald"
-        return_color = HairColorType.unknown
-        max_confidence = 0.0
-
-        for hair_color in hair.hair_color:
-            if hair_color.confidence > max_confidence:
-                max_confidence = hair_color.confidence
-                return_color = hair_color.color
-
-        return return_color
-
-    face_base_url = "https://{}.api.cognitive.microsoft.com".format(
-        FACE_LOCATION)
-    face_client = FaceClient(
-        endpoint=face_base_url, credentials=CognitiveServicesCredentials(subscription_key))
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
     image_url_prefix = "https://csdx.blob.core.windows.net/resources/Face/Images/"
     image_file_names = [
         "detection1.jpg",
@@ -175,26 +143,35 @@ def face_detection(subscription_key):
         "detection5.jpg",
         "detection6.jpg"
     ]
-    for image_file_name in image_file_names:
-        detected_faces = face_client.face.detect_with_url(
-            url=image_url_prefix + image_file_name,
-            return_face_attributes=[
-                FaceAttributeType.accessories,
-                'age',
-                'blur',
-                'emotion',
-                'exposure',
-                'facialHair',
-                'gender',
-                'glasses',
-                'hair',
-                'headPose',
-                'makeup',
-                'noise',
-                'occlusion',
-                'smile'
-            ]
-        )
+    # Images are detected concurrently, results come back in input order
+    detections = detect_faces_batch(
+        face_client,
+        [image_url_prefix + image_file_name for image_file_name in image_file_names],
+        return_face_attributes=[
+            FaceAttributeType.accessories,
+            'age',
+            'blur',
+            'emotion',
+            'exposure',
+            'facialHair',
+            'gender',
+            'glasses',
+            'hair',
+            'headPose',
+            'makeup',
+            'noise',
+            'occlusion',
+            'smile'
+        ]
+    )
+    # Faces are flattened into one table, the dominant emotion and hair color computed for all at once.
+    detected = []
+    for image_file_name, detection in zip(image_file_names, detections):
+        if detection.error:
+            print("Face detection failed for image {}: {}".format(
+                image_file_name, detection.error))
+            continue
+        detected_faces = detection.faces
         if not detected_faces:
             raise Exception(
                 "No face detected from image {}".format(image_file_name))
@@ -203,58 +180,35 @@ def face_detection(subscription_key):
         if not detected_faces[0].face_attributes:
             raise Exception(
                 "Parameter return_face_attributes of detect_with_stream_async must be set to get face attributes.")
-
-        for face in detected_faces:
-            print("Face attributes of {}   Rectangle(Left/Top/Width/Height) : {} {} {} {}".format(
-                image_file_name,
-                face.face_rectangle.left,
-                face.face_rectangle.top,
-                face.face_rectangle.width,
-                face.face_rectangle.height)
-            )
-            print("Face attributes of {}   Accessories : {}".format(
-                image_file_name, get_accessories(face.face_attributes.accessories)))
-            print("Face attributes of {}   Age : {}".format(
-                image_file_name, face.face_attributes.age))
-            print("Face attributes of {}   Blur : {}".format(
-                image_file_name, face.face_attributes.blur.blur_level))
-            print("Face attributes of {}   Emotion : {}".format(
-                image_file_name, get_emotion(face.face_attributes.emotion)))
-            print("Face attributes of {}   Exposure : {}".format(
-                image_file_name, face.face_attributes.exposure.exposure_level))
-            if face.face_attributes.facial_hair.moustache + face.face_attributes.facial_hair.beard + face.face_attributes.facial_hair.sideburns > 0:
-                print("Face attributes of {}   FacialHair : Yes".format(
-                    image_file_name))
-            else:
-                print("Face attributes of {}   FacialHair : No".format(
-                    image_file_name))
-            print("Face attributes of {}   Gender : {}".format(
-                image_file_name, face.face_attributes.gender))
-            print("Face attributes of {}   Glasses : {}".format(
-                image_file_name, face.face_attributes.glasses))
-            print("Face attributes of {}   Hair : {}".format(
-                image_file_name, get_hair(face.face_attributes.hair)))
-            print("Face attributes of {}   HeadPose : Pitch: {}, Roll: {}, Yaw: {}".format(
-                image_file_name,
-                round(face.face_attributes.head_pose.pitch, 2),
-                round(face.face_attributes.head_pose.roll, 2),
-                round(face.face_attributes.head_pose.yaw, 2))
-            )
-            if face.face_attributes.makeup.eye_makeup or face.face_attributes.makeup.lip_makeup:
-                print("Face attributes of {}   Makeup : Yes".format(image_file_name))
-            else:
-                print("Face attributes of {}   Makeup : No".format(image_file_name))
-            print("Face attributes of {}   Noise : {}".format(
-                image_file_name, face.face_attributes.noise.noise_level))
-            print("Face attributes of {}   Occlusion : EyeOccluded: {},   ForeheadOccluded: {},   MouthOccluded: {}".format(
-                image_file_name,
-                "Yes" if face.face_attributes.occlusion.eye_occluded else "No",
-                "Yes" if face.face_attributes.occlusion.forehead_occluded else "No",
-                "Yes" if face.face_attributes.occlusion.mouth_occluded else "No")
-            )
-
-            print("Face attributes of {}   Smile : {}".format(
-                image_file_name, face.face_attributes.smile))
+        detected.append((image_file_name, detected_faces))
+
+    for face in FaceTable.from_detections(detected).records():
+        image_file_name = face["image"]
+        print("Face attributes of {}   Rectangle(Left/Top/Width/Height) : {} {} {} {}".format(
+            image_file_name, face["left"], face["top"], face["width"], face["height"]))
+        print("Face attributes of {}   Accessories : {}".format(
+            image_file_name, face["accessories"] or "No accessories"))
+        print("Face attributes of {}   Age : {}".format(image_file_name, face["age"]))
+        print("Face attributes of {}   Blur : {}".format(image_file_name, face["blur_level"]))
+        print("Face attributes of {}   Emotion : {}".format(image_file_name, face["emotion"]))
+        print("Face attributes of {}   Exposure : {}".format(image_file_name, face["exposure_level"]))
+        print("Face attributes of {}   FacialHair : {}".format(
+            image_file_name, "Yes" if face["moustache"] + face["beard"] + face["sideburns"] > 0 else "No"))
+        print("Face attributes of {}   Gender : {}".format(image_file_name, face["gender"]))
+        print("Face attributes of {}   Glasses : {}".format(image_file_name, face["glasses"]))
+        print("Face attributes of {}   Hair : {}".format(image_file_name, face["hair"]))
+        print("Face attributes of {}   HeadPose : Pitch: {}, Roll: {}, Yaw: {}".format(
+            image_file_name, round(face["pitch"], 2), round(face["roll"], 2), round(face["yaw"], 2)))
+        print("Face attributes of {}   Makeup : {}".format(
+            image_file_name, "Yes" if face["eye_makeup"] or face["lip_makeup"] else "No"))
+        print("Face attributes of {}   Noise : {}".format(image_file_name, face["noise_level"]))
+        print("Face attributes of {}   Occlusion : EyeOccluded: {},   ForeheadOccluded: {},   MouthOccluded: {}".format(
+            image_file_name,
+            "Yes" if face["eye_occluded"] else "No",
+            "Yes" if face["forehead_occluded"] else "No",
+            "Yes" if face["mouth_occluded"] else "No")
+        )
+        print("Face attributes of {}   Smile : {}".format(image_file_name, face["smile"]))
 
 
 def find_similar_in_face_ids(subscription_key):
@@ -263,10 +217,7 @@ def find_similar_in_face_ids(subscription_key):
     This will detect similar faces from a list of images against a single image using face ids.
     """
 
-    face_base_url = "https://{}.api.cognitive.microsoft.com".format(
-        FACE_LOCATION)
-    face_client = FaceClient(
-        endpoint=face_base_url, credentials=CognitiveServicesCredentials(subscription_key))
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
     image_url_prefix = "https://csdx.blob.core.windows.net/resources/Face/Images/"
     target_image_file_names = [
         "Family1-Dad1.jpg",
@@ -302,10 +253,7 @@ def find_similar_in_face_list(subscription_key):
     This will detect similar faces from a list of images against a single image by placing the images in a face list.
     """
 
-    face_base_url = "https://{}.api.cognitive.microsoft.com".format(
-        FACE_LOCATION)
-    face_client = FaceClient(
-        endpoint=face_base_url, credentials=CognitiveServicesCredentials(subscription_key))
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
     image_url_prefix = "https://csdx.blob.core.windows.net/resources/Face/Images/"
     target_image_file_names = [
         "Family1-Dad1.jpg",
@@ -322,49 +270,34 @@ def find_similar_in_face_list(subscription_key):
     # Create a face list.
     face_list_id = str(uuid.uuid4())
     print("Create face list {}.".format(face_list_id))
-    face_client.face_list.create(
-        face_list_id=face_list_id,
+    face_list = FaceListIndex(face_client, face_list_id)
+    face_list.create(
         name="face list for find_similar_in_face_list sample",
         user_data="face list for find_similar_in_face_list sample"
     )
 
-    for target_image_file_name in target_image_file_names:
-        # Add face to face list.
-        faces = face_client.face_list.add_face_from_url(
-            face_list_id=face_list_id,
-            url=image_url_prefix + target_image_file_name,
-            user_data=target_image_file_name
-        )
-        if not faces:
-            raise Exception("No face detected from image {}".format(
-                target_image_file_name))
+    # Add faces to face list, the index maps each persisted face to its image.
+    face_list.add_faces(
+        (image_url_prefix + target_image_file_name, target_image_file_name)
+        for target_image_file_name in target_image_file_names)
+    for persisted_face in face_list:
         print("Face from image {} is successfully added to the face list.".format(
-            target_image_file_name))
-    # Get persisted faces from the face list.
-    persisted_faces = face_client.face_list.get(face_list_id).persisted_faces
-    if not persisted_faces:
-        raise Exception(
-            "No persisted face in face list {}".format(face_list_id))
+            persisted_face.user_data))
 
     # Detect faces from source image url.
     detected_faces = _detect_faces_helper(
         face_client=face_client, image_url=image_url_prefix + source_image_file_name)
 
     # Find similar example of face id to face list.
-    similar_results = face_client.face.find_similar(
-        face_id=detected_faces[0].face_id, face_list_id=face_list_id)
-    for similar_result in similar_results:
-        persisted_faces = [
-            pf for pf in persisted_faces if pf.persisted_face_id == similar_result.persisted_face_id]
-        if not persisted_faces:
+    for similar_result, persisted_face in face_list.find_similar(detected_faces[0].face_id):
+        if persisted_face is None:
             print("persisted face not found in similar result.")
             continue
-        persisted_face = persisted_faces[0]
         print("Faces from {} & {} are similar with confidence: {}.".format(
             source_image_file_name, persisted_face.user_data, similar_result.confidence))
 
     # Delete the face list.
-    face_client.face_list.delete(face_list_id=face_list_id)
+    face_list.delete()
     print("Delete face list {}.\n".format(face_list_id))
 
 
@@ -374,10 +307,7 @@ def find_similar_in_large_face_list(subscription_key):
     This will detect similar faces from a list of images against a single image by placing the list of images in a large face list.
     """
 
-    face_base_url = "https://{}.api.cognitive.microsoft.com".format(
-        FACE_LOCATION)
-    face_client = FaceClient(
-        endpoint=face_base_url, credentials=CognitiveServicesCredentials(subscription_key))
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
     image_url_prefix = "https://csdx.blob.core.windows.net/resources/Face/Images/"
     target_image_file_names = [
         "Family1-Dad1.jpg",
@@ -395,61 +325,40 @@ def find_similar_in_large_face_list(subscription_key):
     # Create a large face list.
     large_face_list_id = str(uuid.uuid4())
     print("Create large face list {}.".format(large_face_list_id))
-    face_client.large_face_list.create(
-        large_face_list_id=large_face_list_id,
+    large_face_list = FaceListIndex(face_client, large_face_list_id, large=True)
+    large_face_list.create(
         name="large face list for find_similar_in_large_face_list sample",
         user_data="large face list for find_similar_in_large_face_list sample"
     )
 
-    for target_image_file_name in target_image_file_names:
-        faces = face_client.large_face_list.add_face_from_url(
-            large_face_list_id=large_face_list_id,
-            url=image_url_prefix + target_image_file_name,
-            user_data=target_image_file_name
-        )
-        if not faces:
-            raise Exception("No face detected from image {}.".format(
-                target_image_file_name))
+    large_face_list.add_faces(
+        (image_url_prefix + target_image_file_name, target_image_file_name)
+        for target_image_file_name in target_image_file_names)
+    for persisted_face in large_face_list:
         print("Face from image {} is successfully added to the large face list.".format(
-            target_image_file_name))
+            persisted_face.user_data))
 
     # Start to train the large face list.
     print("Train large face list {}".format(large_face_list_id))
-    face_client.large_face_list.train(large_face_list_id=large_face_list_id)
-
-    training_status = face_client.large_face_list.get_training_status(
-        large_face_list_id=large_face_list_id)
+    training_status = large_face_list.train()
     if training_status.status == TrainingStatusType.failed:
         raise Exception("Training failed with message {}.".format(
             training_status.message))
 
-    # Get persisted faces from the large face list.
-    persisted_faces = face_client.large_face_list.list_faces(
-        large_face_list_id)
-    if not persisted_faces:
-        raise Exception(
-            "No persisted face in large face list {}.".format(large_face_list_id))
-
     # Detect faces from source image url.
     detected_faces = _detect_faces_helper(
         face_client=face_client, image_url=image_url_prefix + source_image_file_name)
 
     # Find similar example of face id to large face list.
-    similar_results = face_client.face.find_similar(
-        face_id=detected_faces[0].face_id, large_face_list_id=large_face_list_id)
-
-    for similar_result in similar_results:
-        persisted_faces = [
-            pf for pf in persisted_faces if pf.persisted_face_id == similar_result.persisted_face_id]
-        if not persisted_faces:
+    for similar_result, persisted_face in large_face_list.find_similar(detected_faces[0].face_id):
+        if persisted_face is None:
             print("persisted face not found in similar result.")
             continue
-        persisted_face = persisted_faces[0]
         print("Faces from {} & {} are similar with confidence: {}.".format(
             source_image_file_name, persisted_face.user_data, similar_result.confidence))
 
     # Delete the large face list.
-    face_client.large_face_list.delete(large_face_list_id=large_face_list_id)
+    large_face_list.delete()
     print("Delete large face list {}.\n".format(large_face_list_id))
 
 
@@ -459,10 +368,7 @@ def group_run(subscription_key):
     This will group faces based on similarity in a group, and will place faces that don't have any other similar faces in a messy group.
     """
 
-    face_base_url = "https://{}.api.cognitive.microsoft.com".format(
-        FACE_LOCATION)
-    face_client = FaceClient(
-        endpoint=face_base_url, credentials=CognitiveServicesCredentials(subscription_key))
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
     image_url_prefix = "https://csdx.blob.core.windows.net/resources/Face/Images/"
     image_file_names = [
         "Family1-Dad1.jpg",
@@ -511,10 +417,7 @@ def identify_in_person_group(subscription_key):
     This will identify faces in a group of people.
     """
 
-    face_base_url = "https://{}.api.cognitive.microsoft.com".format(
-        FACE_LOCATION)
-    face_client = FaceClient(
-        endpoint=face_base_url, credentials=CognitiveServicesCredentials(subscription_key))
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
     image_url_prefix = "https://csdx.blob.core.windows.net/resources/Face/Images/"
     target_image_file_dictionary = {
         "Family1-Dad": ["Family1-Dad1.jpg", "Family1-Dad2.jpg"],
@@ -532,8 +435,10 @@ def identify_in_person_group(subscription_key):
     face_client.person_group.create(
         person_group_id=person_group_id, name=person_group_id)
 
+    # Creating persons and adding faces through the tracked operations marks the group for training
+    person_group_person = tracked_operations(face_client, "person_group")
     for target_image_file_dictionary_name in target_image_file_dictionary.keys():
-        person_id = face_client.person_group_person.create(
+        person_id = person_group_person.create(
             person_group_id=person_group_id, name=target_image_file_dictionary_name).person_id
 
         # Create a person group person.
@@ -546,7 +451,7 @@ def identify_in_person_group(subscription_key):
             # Add face to the person group person
             print("Add face to the person group person {} from image.".format(
                 target_image_file_dictionary_name, target_image_file_name))
-            face = face_client.person_group_person.add_face_from_url(
+            face = person_group_person.add_face_from_url(
                 person_group_id=person_group_id,
                 person_id=person.person_id,
                 url=image_url_prefix + target_image_file_name,
@@ -558,9 +463,7 @@ def identify_in_person_group(subscription_key):
 
     # Start to train the person group.
     print("Train person group {}".format(person_group_id))
-    face_client.person_group.train(person_group_id=person_group_id)
-    training_status = face_client.person_group.get_training_status(
-        person_group_id=person_group_id)
+    training_status = train_if_dirty(face_client, "person_group", person_group_id)
     print("Training status is {}".format(training_status.status))
     if training_status.status == TrainingStatusType.failed:
         raise Exception("Training failed with message {}.".format(
@@ -571,21 +474,24 @@ def identify_in_person_group(subscription_key):
         face_client=face_client, image_url=image_url_prefix + source_image_file_name)]
 
     # Identify example of identifying faces towards person group.
-    identify_results = face_client.face.identify(
-        face_ids=source_face_ids, person_group_id=person_group_id)
-    if not identify_results:
+    # Face ids are sent by groups of 10, the most identify accepts.
+    identified_faces = identify_faces(
+        face_client, source_face_ids, person_group_id=person_group_id)
+    if not any(identified_faces.values()):
         print("No person identified in the person group for faces from the {}.".format(
             source_image_file_name))
         return
 
-    for identify_result in identify_results:
+    for face_id, candidates in identified_faces.items():
+        if not candidates:
+            continue
         person = face_client.person_group_person.get(
-            person_group_id=person_group_id, person_id=identify_result.candidates[0].person_id)
+            person_group_id=person_group_id, person_id=candidates[0].person_id)
         print("Person {} is identified for face: {} - {}, confidence: {}.".format(
             person.name,
             source_image_file_name,
-            identify_result.face_id,
-            identify_result.candidates[0].confidence)
+            face_id,
+            candidates[0].confidence)
         )
 
     # Delete the person group.
@@ -599,10 +505,7 @@ def identify_in_large_person_group(subscription_key):
     This will identify faces in a large person group.
     """
 
-    face_base_url = "https://{}.api.cognitive.microsoft.com".format(
-        FACE_LOCATION)
-    face_client = FaceClient(
-        endpoint=face_base_url, credentials=CognitiveServicesCredentials(subscription_key))
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
     image_url_prefix = "https://csdx.blob.core.windows.net/resources/Face/Images/"
     target_image_file_dictionary = {
         "Family1-Dad": ["Family1-Dad1.jpg", "Family1-Dad2.jpg"],
@@ -614,42 +517,22 @@ def identify_in_large_person_group(subscription_key):
     }
     source_image_file_name = "identification1.jpg"
 
-    # Create a large person group.
+    # Create a large person group, its persons and their faces concurrently, then train it.
+    # Pass a journal_path to resume an enrollment interrupted by a crash.
     large_person_group_id = str(uuid.uuid4())
-    print("Create a large person group {}.".format(large_person_group_id))
-    face_client.large_person_group.create(
-        large_person_group_id=large_person_group_id, name=large_person_group_id)
-
-    for target_image_file_dictionary_name in target_image_file_dictionary.keys():
-        person_id = face_client.large_person_group_person.create(
-            large_person_group_id=large_person_group_id, name=target_image_file_dictionary_name).person_id
-
-        # Create a person group person.
-        person = Person(name=target_image_file_dictionary_name,
-                        user_data="Person for sample", person_id=person_id)
-
-        print("Create a large person group person {}.".format(person.name))
-
-        for target_image_file_name in target_image_file_dictionary[target_image_file_dictionary_name]:
-            # Add face to the person group person
-            print("Add face to the large person group person {} from image.".format(
-                target_image_file_dictionary_name, target_image_file_name))
-            face = face_client.large_person_group_person.add_face_from_url(
-                large_person_group_id=large_person_group_id,
-                person_id=person.person_id,
-                url=image_url_prefix + target_image_file_name,
-                user_data=target_image_file_name
-            )
-            if not face:
-                raise Exception("No persisted face from image {}".format(
-                    target_image_file_name))
-
-    # Start to train the large person group.
-    print("Train large person group {}.".format(large_person_group_id))
-    face_client.large_person_group.train(
-        large_person_group_id=large_person_group_id)
-    training_status = face_client.large_person_group.get_training_status(
-        large_person_group_id=large_person_group_id)
+    print("Create and train a large person group {}.".format(large_person_group_id))
+    enrollment = enroll_faces(
+        face_client,
+        large_person_group_id,
+        {name: [image_url_prefix + image_file_name for image_file_name in image_file_names]
+         for name, image_file_names in target_image_file_dictionary.items()}
+    )
+    print("{} persons created, {} faces added.".format(
+        enrollment.persons_created, enrollment.faces_added))
+    if enrollment.failures:
+        raise Exception("Enrollment failed for {}".format(
+            ", ".join(image or name for name, image in enrollment.failures)))
+    training_status = enrollment.training_status
     print("Training status is {}".format(training_status.status))
     if training_status.status == TrainingStatusType.failed:
         raise Exception("Training failed with message {}.".format(
@@ -660,21 +543,24 @@ def identify_in_large_person_group(subscription_key):
         face_client=face_client, image_url=image_url_prefix + source_image_file_name)]
 
     # Identify example of identifying faces towards large person group.
-    identify_results = face_client.face.identify(
-        face_ids=source_face_ids, large_person_group_id=large_person_group_id)
-    if not identify_results:
+    # Face ids are sent by groups of 10, the most identify accepts.
+    identified_faces = identify_faces(
+        face_client, source_face_ids, large_person_group_id=large_person_group_id)
+    if not any(identified_faces.values()):
         print("No person identified in the large person group for faces from the {}.".format(
             source_image_file_name))
         return
 
-    for identify_result in identify_results:
+    for face_id, candidates in identified_faces.items():
+        if not candidates:
+            continue
         person = face_client.large_person_group_person.get(
-            large_person_group_id=large_person_group_id, person_id=identify_result.candidates[0].person_id)
+            large_person_group_id=large_person_group_id, person_id=candidates[0].person_id)
         print("Person {} is identified for face: {} - {}, confidence: {}.".format(
             person.name,
             source_image_file_name,
-            identify_result.face_id,
-            identify_result.candidates[0].confidence)
+            face_id,
+            candidates[0].confidence)
         )
 
     # Delete the person group.
@@ -683,16 +569,71 @@ def identify_in_large_person_group(subscription_key):
     print("Delete the large person group {}.\n".format(large_person_group_id))
 
 
+def identify_in_sharded_large_person_groups(subscription_key):
+    """IdentifyInShardedLargePersonGroups.
+
+    This will identify faces in a gallery of persons spread over several large person groups.
+    """
+
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
+    image_url_prefix = "https://csdx.blob.core.windows.net/resources/Face/Images/"
+    target_image_file_dictionary = {
+        "Family1-Dad": ["Family1-Dad1.jpg", "Family1-Dad2.jpg"],
+        "Family1-Mom": ["Family1-Mom1.jpg", "Family1-Mom2.jpg"],
+        "Family1-Son": ["Family1-Son1.jpg", "Family1-Son2.jpg"],
+        "Family1-Daughter": ["Family1-Daughter1.jpg", "Family1-Daughter2.jpg"],
+        "Family2-Lady": ["Family2-Lady1.jpg", "Family2-Lady2.jpg"],
+        "Family2-Man": ["Family2-Man1.jpg", "Family2-Man2.jpg"]
+    }
+    source_image_file_name = "identification1.jpg"
+
+    # Spread the persons over 3 large person groups, enrolled and trained in parallel.
+    gallery_id = str(uuid.uuid4())
+    gallery = ShardedPersonGroup(face_client, gallery_id, shards=3)
+    print("Create and train the large person groups of gallery {}.".format(gallery_id))
+    enrollments = gallery.enroll(
+        {name: [image_url_prefix + image_file_name for image_file_name in image_file_names]
+         for name, image_file_names in target_image_file_dictionary.items()}
+    )
+    for shard_id, enrollment in enrollments.items():
+        print("Large person group {}: {} persons, training status is {}.".format(
+            shard_id, enrollment.persons_created, enrollment.training_status.status))
+        if enrollment.failures:
+            raise Exception("Enrollment failed for {}".format(
+                ", ".join(image or name for name, image in enrollment.failures)))
+        if enrollment.training_status.status == TrainingStatusType.failed:
+            raise Exception("Training failed with message {}.".format(
+                enrollment.training_status.message))
+
+    # Detect faces from source image url.
+    source_face_ids = [detected_face.face_id for detected_face in _detect_faces_helper(
+        face_client=face_client, image_url=image_url_prefix + source_image_file_name)]
+
+    # Every large person group is queried concurrently, the best candidate of all wins.
+    for face_id, candidates in gallery.identify(source_face_ids).items():
+        if not candidates:
+            print("No person identified for face: {} - {}.".format(source_image_file_name, face_id))
+            continue
+        print("Person {} is identified for face: {} - {}, confidence: {}.".format(
+            gallery.person_name(candidates[0]),
+            source_image_file_name,
+            face_id,
+            candidates[0].confidence)
+        )
+
+    # Delete the large person groups.
+    gallery.delete()
+    gallery.close()
+    print("Delete the large person groups of gallery {}.\n".format(gallery_id))
+
+
 def verify_face_to_face(subscription_key):
     """VerifyFaceToFace.
 
     This will verify whether faces detected as similar are the same person.
     """
 
-    face_base_url = "https://{}.api.cognitive.microsoft.com".format(
-        FACE_LOCATION)
-    face_client = FaceClient(
-        endpoint=face_base_url, credentials=CognitiveServicesCredentials(subscription_key))
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
 
     image_url_prefix = "https://csdx.blob.core.windows.net/resources/Face/Images/"
     target_image_file_names = ["Family1-Dad1.jpg", "Family1-Dad2.jpg"]
@@ -714,8 +655,8 @@ def verify_face_to_face(subscription_key):
     source_face_id2 = detected_faces2[0].face_id
 
     # Verification example for faces of the same person.
-    verify_result1 = face_client.face.verify_face_to_face(
-        face_id1=source_face_id1, face_id2=target_face_ids[0])
+    verify_result1 = verify_faces_cached(
+        face_client, face_id1=source_face_id1, face_id2=target_face_ids[0])
     if verify_result1.is_identical:
         print("Faces from {} & {} are of the same (Positive) person, similarity confidence: {}.".format(
             source_image_file_name1, target_image_file_names[0], verify_result1.confidence))
@@ -724,8 +665,8 @@ def verify_face_to_face(subscription_key):
             source_image_file_name1, target_image_file_names[0], verify_result1.confidence))
 
     # Verification example for faces of different persons.
-    verify_result2 = face_client.face.verify_face_to_face(
-        face_id1=source_face_id2, face_id2=target_face_ids[0])
+    verify_result2 = verify_faces_cached(
+        face_client, face_id1=source_face_id2, face_id2=target_face_ids[0])
     if verify_result2.is_identical:
         print("Faces from {} & {} are of the same (Negative) person, similarity confidence: {}.\n".format(
             source_image_file_name2, target_image_file_names[0], verify_result2.confidence))
@@ -740,10 +681,7 @@ def verify_in_person_group(subscription_key):
     This will verify whether faces detected as similar in a group are of the same person.
     """
 
-    face_base_url = "https://{}.api.cognitive.microsoft.com".format(
-        FACE_LOCATION)
-    face_client = FaceClient(
-        endpoint=face_base_url, credentials=CognitiveServicesCredentials(subscription_key))
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
 
     image_url_prefix = "https://csdx.blob.core.windows.net/resources/Face/Images/"
     target_image_file_names = ["Family1-Dad1.jpg", "Family1-Dad2.jpg"]
@@ -801,10 +739,7 @@ def verify_in_large_person_group(subscription_key):
     This will verify whether faces detected as similar in a large group are of the same person.
     """
 
-    face_base_url = "https://{}.api.cognitive.microsoft.com".format(
-        FACE_LOCATION)
-    face_client = FaceClient(
-        endpoint=face_base_url, credentials=CognitiveServicesCredentials(subscription_key))
+    face_client = get_client(FaceClient, FACE_ENDPOINT, subscription_key)
 
     image_url_prefix = "https://csdx.blob.core.windows.net/resources/Face/Images/"
     target_image_file_names = ["Family1-Dad1.jpg", "Family1-Dad2.jpg"]
@@ -870,7 +805,8 @@ def _detect_faces_helper(face_client, image_url):
     This will detect the faces found in the image with url image_url using the provided FaceClient instance and return the faces identified in an image.
     """
 
-    detected_faces = face_client.face.detect_with_url(url=image_url)
+    # Images already detected by a previous sample are not sent again
+    detected_faces = detect_faces_cached(face_client, image_url)
     if not detected_faces:
         raise Exception('No face detected from image {}'.format(image_url))
     print("{} faces detected from image {}".format(
@@ -0,0 +1,76 @@
+import importlib
+import os
+import sys
+import tempfile
+import unittest
+
+from samples._infra import response_cache
+from samples._infra.metrics import METRICS
+from samples._infra.throttling import LIMITER
+from samples.tools import capture_stdout
+
+if sys.version_info >= (3, 7):
+    from samples._infra.standin import StandIn, StandInServer, redirect_requests
+
+
+def _run(sample, subscription_key):
+    """Run a sample function, its printed output discarded."""
+    with capture_stdout():
+        sample(subscription_key)
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "The stand-in needs Python 3.7 or later")
+class BingSampleTest(unittest.TestCase):
+    """The basic Bing samples send through the shared clients, against a local stand-in."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StandInServer(StandIn()).start_in_thread()
+        redirect_requests(cls.server.url)
+        os.environ.setdefault("BING_SEARCH_V7_SUBSCRIPTION_KEY", "key")
+        os.environ.setdefault("BING_SEARCH_V7_ENDPOINT", "https://api.cognitive.microsoft.com")
+        os.environ.setdefault("BING_ENTITY_SEARCH_SUBSCRIPTION_KEY", "key")
+        os.environ.setdefault("BING_ENTITY_SEARCH_ENDPOINT", "https://api.cognitive.microsoft.com")
+        cls.web_search = importlib.import_module("samples.search.web_search_samples")
+        cls.entity_search = importlib.import_module("samples.search.entity_search_samples")
+
+    def setUp(self):
+        self.rate_limit = LIMITER.rate_limits.get("bing")
+
+    def tearDown(self):
+        if self.rate_limit is None:
+            LIMITER.rate_limits.pop("bing", None)
+        else:
+            LIMITER.rate_limits["bing"] = self.rate_limit
+
+    def test_rate_limited(self):
+        LIMITER.set_rate_limit("bing", 4, 1)
+        for _ in range(3):
+            _run(self.web_search.result_types_lookup, "rate-limited-key")
+        bucket = LIMITER.bucket("rate-limited-key", "bing")
+        self.assertEqual(3, bucket.requests)
+        self.assertGreater(bucket.total_wait, 0.4)  # Two requests waited 1/4 s then 2/4 s
+
+    def test_metrics(self):
+        METRICS.clear()
+        _run(self.entity_search.dominant_entity_lookup, "metrics-key")
+        _run(self.web_search.result_types_lookup, "metrics-key")
+        operations = METRICS.to_json()
+        self.assertEqual({"200": 1}, operations["EntitiesOperations.search"]["status_codes"])
+        self.assertEqual({"200": 1}, operations["WebOperations.search"]["status_codes"])
+
+    def test_cached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = response_cache.enable_cache(directory)
+            try:
+                sent = self.server.standin.stats["bing"]
+                _run(self.web_search.result_types_lookup, "cached-key")
+                _run(self.web_search.result_types_lookup, "cached-key")
+            finally:
+                response_cache.CACHE = None
+        self.assertEqual(1, self.server.standin.stats["bing"] - sent)
+        self.assertEqual((1, 1, 1), (cache.misses, cache.stores, cache.hits))
+
+
+if __name__ == '__main__':
+    unittest.main()
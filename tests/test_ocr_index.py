@@ -0,0 +1,112 @@
+import random
+import unittest
+
+import numpy as np
+
+from samples._infra.ocr_index import WordIndex
+
+WIDTH, HEIGHT = 9000, 7000
+DIRECTIONS = [None, "left", "right", "above", "below"]
+
+
+def _page(rng):
+    """Return the texts and boxes of a synthetic page of rows of words, in shuffled order."""
+    words = []
+    y = 40
+    while y < HEIGHT - 60:
+        x = 30
+        while True:
+            width, height = rng.randint(40, 220), rng.choice([24, 30])
+            if x + width > WIDTH - 30:
+                break
+            words.append(("w{}_{}".format(x, y), (x, y, x + width, y + height)))
+            x += width + rng.randint(12, 25)
+        y += rng.randint(40, 55)
+    rng.shuffle(words)
+    return [text for text, _ in words], [box for _, box in words]
+
+
+def _gap(box, boxes):
+    dx = np.maximum(0, np.maximum(box[0] - boxes[:, 2], boxes[:, 0] - box[2]))
+    dy = np.maximum(0, np.maximum(box[1] - boxes[:, 3], boxes[:, 1] - box[3]))
+    return np.hypot(dx, dy)
+
+
+def _nearest_distance(boxes, word, direction):
+    """Return the gap between a word and its nearest word in direction by scanning every box, None if none."""
+    box = boxes[word]
+    keep = np.ones(len(boxes), dtype=bool)
+    keep[word] = False
+    center_x, center_y = (boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2
+    same_row = (boxes[:, 1] < box[3]) & (boxes[:, 3] > box[1])
+    same_column = (boxes[:, 0] < box[2]) & (boxes[:, 2] > box[0])
+    if direction == "left":
+        keep &= same_row & (center_x < box[0])
+    elif direction == "right":
+        keep &= same_row & (center_x > box[2])
+    elif direction == "above":
+        keep &= same_column & (center_y < box[1])
+    elif direction == "below":
+        keep &= same_column & (center_y > box[3])
+    candidates = np.flatnonzero(keep)
+    return _gap(box, boxes[candidates]).min() if len(candidates) else None
+
+
+class WordIndexTest(unittest.TestCase):
+    """Queries of the grid index agree with a scan of every word."""
+
+    def setUp(self):
+        self.rng = random.Random(2)
+        self.texts, boxes = _page(self.rng)
+        self.boxes = np.array(boxes, dtype=np.float64)
+        self.index = WordIndex(self.texts, boxes)
+
+    def test_within(self):
+        boxes = self.boxes
+        for _ in range(1000):
+            x0, y0 = self.rng.uniform(-100, WIDTH), self.rng.uniform(-100, HEIGHT)
+            x1, y1 = x0 + self.rng.uniform(0, 1500), y0 + self.rng.uniform(0, 900)
+            inside = np.flatnonzero(
+                (boxes[:, 0] >= x0) & (boxes[:, 2] <= x1) & (boxes[:, 1] >= y0) & (boxes[:, 3] <= y1))
+            touching = np.flatnonzero(
+                (boxes[:, 0] <= x1) & (boxes[:, 2] >= x0) & (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0))
+            np.testing.assert_array_equal(inside, self.index.within((x0, y0, x1, y1)))
+            np.testing.assert_array_equal(touching, self.index.within((x0, y0, x1, y1), partial=True))
+
+    def test_nearest(self):
+        for _ in range(1000):
+            word, direction = self.rng.randrange(len(self.boxes)), self.rng.choice(DIRECTIONS)
+            expected = _nearest_distance(self.boxes, word, direction)
+            nearest = self.index.nearest(word, direction)
+            if expected is None:
+                self.assertIsNone(nearest)
+            else:
+                self.assertIsNotNone(nearest)
+                self.assertAlmostEqual(expected, _gap(self.boxes[word], self.boxes[[nearest]])[0])
+
+    def test_nearest_bounds(self):
+        self.assertIsNotNone(self.index.nearest((20000, 20000, 20010, 20010)))
+        margin = (5, 5, 10, 10)  # 20 pixels left and 30 above the first word
+        self.assertIsNone(self.index.nearest(margin, max_distance=30))
+        self.assertIsNotNone(self.index.nearest(margin, max_distance=40))
+
+    def test_reading_order(self):
+        expected = sorted(range(len(self.texts)), key=lambda word: (self.boxes[word, 1], self.boxes[word, 0]))
+        self.assertEqual(expected, list(self.index.reading_order()))
+
+    def test_find_and_label(self):
+        first = self.index.find("W30_40")
+        self.assertEqual(["w30_40"], [self.texts[word] for word in first])
+        self.assertIsNone(self.index.nearest(int(first[0]), "left"))
+        self.assertIsNone(self.index.label_for(int(first[0])))  # First word: nothing on its left, nor above it
+
+    def test_empty(self):
+        index = WordIndex([], [])
+        self.assertEqual(0, len(index))
+        self.assertEqual(0, len(index.within((0, 0, 10, 10))))
+        self.assertIsNone(index.nearest((0, 0, 1, 1)))
+        self.assertEqual("", index.text())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import io
+import random
+import unittest
+
+from azure.cognitiveservices.vision.computervision.models import (
+    Line, OcrLine, OcrRegion, OcrResult, OcrWord, TextRecognitionResult, Word)
+from PIL import Image
+
+from samples._infra.ocr_tiles import crop_tiles, stitch_ocr_results, stitch_text_recognition_results, tile_boxes
+
+WIDTH, HEIGHT = 9000, 7000
+
+
+def _page(seed=1):
+    """Return the lines of a synthetic page, each a list of ((x0, y0, x1, y1), text) words."""
+    rng = random.Random(seed)
+    lines = []
+    y = 40
+    while y < HEIGHT - 60:
+        x, line = 30, []
+        while True:
+            width, height = rng.randint(40, 220), rng.choice([24, 30])
+            if x + width > WIDTH - 30:
+                break
+            line.append(((x, y, x + width, y + height), "w{}_{}".format(x, y)))
+            x += width + rng.randint(12, 25)
+        lines.append(line)
+        y += rng.randint(40, 55)
+    return lines
+
+
+def _seen_by(tile, page):
+    """Yield the lines of page as a tile sees them: words clipped by its edges, with their text cut."""
+    for line in page:
+        words = []
+        for (x0, y0, x1, y1), text in line:
+            clipped = (max(x0, tile.left), max(y0, tile.top),
+                       min(x1, tile.left + tile.width), min(y1, tile.top + tile.height))
+            if clipped[2] - clipped[0] < 5 or clipped[3] - clipped[1] < 5:
+                continue
+            if clipped != (x0, y0, x1, y1):
+                text = text[:max(1, len(text) * (clipped[2] - clipped[0]) // (x1 - x0))] + "~"
+            words.append((clipped[0] - tile.left, clipped[1] - tile.top,
+                          clipped[2] - tile.left, clipped[3] - tile.top, text))
+        if words:
+            yield words
+
+
+def _xywh(x0, y0, x1, y1):
+    return "{},{},{},{}".format(x0, y0, x1 - x0, y1 - y0)
+
+
+def _quad(x0, y0, x1, y1):
+    return [x0, y0, x1, y0, x1, y1, x0, y1]
+
+
+def _ocr_result(tile, page):
+    return OcrResult(language="en", text_angle=0.0, orientation="Up", regions=[OcrRegion(
+        bounding_box="0,0,1,1",
+        lines=[OcrLine(bounding_box=_xywh(words[0][0], words[0][1], words[-1][2], words[0][3]),
+                       words=[OcrWord(bounding_box=_xywh(*word[:4]), text=word[4]) for word in words])
+               for words in _seen_by(tile, page)])])
+
+
+def _text_recognition_result(tile, page):
+    return TextRecognitionResult(
+        page=1, clockwise_orientation=0.0, width=tile.width, height=tile.height, unit="pixel",
+        lines=[Line(bounding_box=_quad(words[0][0], words[0][1], words[-1][2], words[0][3]),
+                    text=" ".join(word[4] for word in words),
+                    words=[Word(bounding_box=_quad(*word[:4]), text=word[4], confidence="High") for word in words])
+               for words in _seen_by(tile, page)])
+
+
+class StitchTest(unittest.TestCase):
+    """Tiles of a synthetic page stitch back into its exact words and lines."""
+
+    def setUp(self):
+        self.page = _page()
+        self.tiles = tile_boxes(WIDTH, HEIGHT)
+        self.words = sorted((text, box) for line in self.page for box, text in line)
+        self.lines = sorted(" ".join(text for _, text in line) for line in self.page)
+
+    def test_stitch_ocr_results(self):
+        result = stitch_ocr_results([(tile, _ocr_result(tile, self.page)) for tile in self.tiles], WIDTH, HEIGHT)
+        words, lines = [], []
+        for region in result.regions:
+            for line in region.lines:
+                lines.append(" ".join(word.text for word in line.words))
+                for word in line.words:
+                    x, y, width, height = [int(value) for value in word.bounding_box.split(",")]
+                    words.append((word.text, (x, y, x + width, y + height)))
+        self.assertEqual(self.words, sorted(words))
+        self.assertEqual(self.lines, sorted(lines))
+
+    def test_stitch_text_recognition_results(self):
+        result = stitch_text_recognition_results(
+            [(tile, _text_recognition_result(tile, self.page)) for tile in self.tiles], WIDTH, HEIGHT)
+        words = [(word.text, tuple(word.bounding_box[index] for index in (0, 1, 4, 5)))
+                 for line in result.lines for word in line.words]
+        self.assertEqual(self.words, sorted(words))
+        self.assertEqual(self.lines, sorted(line.text for line in result.lines))
+        self.assertEqual((WIDTH, HEIGHT), (result.width, result.height))
+
+
+class CropTilesTest(unittest.TestCase):
+
+    def test_crop_tiles_past_decompression_bomb_limit(self):
+        buffer = io.BytesIO()
+        Image.new("L", (3000, 2500), 255).save(buffer, "PNG")
+        buffer.seek(0)
+        # The page is past twice the limit, where Image.open raises, its tiles are not
+        max_pixels, Image.MAX_IMAGE_PIXELS = Image.MAX_IMAGE_PIXELS, 1024 * 1024
+        try:
+            width, height, tiles = crop_tiles(buffer, tile_size=1024, overlap=128)
+            tiles = list(tiles)
+        finally:
+            Image.MAX_IMAGE_PIXELS = max_pixels
+        self.assertEqual((3000, 2500), (width, height))
+        self.assertEqual(tile_boxes(3000, 2500, 1024, 128), [tile for tile, _ in tiles])
+        for tile, data in tiles:
+            self.assertEqual((tile.width, tile.height), Image.open(io.BytesIO(data)).size)
+
+
+if __name__ == '__main__':
+    unittest.main()